@@ -0,0 +1,164 @@
+"""Pre-encoded, responsive image variants for the Streamlit pages.
+
+Source images live in ASSETS_DIR, which is `assets/` next to this file unless
+the DERMASCRIBE_ASSETS_DIR environment variable says otherwise. Each one is
+resized once into WebP and JPEG variants sized for the page columns. The
+variants are written to `static/img/` under content-hash names, and Streamlit
+serves them as plain files (`enableStaticServing` in .streamlit/config.toml).
+Pages emit a small <picture> tag that points at those files, so no image is
+decoded, pickled or re-encoded on the rerun path.
+
+Stylesheets under `static/css/` are linked the same way (`stylesheet_html`),
+with a content hash in the URL so browsers can keep them cached between reruns.
+
+Build every variant ahead of time with:  python -m assets
+"""
+import hashlib
+import html
+import os
+from typing import NamedTuple
+
+import streamlit as st
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.environ.get("DERMASCRIBE_ASSETS_DIR", os.path.join(PROJECT_DIR, "assets"))
+STATIC_DIR = os.path.join(PROJECT_DIR, "static")
+STATIC_URL = "app/static"
+VARIANTS_DIR = os.path.join(STATIC_DIR, "img")
+VARIANTS_URL = f"{STATIC_URL}/img"
+
+# A half-width column of the wide layout is ~640 CSS px on a laptop screen;
+# 1280 covers the same column on 2x displays.
+VARIANT_WIDTHS = (640, 1280)
+FORMATS = (("webp", "WEBP", {"quality": 80, "method": 6}), ("jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}))
+COLUMN_SIZES = "(max-width: 640px) 100vw, 50vw"
+
+
+class Variant(NamedTuple):
+    width: int
+    extension: str
+    url: str
+    path: str
+
+
+class ResponsiveImage(NamedTuple):
+    name: str
+    variants: tuple
+
+    def srcset(self, extension):
+        return ", ".join(f"{v.url} {v.width}w" for v in self.variants if v.extension == extension)
+
+    def fallback(self):
+        jpegs = [v for v in self.variants if v.extension == "jpg"]
+        return jpegs[0].url
+
+
+def source_path(name):
+    return os.path.join(ASSETS_DIR, name)
+
+
+def _planned_variants(name, digest, source_width):
+    stem = os.path.splitext(os.path.basename(name))[0][:40]
+    # Never upscale: a small source gets a single variant at its own width.
+    widths = sorted({min(width, source_width) for width in VARIANT_WIDTHS})
+    return tuple(
+        Variant(
+            width,
+            extension,
+            f"{VARIANTS_URL}/{stem}-{digest}-{width}.{extension}",
+            os.path.join(VARIANTS_DIR, f"{stem}-{digest}-{width}.{extension}"),
+        )
+        for width in widths
+        for extension, _, _ in FORMATS
+    )
+
+
+def build_variants(name):
+    """Encodes any missing variants of `name` and returns the ResponsiveImage, or None if absent."""
+    path = source_path(name)
+    if not os.path.isfile(path):
+        return None
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+
+    from PIL import Image
+
+    with Image.open(path) as image:
+        variants = _planned_variants(name, digest, image.width)
+        missing = [v for v in variants if not os.path.exists(v.path)]
+        if missing:
+            os.makedirs(VARIANTS_DIR, exist_ok=True)
+            image = image.convert("RGB")
+            options = {extension: (fmt, kwargs) for extension, fmt, kwargs in FORMATS}
+            for variant in missing:
+                height = round(image.height * variant.width / image.width)
+                resized = image if variant.width == image.width else image.resize((variant.width, height), Image.LANCZOS)
+                fmt, kwargs = options[variant.extension]
+                # Write-then-rename so a concurrent reader never sees half a file.
+                tmp_path = f"{variant.path}.{os.getpid()}.tmp"
+                resized.save(tmp_path, fmt, **kwargs)
+                os.replace(tmp_path, variant.path)
+    return ResponsiveImage(name, variants)
+
+
+@st.cache_resource(show_spinner=False)
+def _cached_variants(name, mtime, size):
+    return build_variants(name)
+
+
+_reported_missing = set()
+
+
+def responsive_image(name):
+    """The page-side entry point: variants are built on first use and then reused by every session."""
+    try:
+        stat = os.stat(source_path(name))
+    except OSError:
+        if name not in _reported_missing:
+            _reported_missing.add(name)
+            print(f"Error: Image file not found at {source_path(name)}")
+        return None
+    return _cached_variants(name, stat.st_mtime_ns, stat.st_size)
+
+
+def picture_html(image, caption="", sizes=COLUMN_SIZES, loading="lazy"):
+    """A <picture> that lets the browser choose a WebP or JPEG width for its column.
+
+    Pass loading="eager" for an above-the-fold image so it is not deferred.
+    """
+    alt = html.escape(caption, quote=True)
+    caption_html = f'<figcaption style="text-align: center; font-size: 0.9rem; color: var(--color-text-medium); margin-top: 0.5rem;">{html.escape(caption)}</figcaption>' if caption else ""
+    return (
+        '<figure style="margin: 0;"><picture>'
+        f'<source type="image/webp" srcset="{image.srcset("webp")}" sizes="{sizes}">'
+        f'<img src="{image.fallback()}" srcset="{image.srcset("jpg")}" sizes="{sizes}" alt="{alt}" '
+        f'loading="{loading}" decoding="async" style="width: 100%; height: auto; border-radius: 15px;">'
+        f"</picture>{caption_html}</figure>"
+    )
+
+
+# --- STYLESHEETS ---
+@st.cache_resource(show_spinner=False)
+def _stylesheet_url(name, mtime, size):
+    with open(os.path.join(STATIC_DIR, "css", name), "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    return f"{STATIC_URL}/css/{name}?v={digest}"
+
+
+def stylesheet_html(name):
+    """A <link> to static/css/`name`; the URL changes only when the file does."""
+    stat = os.stat(os.path.join(STATIC_DIR, "css", name))
+    return f'<link rel="stylesheet" href="{_stylesheet_url(name, stat.st_mtime_ns, stat.st_size)}">'
+
+
+def main():
+    names = sorted(n for n in os.listdir(ASSETS_DIR) if n.lower().endswith((".jpg", ".jpeg", ".png", ".webp")))
+    for name in names:
+        image = build_variants(name)
+        for variant in image.variants:
+            print(f"{variant.path}  {os.path.getsize(variant.path):>9,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""Headless, bulk routine analysis: JSONL routines in, JSONL conflict findings out.
+
+Each input line is one routine:
+
+    {"id": "patient-17", "products": [12, "Dot & Key CICA Calming Blemish Clearing Facewash"]}
+
+Products are given by id or by name. A name is matched exactly against
+`products` first, then through `products_fts`, taking the best search hit.
+Each output line repeats the routine's id (or its line number). It lists the
+resolved product ids and the names that matched nothing, and carries the
+findings `conflicts.ConflictEngine` reports, as in the Product Analyzer. A line
+that cannot be processed becomes an {"error": ...} record of its own; the rest
+of the batch carries on.
+
+Lines are sent to a process pool in chunks, and results are written in input
+order. At most `max_inflight` chunks are queued or waiting to be written across
+all running batches. Reading stops while that many are outstanding, so memory
+stays flat however long the stream is, and a slow reader slows the whole
+pipeline down rather than buffering it. The HTTP service spools each request
+body before answering it (see `_Handler.do_POST`).
+
+Run from the project root:
+    python -m batch_analyze run routines.jsonl [-o results.jsonl]
+    python -m batch_analyze serve [--port 8765]   # POST JSONL to /analyze
+"""
+import argparse
+import collections
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+import catalog_db
+import conflicts
+import search
+
+CHUNK_SIZE = 256  # routines per pool task
+INFLIGHT_PER_WORKER = 2
+SPOOL_BYTES = 8 * 2**20  # request bodies beyond this are spooled to disk
+PORT = 8765
+
+
+# --- WORKER PROCESS ---
+def _is_id(ref):
+    return isinstance(ref, int) and not isinstance(ref, bool)
+
+
+def _read_only(db_path):
+    conn = sqlite3.connect(f"file:{quote(db_path)}?mode=ro", uri=True)
+    catalog_db.register_functions(conn)
+    for pragma in catalog_db.READ_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class _RoutineWorker:
+    """A pool worker's read-only connection, product search and compiled rules."""
+
+    def __init__(self, db_path, engine):
+        self.conn = _read_only(db_path)
+        self.search = search.ProductSearch(self.conn)
+        self.engine = engine
+
+    def resolve(self, refs):
+        """(product ids in routine order, refs that matched no product)."""
+        ids, unresolved = [], []
+        numeric = [ref for ref in refs if _is_id(ref)]
+        known = set()
+        if numeric:
+            placeholders = ", ".join("?" * len(numeric))
+            known = {row[0] for row in self.conn.execute(f"SELECT id FROM products WHERE id IN ({placeholders})", numeric)}
+        for ref in refs:
+            if isinstance(ref, str):
+                product_id = self._by_name(ref)
+            else:
+                product_id = ref if _is_id(ref) and ref in known else None
+            if product_id is None:
+                unresolved.append(ref)
+            else:
+                ids.append(product_id)
+        return ids, unresolved
+
+    def _by_name(self, name):
+        row = self.conn.execute("SELECT id FROM products WHERE product_name = ?", (name,)).fetchone()
+        if row is not None:
+            return row[0]
+        best = self.search.search(name, 1)
+        return best[0].id if best else None
+
+    def analyze(self, number, line):
+        """One input line -> one output line (JSON, no newline)."""
+        routine_id = None
+        try:
+            routine = json.loads(line)
+            if not isinstance(routine, dict) or not isinstance(routine.get("products"), list):
+                raise ValueError('expected an object with a "products" list')
+            routine_id = routine.get("id", number)
+            product_ids, unresolved = self.resolve(routine["products"])
+            findings = self.engine.analyze(self.conn, product_ids)
+            return json.dumps({
+                "id": routine_id,
+                "products": product_ids,
+                "unresolved": unresolved,
+                "findings": [finding._asdict() for finding in findings],
+            })
+        except Exception as e:
+            return json.dumps({"id": routine_id, "line": number, "error": f"{type(e).__name__}: {e}"})
+
+
+_worker = None
+
+
+def _init_worker(db_path, engine):
+    global _worker
+    _worker = _RoutineWorker(db_path, engine)
+
+
+def _analyze_chunk(numbered_lines):
+    return [_worker.analyze(number, line) for number, line in numbered_lines]
+
+
+# --- DRIVER ---
+class BatchAnalyzer:
+    """Process pool shared by every batch; call `run` from any number of threads."""
+
+    def __init__(self, db_path=catalog_db.DB_PATH, workers=None, chunk_size=CHUNK_SIZE):
+        self.db_path = db_path
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.max_inflight = self.workers * INFLIGHT_PER_WORKER
+        # Bring the schema up to date once; from here on everything only reads.
+        catalog_db.connect(db_path).close()
+        conn = _read_only(db_path)
+        try:
+            self.engine = conflicts.compile_rules(conn)
+        finally:
+            conn.close()
+        self._slots = threading.BoundedSemaphore(self.max_inflight)
+        self._lock = threading.Lock()
+        self._pool = self._new_pool()
+
+    def _new_pool(self):
+        # fork where available, for the same reason as in facescan.FaceScanService.
+        method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+        return ProcessPoolExecutor(
+            self.workers, mp_context=multiprocessing.get_context(method),
+            initializer=_init_worker, initargs=(self.db_path, self.engine),
+        )
+
+    def _submit(self, chunk):
+        """(pool, future), or (pool, None) if no pool would take the chunk; `_emit` then fails it."""
+        for _ in range(2):
+            with self._lock:
+                pool = self._pool
+            try:
+                return pool, pool.submit(_analyze_chunk, chunk)
+            except Exception:
+                # Broken, or shut down by another batch's _emit that has just replaced it
+                # (RuntimeError); in the latter case the replacement gets one try.
+                with self._lock:
+                    if pool is self._pool:
+                        break
+        return pool, None
+
+    def _emit(self, task, write, stats):
+        chunk, pool, future = task
+        try:
+            try:
+                results = future.result() if future is not None else None
+            except BrokenProcessPool:
+                results = None
+            if results is None:
+                # A worker died (e.g. out of memory); fail this chunk and start a fresh pool once.
+                with self._lock:
+                    if pool is self._pool:
+                        self._pool = self._new_pool()
+                        pool.shutdown(wait=False)
+                results = [json.dumps({"id": None, "line": number, "error": "worker process failed"})
+                           for number, _ in chunk]
+            write("".join(result + "\n" for result in results))
+            stats["routines"] += len(results)
+        finally:
+            self._slots.release()
+
+    def run(self, lines, write):
+        """Analyzes JSONL `lines` (an iterable of str), passing `write` the output lines in input order, a chunk at a time.
+
+        Returns a Counter of routines written.
+        """
+        stats = collections.Counter()
+        pending = collections.deque()
+        numbered = ((number, line) for number, line in enumerate(lines, start=1) if line.strip())
+        try:
+            while True:
+                chunk = list(itertools.islice(numbered, self.chunk_size))
+                if not chunk:
+                    break
+                # Backpressure: no reading ahead until a slot frees up. Write out our own
+                # finished chunks first, so one batch can never wait on itself.
+                while not self._slots.acquire(blocking=False):
+                    if pending:
+                        self._emit(pending.popleft(), write, stats)
+                    else:
+                        self._slots.acquire()
+                        break
+                pending.append((chunk, *self._submit(chunk)))
+            while pending:
+                self._emit(pending.popleft(), write, stats)
+        finally:
+            # The writer failed (e.g. the HTTP client went away): give back the slots still held.
+            for _, _, future in pending:
+                if future is not None:
+                    future.cancel()
+                self._slots.release()
+        return stats
+
+    def close(self):
+        self._pool.shutdown()
+
+
+# --- HTTP SERVICE ---
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    analyzer = None  # set by serve()
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/analyze":
+            self.send_error(404)
+            return
+        length = self.headers.get("Content-Length")
+        if length is None or not length.isdigit():
+            self.send_error(411, "Send the JSONL body with a Content-Length")
+            return
+        # Most clients send the whole request before reading any of the response.
+        # Streaming both ways would deadlock them against the backpressure, so the
+        # body is spooled first (to disk once it outgrows SPOOL_BYTES).
+        with tempfile.SpooledTemporaryFile(SPOOL_BYTES) as body:
+            remaining = int(length)
+            while remaining > 0:
+                data = self.rfile.read(min(remaining, 1 << 16))
+                if not data:
+                    return
+                body.write(data)
+                remaining -= len(data)
+            body.seek(0)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                self.analyzer.run(io.TextIOWrapper(body, encoding="utf-8", errors="replace"), self._write_chunk)
+                self.wfile.write(b"0\r\n\r\n")
+            except ConnectionError:  # the client hung up; run() has already released its slots
+                self.close_connection = True
+
+    def _write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(analyzer, host="127.0.0.1", port=PORT):
+    _Handler.analyzer = analyzer
+    server = ThreadingHTTPServer((host, port), _Handler)
+    print(f"Analyzing routines at http://{host}:{server.server_port}/analyze (POST JSONL)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# --- COMMAND LINE ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DermaScribe bulk routine analysis.")
+    parser.add_argument("--db", default=catalog_db.DB_PATH, help="path to products.db")
+    parser.add_argument("--workers", type=int, help="pool size (default: one per CPU)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="routines per pool task")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="analyze a JSONL file (or - for stdin)")
+    run.add_argument("input")
+    run.add_argument("-o", "--output", help="write results here instead of stdout")
+    server = commands.add_parser("serve", help="serve POST /analyze on localhost")
+    server.add_argument("--host", default="127.0.0.1")
+    server.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args(argv)
+
+    analyzer = BatchAnalyzer(args.db, args.workers, args.chunk_size)
+    try:
+        if args.command == "serve":
+            serve(analyzer, args.host, args.port)
+            return
+        with contextlib.ExitStack() as files:
+            source = sys.stdin if args.input == "-" else files.enter_context(open(args.input, encoding="utf-8"))
+            sink = files.enter_context(open(args.output, "w", encoding="utf-8")) if args.output else sys.stdout
+            stats = analyzer.run(source, sink.write)
+        print(f"Analyzed {stats['routines']:,} routines.", file=sys.stderr)
+    finally:
+        analyzer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Throughput of batch_analyze on 100k synthetic routines, in-process and over HTTP.
+
+Routines list 3-8 products from a 5k-product catalog. Products are given
+mostly by id; some are given by exact name and some by a misspelled name,
+which goes through the products_fts search path. Output is counted and then
+discarded. The peak RSS of the driving process shows that memory stays flat
+as the stream grows.
+
+Run from the project root:  python -m benchmarks.bench_batch [routines]
+"""
+import http.client
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import batch_analyze
+import catalog_db
+from benchmarks.bench_conflicts import CATALOG_SIZE, build_catalog
+
+ROUTINES = 100_000
+
+
+def misspell(rng, name):
+    i = rng.randrange(len(name) - 1)
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+
+def routines(count, seed=13):
+    rng = random.Random(seed)
+    for i in range(count):
+        products = []
+        for product_id in rng.sample(range(1, CATALOG_SIZE + 1), rng.randint(3, 8)):
+            roll = rng.random()
+            if roll < 0.7:
+                products.append(product_id)
+            elif roll < 0.95:
+                products.append(f"Product {product_id - 1}")
+            else:
+                products.append(misspell(rng, f"Product {product_id - 1}"))
+        yield json.dumps({"id": i, "products": products}) + "\n"
+
+
+class Sink:
+    def __init__(self):
+        self.lines = self.errors = 0
+
+    def write(self, text):
+        self.lines += text.count("\n")
+        self.errors += text.count('"error"')
+
+
+def peak_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def over_http(analyzer, count):
+    batch_analyze._Handler.analyzer = analyzer
+    server = ThreadingHTTPServer(("127.0.0.1", 0), batch_analyze._Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    body = "".join(routines(count)).encode()
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_port)
+    start = time.perf_counter()
+    conn.request("POST", "/analyze", body=body, headers={"Content-Length": str(len(body))})
+    response = conn.getresponse()
+    lines = sum(1 for _ in response)
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    server.server_close()
+    return lines, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else ROUTINES
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "catalog.db")
+        conn = catalog_db.connect(db_path)
+        build_catalog(conn, random.Random(7))
+        conn.close()
+        print(f"{count:,} routines over {CATALOG_SIZE:,} products, {os.cpu_count()} CPU(s)")
+
+        for workers in sorted({1, os.cpu_count() or 1}):
+            analyzer = batch_analyze.BatchAnalyzer(db_path, workers=workers)
+            sink = Sink()
+            start = time.perf_counter()
+            analyzer.run(routines(count), sink.write)
+            elapsed = time.perf_counter() - start
+            print(f"in-process, {workers} worker(s): {sink.lines / elapsed:8,.0f} routines/s "
+                  f"({elapsed:.1f} s, {sink.errors} errors), driver peak RSS {peak_rss_mib():.0f} MiB")
+            analyzer.close()
+
+        analyzer = batch_analyze.BatchAnalyzer(db_path)
+        lines, elapsed = over_http(analyzer, count)
+        print(f"HTTP, {analyzer.workers} worker(s):       {lines / elapsed:8,.0f} routines/s ({elapsed:.1f} s)")
+        analyzer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Latency of routine conflict checks for 5, 20 and 100 product routines.
+
+Run from the project root:  python -m benchmarks.bench_conflicts
+"""
+import json
+import random
+import statistics
+import time
+
+import catalog_db
+import conflicts
+
+CATALOG_SIZE = 5000
+ROUTINE_SIZES = (5, 20, 100)
+ROUNDS = 200
+
+
+def load_spec():
+    with open(conflicts.RULES_PATH) as f:
+        return json.load(f)
+
+
+def build_catalog(conn, rng):
+    spec = load_spec()
+    actives = [name for members in spec["groups"].values() for name in members]
+    fillers = [f"Filler {i}" for i in range(800)]
+    rows = []
+    for i in range(CATALOG_SIZE):
+        names = rng.sample(fillers, rng.randint(5, 30))
+        if rng.random() < 0.3:
+            names.insert(rng.randrange(len(names)), rng.choice(actives))
+        rows.append((f"Product {i}", f"Brand {i % 50}", "serum", json.dumps(names)))
+    conn.executemany(
+        "INSERT INTO products(product_name, brand, category, ingredients_list) VALUES (?, ?, ?, ?)", rows
+    )
+    conn.commit()
+
+
+def naive_pairs(conn, product_ids, rule_pairs):
+    """Nested string comparison, the approach the engine replaces."""
+    lists = {
+        pid: json.loads(raw)
+        for pid, raw in conn.execute(
+            f"SELECT id, ingredients_list FROM products WHERE id IN ({', '.join('?' * len(product_ids))})",
+            product_ids,
+        )
+    }
+    found = []
+    for i, a in enumerate(product_ids):
+        for b in product_ids[i + 1:]:
+            for x in lists[a]:
+                for y in lists[b]:
+                    if (x.lower(), y.lower()) in rule_pairs:
+                        found.append((a, b, x, y))
+    return found
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    rng = random.Random(7)
+    conn = catalog_db.connect(":memory:")
+    build_catalog(conn, rng)
+
+    start = time.perf_counter()
+    engine = conflicts.compile_rules(conn)
+    print(f"compile: {(time.perf_counter() - start) * 1000:.2f} ms, {len(engine.names)} rule ingredients")
+
+    spec = load_spec()
+    rule_pairs = set()
+    for rule in spec["rules"]:
+        for x in spec["groups"][rule["a"]]:
+            for y in spec["groups"][rule["b"]]:
+                rule_pairs.update({(x.lower(), y.lower()), (y.lower(), x.lower())})
+
+    print(f"{'products':>8} {'engine p50':>11} {'engine p95':>11} {'naive p50':>10} {'findings':>9}")
+    for size in ROUTINE_SIZES:
+        engine_ms, naive_ms, found = [], [], 0
+        for _ in range(ROUNDS):
+            routine = rng.sample(range(1, CATALOG_SIZE + 1), size)
+            start = time.perf_counter()
+            found += len(engine.analyze(conn, routine))
+            engine_ms.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            naive_pairs(conn, routine, rule_pairs)
+            naive_ms.append((time.perf_counter() - start) * 1000)
+        print(
+            f"{size:>8} {statistics.median(engine_ms):>8.3f} ms {percentile(engine_ms, 95):>8.3f} ms "
+            f"{statistics.median(naive_ms):>7.3f} ms {found / ROUNDS:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""FaceScan throughput and latency at 1, 8 and 32 concurrent uploads.
+
+Each upload is a distinct synthetic 1600x1200 JPEG, so the result cache never
+answers. Every level runs twice: unbatched (max_batch=1) and micro-batched.
+
+Run from the project root:  python -m benchmarks.bench_facescan [uploads per level]
+"""
+import io
+import statistics
+import sys
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+import facescan
+
+UPLOADS = 96
+CONCURRENCY = (1, 8, 32)
+
+
+def synthetic_photos(count, width=1600, height=1200, seed=5):
+    """Skin-toned gradients with darker blotches and a few highlights, as JPEG bytes."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([200 + 30 * np.sin(x / 300), 150 + 20 * np.cos(y / 250), 120 + 10 * np.sin((x + y) / 400)], axis=-1)
+    photos = []
+    for _ in range(count):
+        rgb = base + rng.normal(0, 4, base.shape)
+        for cx, cy, radius in rng.integers((0, 0, 6), (width, height, 30), size=(40, 3)):
+            rgb[max(cy - radius, 0):cy + radius, max(cx - radius, 0):cx + radius] -= (40, 45, 35)
+        buffer = io.BytesIO()
+        Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8)).save(buffer, "JPEG", quality=88)
+        photos.append(buffer.getvalue())
+    return photos
+
+
+def run_level(service, photos, concurrency):
+    latencies, lock = [], threading.Lock()
+    work = iter(photos)
+
+    def client():
+        while True:
+            with lock:
+                photo = next(work, None)
+            if photo is None:
+                return
+            start = time.perf_counter()
+            service.scan(photo)
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    ordered = sorted(latencies)
+    return len(photos) / elapsed, statistics.median(ordered), ordered[int(len(ordered) * 0.95)]
+
+
+def main():
+    uploads = int(sys.argv[1]) if len(sys.argv) > 1 else UPLOADS
+    photos = synthetic_photos((uploads * len(CONCURRENCY) + 1) * 2)
+    print(f"{uploads} distinct 1600x1200 uploads per level")
+    for max_batch in (1, facescan.MAX_BATCH):
+        service = facescan.FaceScanService(max_batch=max_batch)
+        service.scan(photos.pop())  # start the workers and load the model
+        print(f"workers {service.workers}, max_batch {max_batch}")
+        for concurrency in CONCURRENCY:
+            batch = [photos.pop() for _ in range(uploads)]
+            before = dict(service.stats)
+            throughput, p50, p95 = run_level(service, batch, concurrency)
+            batches = service.stats["batches"] - before.get("batches", 0)
+            print(f"  {concurrency:>2} concurrent  {throughput:6.1f} photos/s  p50 {p50:7.1f} ms  p95 {p95:7.1f} ms"
+                  f"  mean batch {uploads / batches:4.1f}")
+        start = time.perf_counter()
+        service.scan(batch[0])
+        print(f"  cached rescan {(time.perf_counter() - start) * 1000:.3f} ms")
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
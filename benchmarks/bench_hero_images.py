@@ -0,0 +1,116 @@
+"""Hero image cost per rerun and per page view: st.image on a cached PIL image vs pre-encoded variants.
+
+Both pages render the same image three times, as home.py does. The "before" page
+is the old loader (@st.cache_data returning a PIL image, passed to st.image);
+the "after" page uses assets.responsive_image / picture_html. A synthetic
+2400x1600 photo stands in for the hero image unless a path is given.
+
+Run from the project root:  python -m benchmarks.bench_hero_images [image]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.testing.v1 import AppTest
+
+RERUNS = 20
+CAPTIONS = ("Achieve your best skin", "Analyze Your Skincare Routine", "Discover Personalized Recommendations")
+
+BEFORE_PAGE = """
+import streamlit as st
+from PIL import Image
+
+@st.cache_data
+def load_local_image(path):
+    return Image.open(path)
+
+hero_image = load_local_image({path!r})
+for caption in {captions!r}:
+    st.image(hero_image, use_container_width=True, caption=caption)
+"""
+
+AFTER_PAGE = """
+import streamlit as st
+from assets import picture_html, responsive_image
+
+hero_image = responsive_image({name!r})
+for caption in {captions!r}:
+    st.markdown(picture_html(hero_image, caption=caption), unsafe_allow_html=True)
+"""
+
+
+def synthetic_photo(path, width=2400, height=1600, seed=3):
+    rng = np.random.default_rng(seed)
+    x, y = np.meshgrid(np.linspace(0, 1, width), np.linspace(0, 1, height))
+    rgb = np.stack([np.sin(x * 9) * 60 + np.cos(y * 7) * 60 + 150,
+                    np.sin(y * 5 + x * 3) * 50 + 140,
+                    np.cos(x * 4 - y * 6) * 40 + 200], axis=-1)
+    rgb += rng.normal(0, 6, rgb.shape)
+    Image.fromarray(np.clip(rgb, 0, 255).astype("uint8")).save(path, "WEBP", quality=90)
+
+
+def time_reruns(app):
+    app.run()  # first run fills the caches (and, after, encodes the variants)
+    samples = []
+    for _ in range(RERUNS):
+        start = time.perf_counter()
+        app.run()
+        samples.append((time.perf_counter() - start) * 1000)
+    assert not app.exception, app.exception
+    return samples
+
+
+def markup_bytes(app):
+    return sum(len(element.proto.body.encode()) for element in app.markdown) + \
+        sum(len(element.proto.caption.encode()) for element in app.caption)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        if len(sys.argv) > 1:
+            source = os.path.abspath(sys.argv[1])
+        else:
+            source = os.path.join(tmp, "hero.webp")
+            synthetic_photo(source)
+        os.environ["DERMASCRIBE_ASSETS_DIR"] = os.path.dirname(source)
+        name = os.path.basename(source)
+        with Image.open(source) as image:
+            print(f"source {name}: {image.width}x{image.height}, {os.path.getsize(source):,} bytes")
+
+        # Every media file st.image hands to the browser goes through the storage's add().
+        media = {}
+        original_add = MemoryMediaFileStorage.load_and_get_id
+
+        def recording_add(self, path_or_data, mimetype, kind, filename=None):
+            file_id = original_add(self, path_or_data, mimetype, kind, filename)
+            media[file_id] = len(path_or_data)
+            return file_id
+
+        with mock.patch.object(MemoryMediaFileStorage, "load_and_get_id", recording_add):
+            before = AppTest.from_string(BEFORE_PAGE.format(path=source, captions=CAPTIONS))
+            before_ms = time_reruns(before)
+
+        import assets
+
+        after = AppTest.from_string(AFTER_PAGE.format(name=name, captions=CAPTIONS))
+        after_ms = time_reruns(after)
+        variants = assets.responsive_image(name).variants
+
+        print(f"rerun   before p50 {statistics.median(before_ms):7.2f} ms   after p50 {statistics.median(after_ms):7.2f} ms")
+        # The three images share one URL on both pages, so a page view downloads one image file.
+        print(f"bytes/view before  {sum(media.values()) + markup_bytes(before):>9,}  (st.image JPEG, {len(media)} file)")
+        for variant in variants:
+            size = os.path.getsize(variant.path)
+            print(f"bytes/view after   {size + markup_bytes(after):>9,}  ({variant.width}w {variant.extension})")
+        for variant in variants:
+            os.remove(variant.path)
+
+
+if __name__ == "__main__":
+    main()
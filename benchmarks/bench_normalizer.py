@@ -0,0 +1,97 @@
+"""Ingest throughput: nested-REPLACE FTS triggers vs. normalize_search_text().
+
+Loads the same synthetic 100k-row catalog into two fresh databases that differ
+only in how products_fts is kept in sync, then checks a query answers alike.
+
+Run from the project root:  python -m benchmarks.bench_normalizer [rows]
+"""
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import catalog_db
+
+ROWS = 100_000
+
+# The triggers products.db shipped with, kept here only for comparison.
+_LEGACY = (
+    "REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(LOWER({col}), '&', 'and'), "
+    "'''s', ''), '.', ''), '-', ''), '''', ''), 'mama earth', 'mamaearth'), 'derma co', 'dermaco'), "
+    "'derma company', 'dermaco'), 'forest essentials', 'forestessentials')"
+)
+
+
+def _legacy_row(prefix):
+    return "{0}, {1}, LOWER({2}.category)".format(
+        _LEGACY.format(col=f"{prefix}.product_name"), _LEGACY.format(col=f"{prefix}.brand"), prefix
+    )
+
+
+LEGACY_SCHEMA = f"""
+    CREATE VIRTUAL TABLE products_fts USING fts5(
+        product_name, brand, category, content='products', content_rowid='id'
+    );
+    CREATE TRIGGER products_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, product_name, brand, category) VALUES (new.id, {_legacy_row("new")});
+    END;
+    CREATE TRIGGER products_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, product_name, brand, category)
+        VALUES ('delete', old.id, {_legacy_row("old")});
+    END;
+    CREATE TRIGGER products_au AFTER UPDATE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, product_name, brand, category)
+        VALUES ('delete', old.id, {_legacy_row("old")});
+        INSERT INTO products_fts(rowid, product_name, brand, category) VALUES (new.id, {_legacy_row("new")});
+    END;
+"""
+
+BRANDS = ["Pond's", "Dot & Key", "Dr. Sheth's", "The Derma Co.", "Mama Earth", "Paula's Choice",
+          "Forest Essentials", "Minimalist", "Plum", "Cetaphil"]
+WORDS = ["Bright", "Beauty", "De-Tan", "CICA", "Calming", "Ceramide", "Vitamin C", "Hyaluronic",
+         "Aqua", "Gel", "Ubtan", "BHA", "Liquid", "Exfoliant", "Niacinamide", "Serum", "Cream"]
+CATEGORIES = ["cleanser", "sunscreen", "treatment", "moisturizer", "serum", "toner"]
+
+
+def synthetic_rows(count):
+    rng = random.Random(42)
+    for i in range(count):
+        brand = rng.choice(BRANDS)
+        name = f"{brand} {' '.join(rng.sample(WORDS, 4))} #{i}"
+        yield name, brand, rng.choice(CATEGORIES), json.dumps(rng.sample(WORDS, 3))
+
+
+def load(conn, rows):
+    start = time.perf_counter()
+    with conn:
+        conn.executemany(
+            "INSERT INTO products(product_name, brand, category, ingredients_list) VALUES (?, ?, ?, ?)",
+            synthetic_rows(rows),
+        )
+    return time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = sqlite3.connect(os.path.join(tmp, "legacy.db"))
+        legacy.executescript(catalog_db.PRODUCTS_SQL + LEGACY_SCHEMA)
+
+        current = sqlite3.connect(os.path.join(tmp, "current.db"))
+        current.executescript(catalog_db.PRODUCTS_SQL + catalog_db.BRAND_ALIASES_SQL)
+        current.executemany("INSERT INTO brand_aliases VALUES (?, ?)", catalog_db.DEFAULT_BRAND_ALIASES.items())
+        catalog_db.register_functions(current)
+        current.executescript(catalog_db.SEARCH_VIEW_SQL + catalog_db.FTS_SQL)
+        catalog_db.create_fts_triggers(current)
+
+        for label, conn in (("nested REPLACE triggers", legacy), ("normalize_search_text()", current)):
+            elapsed = load(conn, rows)
+            hits = conn.execute("SELECT COUNT(*) FROM products_fts WHERE products_fts MATCH 'mamaearth'").fetchone()[0]
+            print(f"{label:<26} {rows / elapsed:>10,.0f} rows/s  ({elapsed:.2f} s, 'mamaearth' hits: {hits})")
+
+
+if __name__ == "__main__":
+    main()
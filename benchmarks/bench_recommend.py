@@ -0,0 +1,108 @@
+"""Recommendation latency on a synthetic catalog, plus incremental refresh vs full rebuild.
+
+Ingredient lists are drawn from a Zipf-like vocabulary, so a few ingredients
+(water, glycerin) appear on most labels and most appear on very few, as on
+real labels.
+
+Run from the project root:  python -m benchmarks.bench_recommend [products]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import catalog_db
+import ingest
+import recommend
+from benchmarks.bench_search import percentiles
+from benchmarks.synthetic_catalog import BRANDS, KINDS
+
+PRODUCTS = 500_000
+VOCABULARY = 4_000
+QUERIES = 200
+UPDATES = 1_000
+COMMON = ["Aqua", "Glycerin", "Niacinamide", "Salicylic Acid", "Hyaluronic Acid", "Ceramide NP", "Panthenol",
+          "Zinc PCA", "Centella Asiatica", "Ascorbic Acid", "Tocopherol", "Squalane", "Allantoin", "Fragrance"]
+
+
+def ingredient_names(count=VOCABULARY):
+    return COMMON + [f"Ingredient {i:04d}" for i in range(count - len(COMMON))]
+
+
+def synthetic_records(count, seed=23, start=0):
+    rng = random.Random(seed)
+    names = ingredient_names()
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(len(names))]
+    categories = list(KINDS)
+    for i in range(start, start + count):
+        brand = rng.choice(BRANDS)
+        category = rng.choice(categories)
+        label = list(dict.fromkeys(rng.choices(names, weights, k=rng.randint(12, 30))))
+        yield {"product_name": f"{brand} {category} {i}", "brand": brand, "category": category,
+               "ingredients_list": label}
+
+
+def main():
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else PRODUCTS
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = catalog_db.connect(os.path.join(tmp, "catalog.db"))
+        ingest.ingest(conn, synthetic_records(products), bulk=True, log=lambda message: None)
+        postings = conn.execute("SELECT COUNT(*) FROM product_ingredients").fetchone()[0]
+        print(f"{products:,} products, {postings:,} ingredient postings")
+
+        start = time.perf_counter()
+        index = recommend.RecommendationIndex.build(conn)
+        build_s = time.perf_counter() - start
+        path = os.path.join(tmp, "recommend_index.npz")
+        index.save(path)
+        start = time.perf_counter()
+        index = recommend.RecommendationIndex.load(path)
+        print(f"full build {build_s:.2f} s, load {time.perf_counter() - start:.2f} s, "
+              f"{os.path.getsize(path) / 2**20:.1f} MiB on disk")
+
+        ids = [row[0] for row in conn.execute("SELECT id FROM products")]
+        samples = {"similar": [], "similar, category": [], "dupes": [], "profile": []}
+        for _ in range(QUERIES):
+            product_id = rng.choice(ids)
+            for label, call in (
+                ("similar", lambda: index.similar(conn, product_id)),
+                ("similar, category", lambda: index.similar(conn, product_id, category="treatment")),
+                ("dupes", lambda: index.similar(conn, product_id, dupes=True)),
+                ("profile", lambda: index.for_profile(conn, rng.choice(list(recommend.SKIN_PROFILES)))),
+            ):
+                start = time.perf_counter()
+                call()
+                samples[label].append((time.perf_counter() - start) * 1000)
+        for label, timings in samples.items():
+            print(f"top-10 {label:<18} {percentiles(timings)}")
+
+        # Incremental: rewrite some labels and add new products through the trigger path.
+        for product_id in rng.sample(ids, UPDATES // 2):
+            label = json.loads(conn.execute("SELECT ingredients_list FROM products WHERE id = ?", (product_id,)).fetchone()[0])
+            rng.shuffle(label)
+            conn.execute("UPDATE products SET ingredients_list = ? WHERE id = ?", (json.dumps(label), product_id))
+        conn.commit()
+        ingest.ingest(conn, synthetic_records(UPDATES // 2, seed=99, start=products), log=lambda message: None)
+        conn.commit()
+        start = time.perf_counter()
+        index.refresh(conn)
+        refresh_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        recommend.RecommendationIndex.build(conn)
+        rebuild_s = time.perf_counter() - start
+        print(f"{UPDATES:,} product writes: refresh {refresh_ms:.0f} ms vs full rebuild {rebuild_s:.2f} s "
+              f"({len(index):,} live rows)")
+        timings = []
+        for _ in range(QUERIES):
+            product_id = rng.choice(ids)
+            start = time.perf_counter()
+            index.similar(conn, product_id)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"top-10 similar after refresh {percentiles(timings)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Rerun cost of each Streamlit page against the budgets in render_budgets.json.
+
+Each page runs headless under AppTest: once to warm the caches, then for the
+configured number of reruns, cycling through its `interactions` (button keys
+to click). render_profile.RerunProfile supplies per-function time and bytes.
+The bytes budget covers what a rerun sends over the websocket, st.image media
+included. Files under static/ (the stylesheet) are fetched once by the browser
+and are not counted; no web fonts are bundled (see static/css/dermascribe.css).
+Exits non-zero when any page goes over its rerun_ms_p95 or bytes budget.
+
+Run from the project root:  python -m benchmarks.bench_render [budgets.json]
+"""
+import json
+import os
+import sys
+
+from streamlit.testing.v1 import AppTest
+
+from render_profile import PROFILE_KEY
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_budgets.json")
+
+
+def p95(samples):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+def profile_page(page, budget, reruns):
+    app = AppTest.from_file(os.path.join(PROJECT_DIR, page), default_timeout=30)
+    app.run()
+    interactions = budget.get("interactions") or [None]
+    profiles = []
+    for i in range(reruns):
+        key = interactions[i % len(interactions)]
+        if key is None:
+            app.run()
+        else:
+            app.button(key=key).click().run()
+        if app.exception:
+            raise RuntimeError(f"{page}: {app.exception[0].message}")
+        profiles.append(app.session_state[PROFILE_KEY])
+    return profiles
+
+
+def max_bytes(profiles):
+    """Largest rerun in bytes, or None if any rerun's bytes could not be measured."""
+    sizes = [profile.bytes for profile in profiles]
+    return None if None in sizes else max(sizes)
+
+
+def report(page, budget, profiles):
+    """Prints the page's breakdown and returns the list of budget violations."""
+    rerun_p95 = p95([profile.ms for profile in profiles])
+    emitted = max_bytes(profiles)
+    last = profiles[-1]
+    sent = "bytes not measured" if emitted is None else f"{emitted:,} bytes"
+    print(f"{page}: rerun p95 {rerun_p95:.2f} ms (budget {budget['rerun_ms_p95']}), "
+          f"{sent} (budget {budget['bytes']:,})")
+    for name, cost in sorted(last.functions.items(), key=lambda item: item[1].ms, reverse=True):
+        if not last.measured:
+            print(f"  {name:<20} {cost.ms:8.2f} ms")
+            continue
+        elements = ", ".join(f"{kind} {size:,}" for kind, size in cost.elements.most_common())
+        print(f"  {name:<20} {cost.ms:8.2f} ms  {cost.bytes:>8,} bytes  {elements}")
+    violations = []
+    if rerun_p95 > budget["rerun_ms_p95"]:
+        violations.append(f"{page}: rerun p95 {rerun_p95:.2f} ms > {budget['rerun_ms_p95']} ms")
+    if emitted is not None and emitted > budget["bytes"]:
+        violations.append(f"{page}: {emitted:,} bytes > {budget['bytes']:,} bytes")
+    return violations
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else BUDGETS_PATH
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    violations = []
+    for page, budget in config["pages"].items():
+        violations += report(page, budget, profile_page(page, budget, config["reruns"]))
+    for violation in violations:
+        print(f"OVER BUDGET {violation}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Routine analysis through routine_cache.RoutineCache under a popular-routines workload.
+
+Sessions pick routines from a fixed pool with Zipf-like popularity and list
+their products in a random order. A few products are edited along the way.
+The benchmark prints latency for cold, memory-hit and disk-hit lookups, then
+the counters. Finally it starts a fresh cache on the same database, standing in
+for a server restart, and measures how it warms up.
+
+Run from the project root:  python -m benchmarks.bench_routine_cache
+"""
+import os
+import random
+import tempfile
+import time
+
+import catalog_db
+import conflicts
+import routine_cache
+from benchmarks.bench_conflicts import CATALOG_SIZE, build_catalog
+from benchmarks.bench_search import percentiles
+
+ROUTINES = 2_000
+LOOKUPS = 20_000
+EDIT_EVERY = 500  # lookups between product edits
+ROUTINE_SIZE = (3, 8)
+
+
+def routine_pool(rng):
+    return [rng.sample(range(1, CATALOG_SIZE + 1), rng.randint(*ROUTINE_SIZE)) for _ in range(ROUTINES)]
+
+
+def workload(rng, pool, count):
+    weights = [1 / (rank + 1) for rank in range(len(pool))]
+    for routine in rng.choices(pool, weights, k=count):
+        yield rng.sample(routine, len(routine))
+
+
+def run(conn, cache, engine, routines, rng, edits=True):
+    timings = {"miss": [], "memory hit": [], "disk hit": []}
+    for i, routine in enumerate(routines):
+        if edits and i and i % EDIT_EVERY == 0:
+            conn.execute("UPDATE products SET brand = brand || '.' WHERE id = ?", (rng.choice(routine),))
+            conn.commit()
+        before = dict(cache.stats)
+        start = time.perf_counter()
+        cache.analyze(conn, engine, routine)
+        elapsed = (time.perf_counter() - start) * 1000
+        for kind, counter in (("miss", "misses"), ("memory hit", "memory_hits"), ("disk hit", "disk_hits")):
+            if cache.stats[counter] != before.get(counter, 0):
+                timings[kind].append(elapsed)
+    return timings
+
+
+def report(label, cache, timings):
+    print(f"{label}: {dict(sorted(cache.stats.items()))}, {len(cache):,} entries, {cache.bytes / 1024:.0f} KiB")
+    for kind, samples in timings.items():
+        if samples:
+            print(f"  {kind:<11} {len(samples):>6,}  {percentiles(samples)}")
+
+
+def main():
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = catalog_db.connect(os.path.join(tmp, "catalog.db"))
+        for pragma in catalog_db.WRITE_PRAGMAS:
+            conn.execute(pragma)
+        build_catalog(conn, rng)
+        engine = conflicts.compile_rules(conn)
+        pool = routine_pool(rng)
+
+        uncached = []
+        for routine in workload(random.Random(9), pool, 1_000):
+            start = time.perf_counter()
+            engine.analyze(conn, routine)
+            uncached.append((time.perf_counter() - start) * 1000)
+        print(f"uncached analyze      {percentiles(uncached)}")
+
+        cache = routine_cache.RoutineCache()
+        report("running", cache, run(conn, cache, engine, workload(rng, pool, LOOKUPS), rng))
+        restarted = routine_cache.RoutineCache()
+        report("after restart", restarted, run(conn, restarted, engine, workload(rng, pool, LOOKUPS // 4), rng, edits=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Search latency percentiles on a synthetic catalog, replaying search_queries.txt.
+
+Run from the project root:  python -m benchmarks.bench_search [products]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import catalog_db
+import ingest
+import search
+from benchmarks.synthetic_catalog import BRANDS, DESCRIPTORS, KINDS
+
+PRODUCTS = 500_000
+QUERIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_queries.txt")
+
+
+
+def synthetic_records(count, seed=11):
+    rng = random.Random(seed)
+    categories = list(KINDS)
+    for i in range(count):
+        brand = rng.choice(BRANDS)
+        category = rng.choice(categories)
+        name = f"{brand} {' '.join(rng.sample(DESCRIPTORS, 2))} {rng.choice(KINDS[category])} {i}"
+        yield {"product_name": name, "brand": brand, "category": category, "ingredients_list": ["Aqua"]}
+
+
+def load_queries():
+    with open(QUERIES_PATH, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip() and not line.startswith("#")]
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+    return f"p50 {statistics.median(ordered):6.2f} ms  p95 {pick(95):6.2f} ms  p99 {pick(99):6.2f} ms"
+
+
+def main():
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else PRODUCTS
+    queries = load_queries()
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = catalog_db.connect(os.path.join(tmp, "catalog.db"))
+        ingest.ingest(conn, synthetic_records(products), bulk=True, log=lambda message: None)
+        print(f"{products:,} products, {len(queries)} recorded queries")
+
+        engine = search.ProductSearch(conn)
+        cold, uncached, cached = [], [], []
+        for round_number in range(4):
+            engine.cache.clear()
+            for query in queries:
+                start = time.perf_counter()
+                engine.search(query)
+                (cold if round_number == 0 else uncached).append((time.perf_counter() - start) * 1000)
+        for query in queries:
+            start = time.perf_counter()
+            engine.search(query)
+            cached.append((time.perf_counter() - start) * 1000)
+
+        # cold: first sight of each word (document frequencies not yet cached)
+        print(f"cold      {percentiles(cold)}")
+        print(f"uncached  {percentiles(uncached)}")
+        print(f"cached    {percentiles(cached)}")
+        slowest = sorted(zip(uncached, queries * 3), reverse=True)[:5]
+        print("slowest:", ", ".join(f"{query!r} {ms:.1f} ms" for ms, query in slowest))
+
+
+if __name__ == "__main__":
+    main()
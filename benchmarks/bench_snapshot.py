@@ -0,0 +1,138 @@
+"""Cold start and memory of a server process: catalog hydrated from SQLite vs the mmap snapshot.
+
+Each mode runs in a fresh interpreter, the way a new Streamlit server process
+starts. Each one loads the catalog, answers random lookups by id and by name,
+then reads every product once. That last pass faults in the whole snapshot, so
+the memory figures below are an upper bound for it. For each phase the
+benchmark reports the process's private (anonymous) RSS growth and its
+file-backed RSS growth. Only the private part is paid again by every worker
+process; the mapped snapshot pages sit in the page cache once per host.
+
+Run from the project root:  python -m benchmarks.bench_snapshot [products]
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import catalog_db
+import ingest
+import snapshot
+from benchmarks.bench_recommend import synthetic_records
+from benchmarks.bench_search import percentiles
+
+PRODUCTS = 500_000
+LOOKUPS = 2_000
+
+
+def rss_kib():
+    """(anonymous, file-backed) resident set of this process, in KiB."""
+    with open("/proc/self/status") as f:
+        fields = dict(line.split(":", 1) for line in f)
+    return int(fields["RssAnon"].split()[0]), int(fields["RssFile"].split()[0])
+
+
+def hydrate(conn):
+    """What each process would otherwise keep: every product, its ingredient ids and the dictionary."""
+    from catalog_repository import Product
+
+    products = {row[0]: Product.from_row(row) for row in conn.execute(
+        "SELECT id, product_name, brand, category, ingredients_list FROM products")}
+    by_name = {product.product_name: product for product in products.values()}
+    ingredient_names = dict(conn.execute("SELECT id, name FROM ingredients"))
+    ingredient_ids = {}
+    for product_id, ingredient_id in conn.execute(
+        "SELECT product_id, ingredient_id FROM product_ingredients ORDER BY product_id, position"
+    ):
+        ingredient_ids.setdefault(product_id, []).append(ingredient_id)
+    return products, by_name, ingredient_names, ingredient_ids
+
+
+def child(mode, db_path, snapshot_path):
+    """Runs in the measured process; prints one JSON line."""
+    import catalog_repository  # noqa: F401  (both modes pay the same imports before the baseline)
+
+    conn = catalog_db.connect(db_path)
+    ids = [row[0] for row in conn.execute("SELECT id FROM products")]
+    names = [row[0] for row in conn.execute("SELECT product_name FROM products")]
+    rng = random.Random(5)
+    id_sample, name_sample = rng.sample(ids, LOOKUPS), rng.sample(names, LOOKUPS)
+    del ids, names
+    baseline = rss_kib()
+
+    start = time.perf_counter()
+    if mode == "sqlite":
+        products, by_name, ingredient_names, ingredient_ids = hydrate(conn)
+        get, get_by_name = products.get, by_name.get
+        read = lambda p: (p.product_name, p.brand, p.category, [ingredient_names[i] for i in ingredient_ids.get(p.id, ())])
+        everything = products.values
+    else:
+        catalog = snapshot.open_snapshot(conn, snapshot_path)
+        get, get_by_name = catalog.get, catalog.get_by_name
+        read = lambda p: (p.product_name, p.brand, p.category, p.ingredients)
+        everything = lambda: catalog
+    startup_ms = (time.perf_counter() - start) * 1000
+    loaded = rss_kib()
+
+    timings = []
+    for product_id, name in zip(id_sample, name_sample):
+        start = time.perf_counter()
+        read(get(product_id))
+        read(get_by_name(name))
+        timings.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    for product in everything():
+        read(product)
+    scan_s = time.perf_counter() - start
+    scanned = rss_kib()
+    print(json.dumps({
+        "startup_ms": startup_ms, "lookup_ms": timings, "scan_s": scan_s,
+        "loaded": [loaded[0] - baseline[0], loaded[1] - baseline[1]],
+        "scanned": [scanned[0] - baseline[0], scanned[1] - baseline[1]],
+    }))
+
+
+def measure(mode, db_path, snapshot_path):
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_snapshot", "--child", mode, db_path, snapshot_path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def mib(kib):
+    return f"{kib / 1024:7.1f} MiB"
+
+
+def main():
+    if sys.argv[1:2] == ["--child"]:
+        child(*sys.argv[2:5])
+        return
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else PRODUCTS
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "catalog.db")
+        conn = catalog_db.connect(db_path)
+        ingest.ingest(conn, synthetic_records(products), bulk=True, log=lambda message: None)
+        conn.commit()
+        snapshot_path = snapshot.snapshot_path(db_path)
+        start = time.perf_counter()
+        snapshot.compile_snapshot(conn, snapshot_path)
+        print(f"{products:,} products; snapshot compiled in {time.perf_counter() - start:.1f} s, "
+              f"{os.path.getsize(snapshot_path) / 2**20:.1f} MiB")
+        conn.close()
+
+        for mode in ("sqlite", "snapshot"):
+            result = measure(mode, db_path, snapshot_path)
+            (loaded_anon, loaded_file), (scanned_anon, scanned_file) = result["loaded"], result["scanned"]
+            print(f"{mode:<9} startup {result['startup_ms']:9.1f} ms   "
+                  f"after load: private {mib(loaded_anon)}, file-backed {mib(loaded_file)}")
+            print(f"{'':<9} lookup (by id + by name) {percentiles(result['lookup_ms'])}")
+            print(f"{'':<9} full scan {result['scan_s']:6.2f} s   "
+                  f"after scan: private {mib(scanned_anon)}, file-backed {mib(scanned_file)}")
+
+
+if __name__ == "__main__":
+    main()
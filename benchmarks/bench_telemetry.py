@@ -0,0 +1,113 @@
+"""Overhead of telemetry's statement timing on the repository's read paths.
+
+Two CatalogRepository instances share one 10k-product synthetic catalog. One
+uses plain sqlite3 connections, the other telemetry.TimedConnection. Both run
+the same lookup mix: point gets, id lists, brand lists, uncached searches and
+uncached routine analyses. Each round runs every kind of operation on both,
+back to back and alternating which goes first, so drift on the host hits both
+alike. Overhead is the median over rounds of each pair's timed/plain ratio,
+which holds up far better against a noisy host than comparing best rounds.
+The fixed cost per statement is measured separately, on an in-memory
+primary-key lookup: sampled statements (1 in telemetry.SQL_SAMPLE_EVERY) pay
+for full timing, the rest for timing `execute` only.
+
+Run from the project root:  python -m benchmarks.bench_telemetry [rounds]
+"""
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+import telemetry
+from benchmarks import synthetic_catalog
+from benchmarks.bench_search import load_queries
+from catalog_repository import CatalogRepository
+
+CATALOG_SIZE = 10_000
+ROUNDS = 21
+OPERATIONS = 200  # of each kind, per round
+OVERHEAD_CAP = 0.05
+
+
+def workload(repository, rng):
+    brands = synthetic_catalog.brand_names()[:50]
+    queries = load_queries()
+    return {
+        "get": [(repository.get, rng.randint(1, CATALOG_SIZE)) for _ in range(OPERATIONS)],
+        "get_many": [(repository.get_many, rng.sample(range(1, CATALOG_SIZE + 1), 10)) for _ in range(OPERATIONS)],
+        "by_brand": [(repository.by_brand, rng.choice(brands)) for _ in range(OPERATIONS)],
+        "search": [(repository.search, rng.choice(queries)) for _ in range(OPERATIONS)],
+        "analyze_routine": [(repository.analyze_routine, rng.sample(range(1, CATALOG_SIZE + 1), 5))
+                            for _ in range(OPERATIONS)],
+    }
+
+
+def run(repository, calls):
+    """Seconds for `calls`, starting from empty result caches (the on-disk routine tier is shared)."""
+    repository.search_cache.clear()
+    repository.routine_cache.clear()
+    with repository.writer() as conn:
+        conn.execute("DELETE FROM routine_cache")
+    start = time.perf_counter()
+    for call, argument in calls:
+        call(argument)
+    return time.perf_counter() - start
+
+
+def statement_cost(factory, number=20_000):
+    """µs per primary-key lookup (execute + fetchone) on an in-memory table."""
+    conn = sqlite3.connect(":memory:", factory=factory)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?, ?)", ((i, str(i)) for i in range(1000)))
+    lookup = lambda: conn.execute("SELECT name FROM t WHERE id = ?", (500,)).fetchone()
+    return min(timeit.repeat(lookup, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else ROUNDS
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.db")
+        synthetic_catalog.build(path, CATALOG_SIZE, bulk=True).close()
+        repositories = {}
+        for enabled in (False, True):
+            telemetry.ENABLED = enabled
+            repositories[enabled] = CatalogRepository(path)
+            repositories[enabled].conflict_engine()
+        operations = {enabled: workload(repository, random.Random(5)) for enabled, repository in repositories.items()}
+        kinds = list(operations[False])
+        seconds = {(enabled, kind): [] for enabled in (False, True) for kind in kinds}
+        for number in range(rounds):
+            for kind in kinds:
+                for enabled in ((False, True) if number % 2 else (True, False)):
+                    seconds[enabled, kind].append(run(repositories[enabled], operations[enabled][kind]))
+
+    def overhead(kinds):
+        plain = [sum(seconds[False, kind][i] for kind in kinds) for i in range(rounds)]
+        timed = [sum(seconds[True, kind][i] for kind in kinds) for i in range(rounds)]
+        return statistics.median(t / p for p, t in zip(plain, timed)) - 1, min(plain), min(timed)
+
+    print(f"{CATALOG_SIZE:,} products, {OPERATIONS} operations per kind, {rounds} rounds, "
+          f"1 in {telemetry.SQL_SAMPLE_EVERY} statements sampled")
+    print(f"{'operation':<16} {'plain µs':>10} {'timed µs':>10} {'overhead':>9}")
+    worst = 0.0
+    for kind in kinds:
+        change, plain, timed = overhead([kind])
+        worst = max(worst, change)
+        print(f"{kind:<16} {plain / OPERATIONS * 1e6:10.1f} {timed / OPERATIONS * 1e6:10.1f} {change * 100:+8.1f}%")
+    change, plain, timed = overhead(kinds)
+    print(f"{'whole mix':<16} {plain * 1e3:9.1f}m {timed * 1e3:9.1f}m {change * 100:+8.1f}%")
+    verdict = "ok" if worst <= OVERHEAD_CAP else "OVER"
+    print(f"worst operation {worst * 100:+.1f}% (cap {OVERHEAD_CAP * 100:.0f}%): {verdict}")
+    plain, timed = statement_cost(sqlite3.Connection), statement_cost(telemetry.TimedConnection)
+    print(f"per statement: {plain:.2f} µs plain, {timed:.2f} µs with telemetry (+{timed - plain:.2f} µs)")
+    telemetry.flush()
+    statements = sum(count for count, _, _ in telemetry.STATEMENT_SECONDS.series().values())
+    print(f"{statements:,} statements recorded, {len(telemetry.slow_queries)} slow")
+
+
+if __name__ == "__main__":
+    main()
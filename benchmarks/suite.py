@@ -0,0 +1,239 @@
+"""End-to-end performance suite on seeded synthetic catalogs, with machine-readable results.
+
+For each catalog size (see synthetic_catalog.py):
+  ingest    rows/s through the per-row triggers (up to TRIGGER_INGEST_ROWS rows) and in bulk mode
+  search    ProductSearch latency replaying search_queries.txt: cold, uncached and cached
+  update    per-row UPDATE latency with and without the sync triggers (rolled back afterwards)
+  analysis  ConflictEngine.analyze latency for 5-product routines
+Once per run:
+  render    rerun time and bytes of each page in render_budgets.json, via AppTest (bench_render)
+
+Results are written to benchmarks/results/<commit>.json (or --output), tagged
+with the commit, host and parameters. `--compare` prints the change of every
+metric against an earlier result file.
+
+Run from the project root:  python -m benchmarks.suite [--sizes 10k,100k,1m] [--compare old.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import catalog_db
+import conflicts
+import ingredients
+import search
+from benchmarks import bench_render, synthetic_catalog
+from benchmarks.bench_search import load_queries
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+FORMAT_VERSION = 1
+TRIGGER_INGEST_ROWS = 100_000
+SEARCH_ROUNDS = 3
+UPDATES = 1_000
+ROUTINES = 1_000
+ROUTINE_SIZE = 5
+
+
+def summary(samples):
+    """Latency percentiles in ms, rounded for the JSON file."""
+    ordered = sorted(samples)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+    return {"p50": round(statistics.median(ordered), 4), "p95": round(pick(95), 4),
+            "p99": round(pick(99), 4), "n": len(ordered)}
+
+
+def timed(call, *args):
+    start = time.perf_counter()
+    call(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+# --- MEASUREMENTS ---
+def measure_ingest(tmp, size, seed):
+    """Trigger-path and bulk ingest rates; returns (results, path of the bulk-loaded catalog)."""
+    trigger_rows = min(size, TRIGGER_INGEST_ROWS)
+    start = time.perf_counter()
+    synthetic_catalog.build(os.path.join(tmp, "triggers.db"), trigger_rows, seed).close()
+    trigger_s = time.perf_counter() - start
+    os.remove(os.path.join(tmp, "triggers.db"))
+
+    path = os.path.join(tmp, "catalog.db")
+    start = time.perf_counter()
+    synthetic_catalog.build(path, size, seed, bulk=True).close()
+    bulk_s = time.perf_counter() - start
+    return {
+        "trigger_rows": trigger_rows,
+        "trigger_rows_per_s": round(trigger_rows / trigger_s),
+        "bulk_rows_per_s": round(size / bulk_s),
+        "bulk_s": round(bulk_s, 2),
+        "db_mib": round(os.path.getsize(path) / 2**20, 1),
+    }, path
+
+
+def measure_search(conn):
+    queries = load_queries()
+    engine = search.ProductSearch(conn)
+    cold, uncached, cached = [], [], []
+    for round_number in range(SEARCH_ROUNDS + 1):
+        engine.cache.clear()
+        for query in queries:
+            (cold if round_number == 0 else uncached).append(timed(engine.search, query))
+    for query in queries:
+        cached.append(timed(engine.search, query))
+    return {"cold_ms": summary(cold), "uncached_ms": summary(uncached), "cached_ms": summary(cached)}
+
+
+def measure_updates(conn, rng):
+    """Per-row UPDATE latency of a brand change (FTS triggers) and a label change (postings too)."""
+    ids = rng.sample([row[0] for row in conn.execute("SELECT id FROM products")], UPDATES)
+    labels = {product_id: json.dumps(json.loads(raw)[::-1]) for product_id, raw in conn.execute(
+        f"SELECT id, ingredients_list FROM products WHERE id IN ({', '.join('?' * len(ids))})", ids)}
+    statements = {
+        "brand": lambda product_id: conn.execute(
+            "UPDATE products SET brand = brand || ' Labs' WHERE id = ?", (product_id,)),
+        "ingredients": lambda product_id: conn.execute(
+            "UPDATE products SET ingredients_list = ? WHERE id = ?", (labels[product_id], product_id)),
+    }
+    results = {}
+    for triggers in (True, False):
+        for column, update in statements.items():
+            conn.execute("BEGIN")
+            try:
+                if not triggers:
+                    catalog_db.drop_fts_triggers(conn)
+                    ingredients.drop_triggers(conn)
+                timings = [timed(update, product_id) for product_id in ids]
+            finally:
+                conn.rollback()
+            results[f"{column}_{'with' if triggers else 'without'}_triggers_ms"] = summary(timings)
+    for column in statements:
+        with_triggers = results[f"{column}_with_triggers_ms"]["p50"]
+        without = results[f"{column}_without_triggers_ms"]["p50"]
+        results[f"{column}_trigger_overhead_x"] = round(with_triggers / without, 1) if without else None
+    return results
+
+
+def measure_analysis(conn, rng):
+    engine = conflicts.compile_rules(conn)
+    count = conn.execute("SELECT MAX(id) FROM products").fetchone()[0]
+    routines = [rng.sample(range(1, count + 1), ROUTINE_SIZE) for _ in range(ROUTINES)]
+    findings = 0
+    timings = []
+    for routine in routines:
+        start = time.perf_counter()
+        findings += len(engine.analyze(conn, routine))
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"analyze_ms": summary(timings), "findings_per_routine": round(findings / ROUTINES, 2)}
+
+
+def measure_size(size, seed):
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        results["ingest"], path = measure_ingest(tmp, size, seed)
+        conn = catalog_db.connect(path)
+        try:
+            results["search"] = measure_search(conn)
+            results["update"] = measure_updates(conn, rng)
+            results["analysis"] = measure_analysis(conn, rng)
+        finally:
+            conn.close()
+        return results
+
+
+def measure_render():
+    with open(bench_render.BUDGETS_PATH, encoding="utf-8") as f:
+        config = json.load(f)
+    results = {}
+    for page, budget in config["pages"].items():
+        profiles = bench_render.profile_page(page, budget, config["reruns"])
+        results[page] = {"rerun_ms": summary([profile.ms for profile in profiles]),
+                         "bytes": bench_render.max_bytes(profiles)}
+    return results
+
+
+# --- RESULT FILES ---
+def git_commit():
+    """(short commit hash or None, whether the working tree has uncommitted changes)."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit.stdout.strip(), bool(status.stdout.strip())
+
+
+def flatten(tree, prefix=""):
+    """{"a": {"b": 1}} -> {"a.b": 1}, numbers only."""
+    flat = {}
+    for key, value in tree.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old, new):
+    """Prints every metric present in both result files with its relative change."""
+    print(f"\n{'metric':<66} {old.get('commit') or '?':>12} {new.get('commit') or '?':>12}  change")
+    before, after = flatten(old["results"]), flatten(new["results"])
+    for name, value in after.items():
+        if name in before and not name.endswith(".n"):
+            change = f"{(value - before[name]) / before[name] * 100:+7.1f}%" if before[name] else ""
+            print(f"{name:<66} {before[name]:>12,} {value:>12,}  {change}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DermaScribe end-to-end performance suite.")
+    parser.add_argument("--sizes", default="10k", help="comma-separated catalog sizes, e.g. 10k,100k,1m")
+    parser.add_argument("--seed", type=int, default=synthetic_catalog.SEED)
+    parser.add_argument("--skip-render", action="store_true", help="skip the AppTest page renders")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    commit, dirty = git_commit()
+    report = {
+        "format": FORMAT_VERSION,
+        "commit": commit,
+        "dirty": dirty,
+        "started": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "host": {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                 "platform": platform.platform(), "cpus": os.cpu_count()},
+        "params": {"seed": args.seed, "trigger_ingest_rows": TRIGGER_INGEST_ROWS, "updates": UPDATES,
+                   "routines": ROUTINES, "routine_size": ROUTINE_SIZE, "search_rounds": SEARCH_ROUNDS},
+        "results": {},
+    }
+    for label in args.sizes.split(","):
+        size = synthetic_catalog.parse_size(label)
+        print(f"{size:,} products...", file=sys.stderr)
+        report["results"][label] = measure_size(size, args.seed)
+    if not args.skip_render:
+        print("page renders...", file=sys.stderr)
+        report["results"]["render"] = measure_render()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'local'}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"Wrote {output}", file=sys.stderr)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
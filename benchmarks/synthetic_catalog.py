@@ -0,0 +1,141 @@
+"""Deterministic, seeded synthetic catalogs with a realistic shape, loaded through the real schema.
+
+The 20 real brands lead a long tail of generated ones. Brand popularity,
+category, ingredient-list length and each ingredient are all drawn from
+Zipf-like distributions: a few brands, categories and ingredients (water,
+glycerin) dominate and most are rare, as in real retailer feeds. The
+conflict_rules.json actives are spread through the upper-middle ranks. Each
+appears on a few percent of labels, so routine analysis finds a realistic
+number of conflicts.
+
+The same size and seed always give the same catalog, row for row. Records go
+through `ingest.ingest`, so the products, triggers and derived indexes are
+exactly the ones the app uses.
+
+Run from the project root:
+    python -m benchmarks.synthetic_catalog 100k catalog.db [--seed 1] [--bulk]
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+
+import catalog_db
+import conflicts
+import ingest
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+SEED = 1
+BRAND_COUNT = 2_000
+VOCABULARY = 6_000
+LABEL_LENGTHS = range(4, 61)
+ACTIVES_FROM = 60  # rank of the first conflict-rule active
+ACTIVES_EVERY = 25
+
+# The real brands and name descriptors every synthetic data set draws from.
+# bench_search and bench_recommend import them from here, so editing a
+# benchmark can never change what a seeded catalog contains.
+BRANDS = ["Pond's", "Dot & Key", "Dr. Sheth's", "The Derma Co.", "Mama Earth", "Paula's Choice",
+          "Forest Essentials", "Minimalist", "Plum", "Cetaphil", "Neutrogena", "CeraVe", "Lakme",
+          "Biotique", "Himalaya", "Kama Ayurveda", "Re'equil", "Deconstruct", "Foxtale", "Pilgrim"]
+DESCRIPTORS = ["Bright Beauty", "De-Tan", "CICA Calming", "Blemish Clearing", "Ceramide", "Vitamin C",
+               "10% Niacinamide", "1% Hyaluronic", "2% BHA", "Ubtan", "Green Tea", "Retinol Night",
+               "Salicylic", "Gentle", "Oil-Free", "Hydrating", "Soundarya", "Watermelon", "Aqua", "SPF 50"]
+# bench_search's smaller category -> product-type vocabulary.
+KINDS = {
+    "cleanser": ["Facewash", "Face Wash", "Cleanser", "Foaming Cleanser"],
+    "sunscreen": ["Sunscreen", "Sunscreen Aqua Gel", "Sun Fluid"],
+    "treatment": ["Serum", "Liquid Exfoliant", "Spot Treatment"],
+    "moisturizer": ["Moisturizer", "Gel Cream", "Night Cream"],
+    "toner": ["Toner", "Essence"],
+}
+
+# Category -> product-type words, most common category first.
+CATEGORIES = {
+    "moisturizer": ["Moisturizer", "Gel Cream", "Night Cream", "Day Cream", "Lotion"],
+    "cleanser": ["Face Wash", "Cleanser", "Foaming Cleanser", "Cleansing Balm", "Micellar Water"],
+    "serum": ["Serum", "Ampoule", "Booster", "Concentrate"],
+    "sunscreen": ["Sunscreen", "Sun Fluid", "Sunscreen Aqua Gel", "Sun Stick"],
+    "toner": ["Toner", "Essence", "Mist"],
+    "treatment": ["Spot Treatment", "Liquid Exfoliant", "Peeling Solution"],
+    "mask": ["Sheet Mask", "Clay Mask", "Sleeping Mask"],
+    "eye care": ["Eye Cream", "Under Eye Gel"],
+    "lip care": ["Lip Balm", "Lip Mask"],
+    "face oil": ["Face Oil", "Facial Oil"],
+}
+
+COMMON = ["Aqua", "Glycerin", "Butylene Glycol", "Phenoxyethanol", "Propanediol", "Panthenol",
+          "Sodium Hyaluronate", "Tocopherol", "Allantoin", "Xanthan Gum", "Carbomer", "Dimethicone",
+          "Squalane", "Ceramide NP", "Centella Asiatica", "Zinc PCA", "Fragrance", "Disodium EDTA"]
+
+
+def zipf_weights(count, exponent=1.0):
+    """Cumulative weights for rank-based Zipf sampling with `random.choices(cum_weights=...)`."""
+    return list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+def brand_names(count=BRAND_COUNT):
+    return BRANDS + [f"Brand {i:04d}" for i in range(count - len(BRANDS))]
+
+
+def ingredient_names(count=VOCABULARY):
+    with open(conflicts.RULES_PATH, encoding="utf-8") as f:
+        actives = [name for members in json.load(f)["groups"].values() for name in members]
+    names = COMMON + [f"Ingredient {i:04d}" for i in range(count - len(COMMON) - len(actives))]
+    # Actives are spread over the upper-middle ranks: each is on a few percent of labels.
+    for i, name in enumerate(actives):
+        names.insert(ACTIVES_FROM + ACTIVES_EVERY * i, name)
+    return names
+
+
+def records(count, seed=SEED):
+    """Yields `count` ingest records; identical for identical (count, seed)."""
+    rng = random.Random(seed)
+    brands, categories, vocabulary = brand_names(), list(CATEGORIES), ingredient_names()
+    brand_weights = zipf_weights(len(brands), 1.1)
+    category_weights = zipf_weights(len(categories), 0.8)
+    length_weights = zipf_weights(len(LABEL_LENGTHS), 0.6)
+    ingredient_weights = zipf_weights(len(vocabulary), 1.05)
+    for i in range(count):
+        brand = rng.choices(brands, cum_weights=brand_weights)[0]
+        category = rng.choices(categories, cum_weights=category_weights)[0]
+        length = rng.choices(LABEL_LENGTHS, cum_weights=length_weights)[0]
+        # Oversample, then drop repeats, so the head of the distribution does not shorten labels.
+        drawn = rng.choices(vocabulary, cum_weights=ingredient_weights, k=length * 2)
+        label = list(dict.fromkeys(drawn))[:length]
+        # Most labels lead with water; the rest keep their drawn order (roughly by concentration).
+        if rng.random() < 0.85:
+            label.insert(0, "Aqua")
+        name = f"{brand} {' '.join(rng.sample(DESCRIPTORS, 2))} {rng.choice(CATEGORIES[category])} {i}"
+        yield {"product_name": name, "brand": brand, "category": category,
+               "ingredients_list": list(dict.fromkeys(label))}
+
+
+def parse_size(text):
+    """"100k" -> 100000; also accepts plain integers."""
+    return SIZES.get(text.lower()) or int(text.lower().replace("_", "").replace("k", "000").replace("m", "000000"))
+
+
+def build(path, count, seed=SEED, bulk=False, log=lambda message: None):
+    """Creates (or tops up) the catalog at `path` with `count` products; returns the open connection."""
+    conn = catalog_db.connect(path)
+    ingest.ingest(conn, records(count, seed), bulk=bulk, log=log)
+    conn.commit()
+    return conn
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic DermaScribe catalog.")
+    parser.add_argument("size", type=parse_size, help="product count: 10k, 100k, 1m or a number")
+    parser.add_argument("db", help="database to create or top up")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--bulk", action="store_true", help="suspend per-row triggers and rebuild at the end")
+    args = parser.parse_args(argv)
+    if os.path.exists(args.db):
+        print(f"{args.db} exists; products with the same names are updated in place.")
+    build(args.db, args.size, args.seed, bulk=args.bulk, log=print).close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,500 @@
+"""Connection and schema helpers for the product catalog (products.db)."""
+import argparse
+import json
+import os
+import re
+import sqlite3
+
+import conflicts
+import ingredients
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "products.db")
+
+# --- BASE SCHEMA (as shipped in products.db) ---
+PRODUCTS_SQL = """
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_name TEXT NOT NULL UNIQUE,
+        brand TEXT,
+        category TEXT,
+        ingredients_list TEXT NOT NULL
+    );
+"""
+
+# --- SEARCH TEXT NORMALIZATION ---
+# Brand spellings folded together before indexing and before querying.
+DEFAULT_BRAND_ALIASES = {
+    "mama earth": "mamaearth",
+    "derma co": "dermaco",
+    "derma company": "dermaco",
+    "forest essentials": "forestessentials",
+}
+
+BRAND_ALIASES_SQL = """
+    CREATE TABLE IF NOT EXISTS brand_aliases (
+        alias TEXT PRIMARY KEY,
+        canonical TEXT NOT NULL
+    ) WITHOUT ROWID;
+"""
+
+_PUNCTUATION = str.maketrans("", "", ".-'")
+
+
+# The aliases the index was built with are numbered by 'alias_version' in
+# catalog_meta. The SQL passes it to every normalize_search_text() call, so a
+# connection reloads the table as soon as another one has re-indexed with new
+# aliases, instead of unindexing rows with stale ones.
+_ALIAS_VERSION = "(SELECT value FROM catalog_meta WHERE key = 'alias_version')"
+
+
+class SearchNormalizer:
+    """Lower-cases, strips punctuation and folds brand aliases (the old trigger REPLACE chain)."""
+
+    def __init__(self, aliases, conn=None):
+        self._conn = conn
+        self.version = None
+        self._load(aliases)
+
+    def _load(self, aliases):
+        self.aliases = dict(aliases)
+        # Longest alias first, so "derma company" wins over "derma co".
+        keys = sorted(self.aliases, key=len, reverse=True)
+        self._pattern = re.compile("|".join(map(re.escape, keys))) if keys else None
+
+    def __call__(self, value, version=None):
+        if version != self.version and version is not None and self._conn is not None:
+            self._load(load_brand_aliases(self._conn))
+            self.version = version
+        if value is None:
+            return None
+        text = str(value).lower().replace("&", "and").replace("'s", "").translate(_PUNCTUATION)
+        if self._pattern is not None:
+            text = self._pattern.sub(lambda m: self.aliases[m.group(0)], text)
+        return text
+
+
+def load_brand_aliases(conn):
+    """Reads the alias table, falling back to the defaults before it exists."""
+    try:
+        return dict(conn.execute("SELECT alias, canonical FROM brand_aliases"))
+    except sqlite3.OperationalError:
+        return dict(DEFAULT_BRAND_ALIASES)
+
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def search_tokens(*texts):
+    """JSON array of the words in already-normalized text, split like FTS5's unicode61."""
+    return json.dumps([word for text in texts if text for word in _WORD.findall(text)])
+
+
+def register_functions(conn):
+    """Registers the catalog's SQL functions on `conn`; call again after editing brand_aliases."""
+    normalizer = SearchNormalizer(load_brand_aliases(conn), conn)
+    normalizer.version = alias_version(conn)
+    conn.create_function("normalize_search_text", 1, normalizer, deterministic=True)
+    conn.create_function("normalize_search_text", 2, normalizer, deterministic=True)
+    conn.create_function("search_tokens", -1, search_tokens, deterministic=True)
+    return normalizer
+
+
+def normalize_query(conn, text):
+    """Normalizes a search term exactly the way catalog rows were indexed."""
+    return conn.execute(f"SELECT normalize_search_text(?, {_ALIAS_VERSION})", (text,)).fetchone()[0]
+
+
+# --- FULL-TEXT INDEX ---
+# products_fts reads its content through this view, so an FTS 'rebuild'
+# produces exactly the same tokens as the per-row triggers.
+SEARCH_VIEW_SQL = f"""
+    CREATE VIEW IF NOT EXISTS products_search AS
+        SELECT id,
+               normalize_search_text(product_name, {_ALIAS_VERSION}) AS product_name,
+               normalize_search_text(brand, {_ALIAS_VERSION}) AS brand,
+               LOWER(category) AS category
+        FROM products;
+"""
+
+# prefix='2 3' keeps short search-as-you-type prefixes ("po", "pon") off the
+# main index.
+FTS_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        product_name,
+        brand,
+        category,
+        content='products_search',
+        content_rowid='id',
+        prefix='2 3'
+    );
+"""
+
+# bm25 column weights: name over brand over category.
+FTS_RANK = "bm25(10.0, 4.0, 1.0)"
+
+# Every word ever indexed, with a trigram-tokenized shadow table. search.py
+# uses it to correct misspelled query words against the vocabulary rather than
+# fuzzy-matching whole products. Words are never removed; a stale one can only
+# suggest a correction that then matches nothing.
+SEARCH_TERMS_SQL = """
+    CREATE TABLE IF NOT EXISTS search_terms (
+        id INTEGER PRIMARY KEY,
+        term TEXT NOT NULL UNIQUE
+    );
+
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_terms_trigram USING fts5(
+        term,
+        content='search_terms',
+        content_rowid='id',
+        tokenize='trigram'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS search_terms_ai
+        AFTER INSERT ON search_terms
+    BEGIN
+        INSERT INTO search_terms_trigram(rowid, term) VALUES (new.id, new.term);
+    END;
+"""
+
+# --- CATALOG VERSION ---
+# Bumped by every product write so caches can tell when they are stale.
+CATALOG_META_SQL = """
+    CREATE TABLE IF NOT EXISTS catalog_meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    ) WITHOUT ROWID;
+"""
+
+_BUMP_VERSION = "UPDATE catalog_meta SET value = value + 1 WHERE key = 'catalog_version';"
+
+# Which products changed at which catalog version, one row per product, so
+# derived indexes (recommend.py) can catch up without a full rebuild. Bulk
+# loads bypass the triggers; they set 'rebuilt_version' instead, which tells
+# those indexes to start over.
+CATALOG_CHANGES_SQL = """
+    CREATE TABLE IF NOT EXISTS catalog_changes (
+        product_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS catalog_changes_by_version ON catalog_changes(version);
+"""
+
+
+def catalog_version(conn):
+    """Returns the catalog's change counter."""
+    return conn.execute("SELECT value FROM catalog_meta WHERE key = 'catalog_version'").fetchone()[0]
+
+
+def bump_catalog_version(conn):
+    conn.execute(_BUMP_VERSION)
+
+
+def mark_catalog_rebuilt(conn):
+    """Records that the catalog changed wholesale at the current version (see CATALOG_CHANGES_SQL)."""
+    conn.execute("""
+        INSERT OR REPLACE INTO catalog_meta(key, value)
+            SELECT 'rebuilt_version', value FROM catalog_meta WHERE key = 'catalog_version'
+    """)
+
+
+def changed_since(conn, version):
+    """(ids of products written after `version`, or None if only a full rebuild will do, current version)."""
+    current = catalog_version(conn)
+    rebuilt = conn.execute("SELECT value FROM catalog_meta WHERE key = 'rebuilt_version'").fetchone()
+    if rebuilt is not None and rebuilt[0] > version:
+        return None, current
+    rows = conn.execute("SELECT product_id FROM catalog_changes WHERE version > ?", (version,))
+    return [row[0] for row in rows], current
+
+
+def last_changed(conn, product_ids):
+    """The catalog version at which any of `product_ids` was last written (or the catalog last rebuilt)."""
+    product_ids = list(product_ids)
+    rebuilt = conn.execute("SELECT value FROM catalog_meta WHERE key = 'rebuilt_version'").fetchone()
+    changed = conn.execute(
+        f"SELECT MAX(version) FROM catalog_changes WHERE product_id IN ({', '.join('?' * len(product_ids))})",
+        product_ids,
+    ).fetchone()[0] if product_ids else None
+    return max(rebuilt[0] if rebuilt else 0, changed or 0)
+
+
+def _log_change(prefix):
+    # DELETE + INSERT rather than INSERT OR REPLACE: see the UPSERT note in ingredients.py.
+    return f"""
+        DELETE FROM catalog_changes WHERE product_id = {prefix}.id;
+        INSERT INTO catalog_changes(product_id, version)
+            SELECT {prefix}.id, value FROM catalog_meta WHERE key = 'catalog_version';"""
+
+
+# --- ROUTINE RESULT CACHE (persistent tier, see routine_cache.py) ---
+# Each cached analysis lists its products in routine_cache_members, so the
+# product triggers can drop every entry that mentions a changed product.
+ROUTINE_CACHE_SQL = """
+    CREATE TABLE IF NOT EXISTS routine_cache (
+        fingerprint TEXT PRIMARY KEY,
+        result TEXT NOT NULL,
+        created_at REAL NOT NULL
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS routine_cache_by_age ON routine_cache(created_at);
+
+    CREATE TABLE IF NOT EXISTS routine_cache_members (
+        product_id INTEGER NOT NULL,
+        fingerprint TEXT NOT NULL,
+        PRIMARY KEY (product_id, fingerprint)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS routine_cache_members_by_fingerprint ON routine_cache_members(fingerprint);
+"""
+
+
+def _drop_cached_routines(prefix):
+    return f"""
+        DELETE FROM routine_cache WHERE fingerprint IN
+            (SELECT fingerprint FROM routine_cache_members WHERE product_id = {prefix}.id);
+        DELETE FROM routine_cache_members WHERE product_id = {prefix}.id;"""
+
+
+def _fts_row(prefix):
+    return (
+        f"normalize_search_text({prefix}.product_name, {_ALIAS_VERSION}), "
+        f"normalize_search_text({prefix}.brand, {_ALIAS_VERSION}), "
+        f"LOWER({prefix}.category)"
+    )
+
+
+def _index_row(prefix):
+    return f"""
+        INSERT INTO products_fts(rowid, product_name, brand, category)
+        VALUES ({prefix}.id, {_fts_row(prefix)});
+        INSERT INTO search_terms(term)
+            SELECT DISTINCT j.value FROM json_each(search_tokens({_fts_row(prefix)})) AS j
+            WHERE NOT EXISTS (SELECT 1 FROM search_terms t WHERE t.term = j.value);"""
+
+
+def _unindex_row(prefix):
+    return f"""
+        INSERT INTO products_fts(products_fts, rowid, product_name, brand, category)
+        VALUES ('delete', {prefix}.id, {_fts_row(prefix)});"""
+
+
+FTS_TRIGGERS = {
+    "products_ai": f"""
+    CREATE TRIGGER products_ai
+        AFTER INSERT ON products
+    BEGIN{_index_row("new")}
+        {_BUMP_VERSION}{_log_change("new")}
+    END;
+    """,
+    "products_ad": f"""
+    CREATE TRIGGER products_ad
+        AFTER DELETE ON products
+    BEGIN{_unindex_row("old")}
+        {_BUMP_VERSION}{_log_change("old")}{_drop_cached_routines("old")}
+    END;
+    """,
+    "products_au": f"""
+    CREATE TRIGGER products_au
+        AFTER UPDATE ON products
+    BEGIN{_unindex_row("old")}{_index_row("new")}
+        {_BUMP_VERSION}{_log_change("old")}{_log_change("new")}{_drop_cached_routines("old")}
+    END;
+    """,
+}
+
+
+def create_fts_triggers(conn):
+    """(Re)creates whichever FTS sync triggers are missing."""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    for name, sql in FTS_TRIGGERS.items():
+        if name not in existing:
+            conn.execute(sql)
+
+
+def drop_fts_triggers(conn):
+    for name in FTS_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def rebuild_search_indexes(conn):
+    """Rebuilds products_fts from the products_search view and tops up search_terms."""
+    conn.execute("INSERT INTO products_fts(products_fts) VALUES('rebuild')")
+    conn.execute("""
+        INSERT INTO search_terms(term)
+            SELECT DISTINCT j.value
+            FROM products_search AS p, json_each(search_tokens(p.product_name, p.brand, p.category)) AS j
+            WHERE NOT EXISTS (SELECT 1 FROM search_terms t WHERE t.term = j.value)
+    """)
+    bump_catalog_version(conn)
+    mark_catalog_rebuilt(conn)
+
+
+def alias_version(conn):
+    """Version of the brand aliases products_fts was built with, or None before it is tracked."""
+    try:
+        row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'alias_version'").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+def reindex_fts(conn):
+    """Reloads the brand aliases and rebuilds products_fts from scratch; other connections follow."""
+    conn.execute("UPDATE catalog_meta SET value = value + 1 WHERE key = 'alias_version'")
+    register_functions(conn)
+    rebuild_search_indexes(conn)
+    conn.commit()
+
+
+def add_brand_alias(conn, alias, canonical):
+    """Adds or changes an alias and re-indexes so existing rows pick it up."""
+    conn.execute(
+        "INSERT OR REPLACE INTO brand_aliases(alias, canonical) VALUES (lower(?), lower(?))",
+        (alias, canonical),
+    )
+    reindex_fts(conn)
+
+
+# --- MIGRATIONS (tracked with PRAGMA user_version) ---
+def _migrate_table_driven_normalizer(conn):
+    """Swaps the nested-REPLACE triggers for normalize_search_text() and brand_aliases."""
+    # The view and triggers read 'alias_version', so catalog_meta must exist before the rebuild.
+    conn.executescript(CATALOG_META_SQL + BRAND_ALIASES_SQL)
+    conn.executemany(
+        "INSERT OR IGNORE INTO brand_aliases(alias, canonical) VALUES (?, ?)", DEFAULT_BRAND_ALIASES.items()
+    )
+    register_functions(conn)
+    drop_fts_triggers(conn)
+    conn.execute("DROP TABLE IF EXISTS products_fts")
+    conn.executescript(SEARCH_VIEW_SQL + FTS_SQL)
+    create_fts_triggers(conn)
+    conn.execute("INSERT INTO products_fts(products_fts) VALUES('rebuild')")
+
+
+def _migrate_upsert_safe_posting_triggers(conn):
+    """Recreates the posting triggers so they tolerate UPSERTs into products."""
+    ingredients.drop_triggers(conn)
+    ingredients.create_triggers(conn)
+
+
+def _migrate_prefix_search(conn):
+    """Adds prefix indexes, bm25 weights, the search vocabulary and the catalog version."""
+    conn.executescript(CATALOG_META_SQL + SEARCH_TERMS_SQL)
+    conn.execute("INSERT OR IGNORE INTO catalog_meta(key, value) VALUES ('catalog_version', 0)")
+    drop_fts_triggers(conn)
+    conn.execute("DROP TABLE IF EXISTS products_fts")
+    conn.executescript(FTS_SQL)
+    conn.execute("INSERT INTO products_fts(products_fts, rank) VALUES ('rank', ?)", (FTS_RANK,))
+    create_fts_triggers(conn)
+    rebuild_search_indexes(conn)
+
+
+def _migrate_brand_category_indexes(conn):
+    """Indexes the repository's by-brand and by-category lookups."""
+    conn.execute("CREATE INDEX IF NOT EXISTS products_by_brand ON products(brand COLLATE NOCASE)")
+    conn.execute("CREATE INDEX IF NOT EXISTS products_by_category ON products(category COLLATE NOCASE)")
+
+
+def _migrate_catalog_changes(conn):
+    """Adds the per-product change log and has the FTS triggers write to it."""
+    conn.executescript(CATALOG_CHANGES_SQL)
+    drop_fts_triggers(conn)
+    create_fts_triggers(conn)
+    mark_catalog_rebuilt(conn)
+
+
+def _migrate_routine_cache(conn):
+    """Adds the persistent routine-analysis cache and has the product triggers invalidate it."""
+    conn.executescript(ROUTINE_CACHE_SQL)
+    drop_fts_triggers(conn)
+    create_fts_triggers(conn)
+
+
+def _migrate_alias_version(conn):
+    """Versions the brand aliases, so connections opened before an alias edit pick it up."""
+    conn.executescript(CATALOG_META_SQL)
+    conn.execute("INSERT OR IGNORE INTO catalog_meta(key, value) VALUES ('alias_version', 0)")
+    conn.execute("DROP VIEW IF EXISTS products_search")
+    conn.executescript(SEARCH_VIEW_SQL)
+    drop_fts_triggers(conn)
+    create_fts_triggers(conn)
+
+
+def _migrate_rule_ingredients(conn):
+    """Registers the conflict rules' ingredients, so compiling the rules never writes."""
+    conflicts.register_ingredients(conn)
+
+
+MIGRATIONS = [
+    ingredients.ensure_schema,
+    _migrate_table_driven_normalizer,
+    _migrate_upsert_safe_posting_triggers,
+    _migrate_prefix_search,
+    _migrate_brand_category_indexes,
+    _migrate_catalog_changes,
+    _migrate_routine_cache,
+    _migrate_alias_version,
+    _migrate_rule_ingredients,
+]
+
+
+def ensure_schema(conn):
+    """Creates any missing catalog tables and applies pending migrations.
+
+    Rule ingredients are registered again whenever conflict_rules.json changes.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= len(MIGRATIONS):
+        conflicts.register_ingredients(conn)
+        conn.commit()
+        return
+    conn.executescript(PRODUCTS_SQL)
+    for number, migrate in enumerate(MIGRATIONS[version:], start=version + 1):
+        migrate(conn)
+        conn.execute(f"PRAGMA user_version = {number}")
+    conn.commit()
+
+
+# Connection settings shared by every long-lived connection: read-only ones
+# (the Streamlit repository's pool, batch_analyze workers) and the single writer.
+READ_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA temp_store = MEMORY",
+)
+
+WRITE_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+)
+
+
+def connect(path=DB_PATH, **kwargs):
+    """Opens the catalog database, bringing its schema up to date."""
+    conn = sqlite3.connect(path, **kwargs)
+    register_functions(conn)
+    ensure_schema(conn)
+    return conn
+
+
+# --- COMMAND LINE ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DermaScribe catalog maintenance.")
+    parser.add_argument("--db", default=DB_PATH, help="path to products.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("reindex", help="rebuild products_fts after editing brand_aliases")
+    alias = commands.add_parser("add-alias", help="add a brand alias and re-index")
+    alias.add_argument("alias")
+    alias.add_argument("canonical")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    if args.command == "add-alias":
+        add_brand_alias(conn, args.alias, args.canonical)
+    else:
+        reindex_fts(conn)
+    count = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    print(f"Re-indexed {count} products.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Shared, read-optimized access to products.db for the Streamlit pages.
+
+One `CatalogRepository` per server process (see `get_repository`) hands out
+read-only connections from a pool, so concurrent sessions read in parallel
+under WAL instead of reopening the file on every rerun. Catalog writes go
+through the single writer connection.
+
+Streamlit runs every rerun on a fresh thread, so connections are checked out
+of a pool rather than kept per thread, which would reopen them on every click.
+"""
+import contextlib
+import json
+import queue
+import sqlite3
+import threading
+from typing import NamedTuple, Optional
+from urllib.parse import quote
+
+import streamlit as st
+
+import catalog_db
+import conflicts
+import recommend
+import routine_cache
+import search
+import telemetry
+
+STATEMENT_CACHE = 256
+
+_PRODUCT_COLUMNS = "id, product_name, brand, category, ingredients_list"
+
+
+class Product(NamedTuple):
+    id: int
+    product_name: str
+    brand: Optional[str]
+    category: Optional[str]
+    ingredients: list
+
+    @classmethod
+    def from_row(cls, row):
+        try:
+            names = json.loads(row[4])
+        except ValueError:
+            names = []
+        return cls(row[0], row[1], row[2], row[3], names)
+
+
+class _Reader:
+    """A pooled read-only connection plus the search state that belongs to it."""
+
+    def __init__(self, path, search_cache):
+        uri = f"file:{quote(path)}?mode=ro"
+        self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=STATEMENT_CACHE,
+                                    factory=telemetry.connection_class())
+        catalog_db.register_functions(self.conn)
+        for pragma in catalog_db.READ_PRAGMAS:
+            self.conn.execute(pragma)
+        self.search = search.ProductSearch(self.conn, cache=search_cache)
+
+
+class CatalogRepository:
+    """Typed catalog lookups over pooled read-only connections."""
+
+    def __init__(self, path=catalog_db.DB_PATH):
+        self.path = path
+        self.search_cache = search.QueryCache()
+        self._idle = queue.SimpleQueue()
+        self._write_lock = threading.Lock()
+        self._recommendations = None
+        self._recommendations_lock = threading.Lock()
+        self.routine_cache = routine_cache.RoutineCache()
+        self._conflict_engine = None
+        # Opening the writer first applies migrations and switches the file to WAL,
+        # both of which the read-only connections depend on.
+        self._writer = catalog_db.connect(path, check_same_thread=False, cached_statements=STATEMENT_CACHE,
+                                          factory=telemetry.connection_class())
+        for pragma in catalog_db.WRITE_PRAGMAS:
+            self._writer.execute(pragma)
+
+    @contextlib.contextmanager
+    def _reader(self):
+        try:
+            reader = self._idle.get_nowait()
+        except queue.Empty:
+            reader = _Reader(self.path, self.search_cache)
+        try:
+            yield reader
+        finally:
+            self._idle.put(reader)
+
+    @contextlib.contextmanager
+    def writer(self):
+        """Serializes access to the writer connection; commits on success."""
+        with self._write_lock:
+            try:
+                yield self._writer
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+
+    # --- LOOKUPS ---
+    def get(self, product_id) -> Optional[Product]:
+        with self._reader() as reader:
+            row = reader.conn.execute(f"SELECT {_PRODUCT_COLUMNS} FROM products WHERE id = ?", (product_id,)).fetchone()
+        return Product.from_row(row) if row else None
+
+    def get_many(self, product_ids) -> list:
+        """Products for `product_ids`, in the order given; unknown ids are skipped."""
+        product_ids = list(product_ids)
+        if not product_ids:
+            return []
+        placeholders = ", ".join("?" * len(product_ids))
+        with self._reader() as reader:
+            rows = reader.conn.execute(
+                f"SELECT {_PRODUCT_COLUMNS} FROM products WHERE id IN ({placeholders})", product_ids
+            ).fetchall()
+        found = {row[0]: Product.from_row(row) for row in rows}
+        return [found[i] for i in product_ids if i in found]
+
+    def get_by_name(self, product_name) -> Optional[Product]:
+        with self._reader() as reader:
+            row = reader.conn.execute(
+                f"SELECT {_PRODUCT_COLUMNS} FROM products WHERE product_name = ?", (product_name,)
+            ).fetchone()
+        return Product.from_row(row) if row else None
+
+    def by_brand(self, brand, limit=50) -> list:
+        with self._reader() as reader:
+            rows = reader.conn.execute(
+                f"SELECT {_PRODUCT_COLUMNS} FROM products WHERE brand = ? COLLATE NOCASE ORDER BY id LIMIT ?",
+                (brand, limit),
+            ).fetchall()
+        return [Product.from_row(row) for row in rows]
+
+    def by_category(self, category, limit=50) -> list:
+        with self._reader() as reader:
+            rows = reader.conn.execute(
+                f"SELECT {_PRODUCT_COLUMNS} FROM products WHERE category = ? COLLATE NOCASE ORDER BY id LIMIT ?",
+                (category, limit),
+            ).fetchall()
+        return [Product.from_row(row) for row in rows]
+
+    def search(self, text, limit=10) -> list:
+        """Search-as-you-type results (`search.SearchResult`), best first."""
+        with self._reader() as reader:
+            return reader.search.search(text, limit)
+
+    # --- RECOMMENDATIONS ---
+    def _recommendation_index(self, conn):
+        """The shared recommend.RecommendationIndex, loaded on first use and caught up with catalog writes."""
+        with self._recommendations_lock:
+            if self._recommendations is None:
+                self._recommendations = recommend.open_index(conn, recommend.index_path(self.path))
+            elif self._recommendations.version != catalog_db.catalog_version(conn):
+                self._recommendations.refresh(conn)
+            return self._recommendations
+
+    def similar_products(self, product_id, k=10, category=None, dupes=False) -> list:
+        """`recommend.Recommendation`s for products like `product_id`; dupes=True keeps other brands only."""
+        with self._reader() as reader:
+            return self._recommendation_index(reader.conn).similar(reader.conn, product_id, k, category=category, dupes=dupes)
+
+    def recommend_for_profile(self, profile, k=10, category=None) -> list:
+        """`recommend.Recommendation`s for one of `recommend.SKIN_PROFILES`."""
+        with self._reader() as reader:
+            return self._recommendation_index(reader.conn).for_profile(reader.conn, profile, k, category=category)
+
+    # --- ROUTINE ANALYSIS ---
+    def conflict_engine(self) -> conflicts.ConflictEngine:
+        """The compiled conflict rules, compiled on first use."""
+        if self._conflict_engine is None:
+            with self._reader() as reader:
+                self._conflict_engine = conflicts.compile_rules(reader.conn)
+        return self._conflict_engine
+
+    def analyze_routine(self, product_ids) -> list:
+        """`conflicts.Finding`s for a routine, shared across sessions through `routine_cache`."""
+        engine = self.conflict_engine()
+        with self._reader() as reader:
+            return self.routine_cache.analyze(reader.conn, engine, product_ids, writer=self.writer)
+
+    def catalog_version(self) -> int:
+        with self._reader() as reader:
+            return catalog_db.catalog_version(reader.conn)
+
+
+@st.cache_resource
+def get_repository():
+    """The process-wide repository, shared by every session."""
+    return CatalogRepository()
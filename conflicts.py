@@ -0,0 +1,171 @@
+"""Ingredient-conflict engine behind the Product Analyzer.
+
+`conflict_rules.json` is compiled once into bitsets over the small set of
+ingredients that take part in any rule. Each product becomes an integer mask,
+so checking a routine is one AND per product against everything seen so far;
+string comparisons only happen when a conflict actually exists.
+
+Rule ingredients are added to the catalog's dictionary by `register_ingredients`,
+which `catalog_db.ensure_schema` runs whenever the rules file changes, so
+compiling only reads and works on read-only connections.
+"""
+import hashlib
+import json
+import os
+from typing import NamedTuple
+
+import ingredients
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "conflict_rules.json")
+
+SEVERITY_RANK = {"low": 1, "medium": 2, "high": 3}
+
+
+class Finding(NamedTuple):
+    product_a: int
+    product_b: int
+    ingredient_a: str
+    ingredient_b: str
+    severity: str
+    note: str
+
+
+def _bits(mask):
+    """Yields the indexes of the set bits in `mask`."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class ConflictEngine:
+    """Compiled rule set; build it with `compile_rules`."""
+
+    def __init__(self, bit_of, names, conflict_masks, pair_rules, version):
+        self.bit_of = bit_of                  # ingredient id -> bit index
+        self.names = names                    # bit index -> canonical ingredient name
+        self.conflict_masks = conflict_masks  # bit index -> mask of bits it conflicts with
+        self.pair_rules = pair_rules          # (bit, bit) -> (severity, note)
+        self.version = version
+        self._expanded = {}
+
+    def product_mask(self, ingredient_ids):
+        """Folds a product's ingredient ids into its rule-relevant bitset."""
+        mask = 0
+        for ingredient_id in ingredient_ids:
+            bit = self.bit_of.get(ingredient_id)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def _conflicts_of(self, mask):
+        expanded = self._expanded.get(mask)
+        if expanded is None:
+            expanded = 0
+            for bit in _bits(mask):
+                expanded |= self.conflict_masks[bit]
+            self._expanded[mask] = expanded
+        return expanded
+
+    def analyze_masks(self, items):
+        """Finds conflicts between `(product_id, mask)` pairs, in routine order."""
+        findings = []
+        seen = 0
+        owners = {}  # bit -> earlier products carrying it
+        for product_id, mask in items:
+            if self._conflicts_of(mask) & seen:
+                for bit in _bits(mask):
+                    for other_bit in _bits(self.conflict_masks[bit] & seen):
+                        severity, note = self.pair_rules[bit, other_bit]
+                        for other_product in owners[other_bit]:
+                            if other_product == product_id:
+                                continue
+                            findings.append(Finding(
+                                other_product, product_id,
+                                self.names[other_bit], self.names[bit],
+                                severity, note,
+                            ))
+            seen |= mask
+            for bit in _bits(mask):
+                owners.setdefault(bit, []).append(product_id)
+        findings.sort(key=lambda f: -SEVERITY_RANK[f.severity])
+        return findings
+
+    def analyze(self, conn, product_ids):
+        """Loads the routine's postings from the catalog and returns its conflicts."""
+        product_ids = list(dict.fromkeys(product_ids))
+        if not product_ids:
+            return []
+        placeholders = ", ".join("?" * len(product_ids))
+        masks = dict.fromkeys(product_ids, 0)
+        rows = conn.execute(
+            f"SELECT product_id, ingredient_id FROM product_ingredients WHERE product_id IN ({placeholders})",
+            product_ids,
+        )
+        for product_id, ingredient_id in rows:
+            bit = self.bit_of.get(ingredient_id)
+            if bit is not None:
+                masks[product_id] |= 1 << bit
+        return self.analyze_masks(masks.items())
+
+
+def _read_rules(path):
+    """(parsed rules, version): the version is a short hash of the file."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    return json.loads(raw), hashlib.sha256(raw).hexdigest()[:12]
+
+
+def register_ingredients(conn, path=RULES_PATH):
+    """Adds every rule ingredient to the dictionary; a no-op until the rules file changes.
+
+    Registering them up front means products added later resolve to the ids a
+    compiled engine already knows. The caller commits.
+    """
+    spec, version = _read_rules(path)
+    row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'rules_version'").fetchone()
+    if row is not None and row[0] == int(version, 16):
+        return
+    for members in spec["groups"].values():
+        for name in members:
+            ingredients.ensure_ingredient(conn, name)
+    conn.execute("INSERT OR REPLACE INTO catalog_meta(key, value) VALUES ('rules_version', ?)", (int(version, 16),))
+
+
+def compile_rules(conn, path=RULES_PATH):
+    """Compiles the rules file against the catalog's ingredient dictionary; only reads from `conn`.
+
+    A rule ingredient the dictionary has never seen (the rules file changed and
+    the catalog has not been opened with `catalog_db.connect` since) is left out:
+    no product can contain it yet.
+    """
+    spec, version = _read_rules(path)
+
+    bit_of, names, group_bits = {}, [], {}
+    for group, members in spec["groups"].items():
+        group_bits[group] = 0
+        for name in members:
+            ingredient_id = ingredients.resolve(conn, name)
+            if ingredient_id is None:
+                continue
+            if ingredient_id not in bit_of:
+                bit_of[ingredient_id] = len(names)
+                names.append(conn.execute("SELECT name FROM ingredients WHERE id = ?", (ingredient_id,)).fetchone()[0])
+            group_bits[group] |= 1 << bit_of[ingredient_id]
+
+    conflict_masks = [0] * len(names)
+    pair_rules = {}
+    for rule in spec["rules"]:
+        severity = rule["severity"]
+        if severity not in SEVERITY_RANK:
+            raise ValueError(f"Unknown severity {severity!r} in {path}")
+        entry = (severity, rule["note"])
+        for bit_a in _bits(group_bits[rule["a"]]):
+            for bit_b in _bits(group_bits[rule["b"]]):
+                for x, y in ((bit_a, bit_b), (bit_b, bit_a)):
+                    current = pair_rules.get((x, y))
+                    if current is None or SEVERITY_RANK[severity] > SEVERITY_RANK[current[0]]:
+                        pair_rules[x, y] = entry
+                    conflict_masks[x] |= 1 << y
+
+    return ConflictEngine(bit_of, names, conflict_masks, pair_rules, version)
@@ -0,0 +1,11 @@
+import pytest
+
+import catalog_db
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    """A connection to an empty, fully migrated catalog in a temporary directory."""
+    conn = catalog_db.connect(str(tmp_path / "catalog.db"))
+    yield conn
+    conn.close()
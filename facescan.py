@@ -0,0 +1,310 @@
+"""FaceScan: CPU skin analysis of an uploaded photo, run off the Streamlit script thread.
+
+`FaceScanService.submit(photo_bytes)` returns a `concurrent.futures.Future` right
+away. A dispatcher thread groups the requests that arrive while the workers are
+busy into micro-batches of up to `max_batch` photos. It hands each batch to a
+process pool, where every photo is downsampled with Pillow and the whole batch
+goes through the model in one vectorized call. Results are cached by the
+photo's sha256, and identical uploads already in flight share one future.
+
+The model is pluggable. Any class with a `predict(batch)` method works (see
+`ReferenceSkinModel`); name it as "module:Class", or set
+DERMASCRIBE_FACESCAN_MODEL.
+"""
+import functools
+import hashlib
+import importlib
+import io
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple
+
+import numpy as np
+import streamlit as st
+
+INPUT_SIZE = 256  # photos are center-cropped and downsampled to INPUT_SIZE x INPUT_SIZE
+GRID = 32  # heatmap resolution
+HEATMAPS = ("redness", "oiliness", "spots")
+DEFAULT_MODEL = os.environ.get("DERMASCRIBE_FACESCAN_MODEL", "facescan:ReferenceSkinModel")
+MAX_BATCH = 8
+# Batches form on their own from requests that queue while every worker is busy,
+# so by default an idle pool gets a request at once rather than lingering for company.
+MAX_WAIT_MS = 0
+MIN_SKIN_COVERAGE = 0.05
+# Uploads larger than this are refused before decoding (about 7000 x 7000; phone cameras stay under it).
+MAX_IMAGE_PIXELS = 50_000_000
+
+
+class ScanResult(NamedTuple):
+    digest: str
+    model: str
+    scores: dict  # HEATMAPS name -> 0..1, averaged over skin
+    heatmaps: np.ndarray  # float16 (len(HEATMAPS), GRID, GRID), 0..1
+    skin_coverage: float  # share of the photo that looks like skin
+
+    @property
+    def usable(self):
+        return self.skin_coverage >= MIN_SKIN_COVERAGE
+
+
+def image_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def downsample(data, size=INPUT_SIZE):
+    """Decodes an upload straight to a `size` x `size` RGB uint8 array.
+
+    Raises ValueError for anything that cannot be decoded, including decompression bombs.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.width * image.height > MAX_IMAGE_PIXELS:
+            raise Image.DecompressionBombError(f"{image.width} x {image.height} pixels")
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale, which skips most of the work for phone photos.
+        image.draft("RGB", (size * 2, size * 2))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image = ImageOps.fit(image, (size, size), Image.BILINEAR)
+        return np.asarray(image, dtype=np.uint8)
+    except Image.DecompressionBombError:
+        raise ValueError("image is too large") from None
+    except Exception:  # decoders also raise SyntaxError, struct.error, EOFError, ...
+        raise ValueError("not a readable image") from None
+
+
+# --- REFERENCE MODEL ---
+def _box_mean(x, radius):
+    """Mean over a (2r+1)^2 window for each (N, H, W) plane, edges clamped, via summed-area tables."""
+    k = 2 * radius + 1
+    padded = np.pad(x, ((0, 0), (radius + 1, radius), (radius + 1, radius)), mode="edge")
+    table = padded.cumsum(1, dtype=np.float64).cumsum(2)
+    window = table[:, k:, k:] - table[:, :-k, k:] - table[:, k:, :-k] + table[:, :-k, :-k]
+    return (window / (k * k)).astype(np.float32)
+
+
+def _pool(x, grid=GRID):
+    n, h, w = x.shape
+    return x.reshape(n, grid, h // grid, grid, w // grid).mean(axis=(2, 4))
+
+
+class ReferenceSkinModel:
+    """Hand-tuned color and texture cues in plain NumPy; a stand-in until a trained model ships.
+
+    - redness: red-over-green chromaticity (an erythema index proxy)
+    - oiliness: bright, desaturated specular highlights above the local mean
+    - spots: small patches darker than their surroundings
+    Each map is only counted on pixels that pass a loose skin-tone test.
+    """
+
+    name = "reference-numpy"
+    version = 1
+
+    def predict(self, batch):
+        """(N, S, S, 3) uint8 -> (heatmaps (N, 3, GRID, GRID), skin (N, GRID, GRID)), all 0..1."""
+        rgb = batch.astype(np.float32) / 255.0
+        r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+        luma = 0.299 * r + 0.587 * g + 0.114 * b
+        high, low = rgb.max(axis=-1), rgb.min(axis=-1)
+        saturation = (high - low) / (high + 1e-6)
+        skin = ((r > 0.35) & (r > g) & (r > b) & (r - low > 0.06)).astype(np.float32)
+
+        erythema = (r - g) / (r + g + 1e-6)
+        redness = _box_mean(np.clip((erythema - 0.10) / 0.25, 0, 1) * skin, 4)
+        specular = np.clip((luma - _box_mean(luma, 8) - 0.05) / 0.2, 0, 1) * np.clip((0.35 - saturation) / 0.35, 0, 1)
+        oiliness = _box_mean(specular * skin, 6)
+        dark = np.clip((_box_mean(luma, 6) - luma - 0.04) / 0.12, 0, 1)
+        spots = _box_mean(dark * skin, 8)
+
+        heatmaps = np.stack([_pool(redness), _pool(oiliness), _pool(spots)], axis=1)
+        return heatmaps, _pool(skin)
+
+
+def load_model(spec):
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+# --- WORKER PROCESS ---
+_worker_model = None
+
+
+def _init_worker(spec):
+    global _worker_model
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    _worker_model = load_model(spec)
+
+
+def _scan_batch(items):
+    """Runs in a pool worker: [(digest, bytes)] -> [ScanResult or ValueError], in order."""
+    model = _worker_model
+    label = f"{model.name}/{model.version}"
+    results = [None] * len(items)
+    arrays, positions = [], []
+    for i, (digest, data) in enumerate(items):
+        try:
+            arrays.append(downsample(data))
+            positions.append(i)
+        except ValueError as e:
+            results[i] = e
+    if arrays:
+        heatmaps, skin = model.predict(np.stack(arrays))
+        for j, i in enumerate(positions):
+            coverage = float(skin[j].mean())
+            weight = skin[j].sum() or 1.0
+            scores = {name: float((heatmaps[j, k] * skin[j]).sum() / weight) for k, name in enumerate(HEATMAPS)}
+            results[i] = ScanResult(items[i][0], label, scores, heatmaps[j].astype(np.float16), coverage)
+    return results
+
+
+# --- SERVICE ---
+_STOP = object()
+
+
+class FaceScanService:
+    """Asynchronous, micro-batched FaceScan over a process pool, with a result cache keyed by photo hash."""
+
+    def __init__(self, model=DEFAULT_MODEL, workers=None, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, cache_entries=512):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.cache_entries = cache_entries
+        self.stats = Counter()
+        self.model = model
+        self._pool = self._new_pool()
+        self._pending = queue.SimpleQueue()
+        # At most two batches per worker are queued in the pool. Anything beyond
+        # that waits here, where it can still join a larger batch.
+        self._slots = threading.Semaphore(self.workers * 2)
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._dispatcher = threading.Thread(target=self._dispatch, name="facescan-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def _new_pool(self):
+        # spawn and forkserver workers re-execute sys.modules["__main__"], which under
+        # Streamlit is the page script, so fork wherever the platform has it.
+        method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+        return ProcessPoolExecutor(
+            self.workers, mp_context=multiprocessing.get_context(method),
+            initializer=_init_worker, initargs=(self.model,),
+        )
+
+    def submit(self, data) -> Future:
+        """Queues one photo; the future resolves to a ScanResult, or raises ValueError for unreadable
+        input and BrokenProcessPool if the worker scanning it crashed."""
+        digest = image_digest(data)
+        with self._lock:
+            cached = self._cache.get(digest)
+            if cached is not None:
+                self._cache.move_to_end(digest)
+                self.stats["hits"] += 1
+                future = Future()
+                future.set_result(cached)
+                return future
+            future = self._inflight.get(digest)
+            if future is not None:
+                self.stats["joined"] += 1
+                return future
+            self.stats["misses"] += 1
+            future = self._inflight[digest] = Future()
+        self._pending.put((digest, data, future))
+        return future
+
+    def scan(self, data, timeout=None) -> ScanResult:
+        return self.submit(data).result(timeout)
+
+    def _dispatch(self):
+        while True:
+            first = self._pending.get()
+            if first is _STOP:
+                return
+            self._slots.acquire()
+            batch, stopping = [first], False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._pending.get(timeout=remaining) if remaining > 0 else self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self.stats["batches"] += 1
+            self.stats["batched"] += len(batch)
+            self._submit(batch)
+            if stopping:
+                return
+
+    def _submit(self, batch):
+        """Hands `batch` to the pool. The dispatcher must never die, so failures only fail this batch."""
+        items = [(digest, data) for digest, data, _ in batch]
+        for _ in range(2):
+            with self._lock:
+                pool = self._pool
+            try:
+                work = pool.submit(_scan_batch, items)
+                break
+            except BrokenProcessPool:  # a worker crashed before _finish saw it; retry once on a new pool
+                self._replace_pool(pool)
+            except Exception as e:
+                work = Future()
+                work.set_exception(e)
+                break
+        else:
+            work = Future()
+            work.set_exception(BrokenProcessPool("FaceScan workers crashed twice in a row"))
+        # Runs _finish at once if `work` has already failed, which also frees the slot.
+        work.add_done_callback(functools.partial(self._finish, pool, batch))
+
+    def _replace_pool(self, pool):
+        # A crashed worker (e.g. out of memory) breaks the pool for good; replace it once.
+        with self._lock:
+            if pool is not self._pool:
+                return
+            self.stats["pool_restarts"] += 1
+            self._pool = self._new_pool()
+        pool.shutdown(wait=False)
+
+    def _finish(self, pool, batch, work):
+        self._slots.release()
+        try:
+            results = work.result()
+        except Exception as e:  # the worker died; fail the whole batch
+            results = [e] * len(batch)
+        if isinstance(results[0], BrokenProcessPool):
+            self._replace_pool(pool)
+        with self._lock:
+            for (digest, _, _), result in zip(batch, results):
+                self._inflight.pop(digest, None)
+                if isinstance(result, ScanResult):
+                    self._cache[digest] = result
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        for (_, _, future), result in zip(batch, results):
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        self._pending.put(_STOP)
+        self._dispatcher.join()
+        self._pool.shutdown()
+
+
+@st.cache_resource
+def get_service():
+    """The process-wide FaceScan service, shared by every session."""
+    return FaceScanService()
@@ -0,0 +1,260 @@
+"""Normalized ingredient dictionary and inverted index for the product catalog.
+
+`products.ingredients_list` stays the source of truth (a JSON array of label
+names). The triggers below mirror it into `product_ingredients`, a posting
+table keyed by canonical ingredient id, so "which products contain X" is an
+index probe instead of a `json.loads` over every row.
+"""
+
+# --- CANONICAL NAMES AND LABEL SYNONYMS ---
+# Canonical name -> other spellings seen on labels. Matching is on
+# lower(trim(name)), so only genuinely different spellings belong here.
+SEED_SYNONYMS = {
+    "Water": ["Aqua", "Eau"],
+    "Centella Asiatica": ["CICA", "Centella", "Gotu Kola", "Centella Asiatica Extract"],
+    "Ascorbic Acid": ["Vitamin C", "L-Ascorbic Acid"],
+    "Tocopherol": ["Vitamin E"],
+    "Niacinamide": ["Nicotinamide", "Vitamin B3"],
+}
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS ingredients (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE COLLATE NOCASE
+    );
+
+    CREATE TABLE IF NOT EXISTS ingredient_synonyms (
+        alias TEXT PRIMARY KEY,
+        ingredient_id INTEGER NOT NULL REFERENCES ingredients(id)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS product_ingredients (
+        product_id INTEGER NOT NULL,
+        ingredient_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (product_id, ingredient_id)
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS product_ingredients_by_ingredient
+        ON product_ingredients(ingredient_id, product_id);
+"""
+
+# Malformed JSON must not make a product insert fail, so it is indexed as an
+# empty list (the row itself is still stored untouched).
+_ITEMS = "json_each(CASE WHEN json_valid({col}) THEN {col} ELSE '[]' END)"
+
+# Register unseen names, give each a self-alias, then write the postings.
+# A product listing two synonyms (e.g. "Aqua" and "Water") keeps the first.
+# Duplicates are filtered explicitly rather than with INSERT OR IGNORE, because
+# an UPSERT on products overrides the conflict policy of trigger statements.
+_INDEX_NEW_ROW = """
+        INSERT INTO ingredients(name)
+            SELECT MIN(trim(j.value)) FROM {items} AS j
+            WHERE j.type = 'text' AND trim(j.value) != ''
+              AND NOT EXISTS (SELECT 1 FROM ingredient_synonyms s WHERE s.alias = lower(trim(j.value)))
+              AND NOT EXISTS (SELECT 1 FROM ingredients i WHERE i.name = trim(j.value))
+            GROUP BY lower(trim(j.value));
+
+        INSERT INTO ingredient_synonyms(alias, ingredient_id)
+            SELECT lower(trim(j.value)), MIN(i.id) FROM {items} AS j
+            JOIN ingredients i ON i.name = trim(j.value)
+            WHERE j.type = 'text'
+              AND NOT EXISTS (SELECT 1 FROM ingredient_synonyms s WHERE s.alias = lower(trim(j.value)))
+            GROUP BY lower(trim(j.value));
+
+        INSERT INTO product_ingredients(product_id, ingredient_id, position)
+            SELECT new.id, s.ingredient_id, MIN(j.key) FROM {items} AS j
+            JOIN ingredient_synonyms s ON s.alias = lower(trim(j.value))
+            WHERE j.type = 'text'
+            GROUP BY s.ingredient_id;
+""".format(items=_ITEMS.format(col="new.ingredients_list"))
+
+TRIGGERS = {
+    "products_ingredients_ai": f"""
+    CREATE TRIGGER products_ingredients_ai
+        AFTER INSERT ON products
+    BEGIN{_INDEX_NEW_ROW}    END;
+    """,
+    "products_ingredients_au": f"""
+    CREATE TRIGGER products_ingredients_au
+        AFTER UPDATE ON products
+        WHEN old.ingredients_list IS NOT new.ingredients_list OR old.id != new.id
+    BEGIN
+        DELETE FROM product_ingredients WHERE product_id = old.id;
+{_INDEX_NEW_ROW}    END;
+    """,
+    "products_ingredients_ad": """
+    CREATE TRIGGER products_ingredients_ad
+        AFTER DELETE ON products
+    BEGIN
+        DELETE FROM product_ingredients WHERE product_id = old.id;
+    END;
+    """,
+}
+
+
+def ensure_schema(conn):
+    """Creates the ingredient tables and triggers, seeding and backfilling as needed."""
+    conn.executescript(SCHEMA_SQL)
+    create_triggers(conn)
+    for canonical, aliases in SEED_SYNONYMS.items():
+        for alias in aliases:
+            add_synonym(conn, alias, canonical)
+    has_postings = conn.execute("SELECT 1 FROM product_ingredients LIMIT 1").fetchone()
+    has_products = conn.execute("SELECT 1 FROM products LIMIT 1").fetchone()
+    if has_products and not has_postings:
+        rebuild_postings(conn)
+    conn.commit()
+
+
+def create_triggers(conn):
+    """(Re)creates whichever posting triggers are missing."""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    for name, sql in TRIGGERS.items():
+        if name not in existing:
+            conn.execute(sql)
+
+
+def drop_triggers(conn):
+    for name in TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def rebuild_postings(conn):
+    """Re-derives `product_ingredients` for the whole catalog in three set-based statements."""
+    items = _ITEMS.format(col="p.ingredients_list")
+    conn.execute("DELETE FROM product_ingredients")
+    conn.execute(f"""
+        INSERT OR IGNORE INTO ingredients(name)
+            SELECT trim(j.value) FROM products p, {items} AS j
+            WHERE j.type = 'text' AND trim(j.value) != ''
+              AND NOT EXISTS (SELECT 1 FROM ingredient_synonyms s WHERE s.alias = lower(trim(j.value)))
+    """)
+    conn.execute(f"""
+        INSERT OR IGNORE INTO ingredient_synonyms(alias, ingredient_id)
+            SELECT lower(trim(j.value)), i.id FROM products p, {items} AS j
+            JOIN ingredients i ON i.name = trim(j.value)
+            WHERE j.type = 'text'
+    """)
+    conn.execute(f"""
+        INSERT OR IGNORE INTO product_ingredients(product_id, ingredient_id, position)
+            SELECT p.id, s.ingredient_id, j.key FROM products p, {items} AS j
+            JOIN ingredient_synonyms s ON s.alias = lower(trim(j.value))
+            WHERE j.type = 'text'
+            ORDER BY p.id, j.key
+    """)
+
+
+def add_synonym(conn, alias, canonical):
+    """Maps `alias` to the `canonical` ingredient, merging any postings it already had."""
+    conn.execute("INSERT OR IGNORE INTO ingredients(name) VALUES (?)", (canonical,))
+    target = conn.execute("SELECT id FROM ingredients WHERE name = ?", (canonical,)).fetchone()[0]
+    conn.execute(
+        "INSERT OR IGNORE INTO ingredient_synonyms(alias, ingredient_id) VALUES (lower(trim(?)), ?)",
+        (canonical, target),
+    )
+    row = conn.execute(
+        "SELECT ingredient_id FROM ingredient_synonyms WHERE alias = lower(trim(?))", (alias,)
+    ).fetchone()
+    if row is None:
+        conn.execute(
+            "INSERT INTO ingredient_synonyms(alias, ingredient_id) VALUES (lower(trim(?)), ?)",
+            (alias, target),
+        )
+        return
+    previous = row[0]
+    if previous == target:
+        return
+    # The alias used to be its own ingredient: move its postings (and any other
+    # spellings pointing at it) over to the canonical entry.
+    conn.execute("UPDATE ingredient_synonyms SET ingredient_id = ? WHERE ingredient_id = ?", (target, previous))
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO product_ingredients(product_id, ingredient_id, position)
+            SELECT product_id, ?, position FROM product_ingredients WHERE ingredient_id = ?
+        """,
+        (target, previous),
+    )
+    conn.execute("DELETE FROM product_ingredients WHERE ingredient_id = ?", (previous,))
+    conn.execute("DELETE FROM ingredients WHERE id = ?", (previous,))
+
+
+# --- QUERY API ---
+def resolve(conn, name):
+    """Returns the canonical ingredient id for a label name, or None if unknown."""
+    row = conn.execute(
+        "SELECT ingredient_id FROM ingredient_synonyms WHERE alias = lower(trim(?))", (name,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def ensure_ingredient(conn, name):
+    """Returns the id for `name`, adding it to the dictionary if it is new."""
+    ingredient_id = resolve(conn, name)
+    if ingredient_id is None:
+        conn.execute("INSERT OR IGNORE INTO ingredients(name) VALUES (trim(?))", (name,))
+        ingredient_id = conn.execute("SELECT id FROM ingredients WHERE name = trim(?)", (name,)).fetchone()[0]
+        conn.execute(
+            "INSERT OR IGNORE INTO ingredient_synonyms(alias, ingredient_id) VALUES (lower(trim(?)), ?)",
+            (name, ingredient_id),
+        )
+    return ingredient_id
+
+
+def _resolve_all(conn, names):
+    ids = [resolve(conn, name) for name in names]
+    return list(dict.fromkeys(ids))
+
+
+def products_containing(conn, name):
+    """Ids of products listing `name` (or any synonym of it)."""
+    return products_containing_any(conn, [name])
+
+
+def products_containing_all(conn, names):
+    """Ids of products that list every one of `names`."""
+    ids = _resolve_all(conn, names)
+    if not ids or None in ids:
+        return []
+    placeholders = ", ".join("?" * len(ids))
+    rows = conn.execute(
+        f"""
+        SELECT product_id FROM product_ingredients
+        WHERE ingredient_id IN ({placeholders})
+        GROUP BY product_id HAVING COUNT(*) = ?
+        ORDER BY product_id
+        """,
+        (*ids, len(ids)),
+    )
+    return [row[0] for row in rows]
+
+
+def products_containing_any(conn, names):
+    """Ids of products that list at least one of `names`."""
+    ids = [i for i in _resolve_all(conn, names) if i is not None]
+    if not ids:
+        return []
+    placeholders = ", ".join("?" * len(ids))
+    rows = conn.execute(
+        f"""
+        SELECT DISTINCT product_id FROM product_ingredients
+        WHERE ingredient_id IN ({placeholders})
+        ORDER BY product_id
+        """,
+        ids,
+    )
+    return [row[0] for row in rows]
+
+
+def ingredients_of(conn, product_id):
+    """Canonical ingredient names of one product, in label order."""
+    rows = conn.execute(
+        """
+        SELECT i.name FROM product_ingredients pi
+        JOIN ingredients i ON i.id = pi.ingredient_id
+        WHERE pi.product_id = ?
+        ORDER BY pi.position
+        """,
+        (product_id,),
+    )
+    return [row[0] for row in rows]
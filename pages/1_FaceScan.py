@@ -0,0 +1,87 @@
+import streamlit as st
+from PIL import Image
+
+import facescan
+from assets import stylesheet_html
+from render_profile import profiled, rerun
+
+# --- Page Configuration ---
+st.set_page_config(page_title="DermaScribe - FaceScan", layout="wide")
+
+HEATMAP_LABELS = {"redness": "Redness", "oiliness": "Oiliness", "spots": "Spots & blemishes"}
+HEATMAP_COLORS = {"redness": (231, 84, 128), "oiliness": (240, 180, 60), "spots": (149, 125, 173)}
+
+
+def heatmap_image(heatmap, color, size=facescan.INPUT_SIZE):
+    """A 0..1 GRID x GRID map as a tinted, smoothly upscaled RGBA overlay."""
+    alpha = Image.fromarray((heatmap.astype("float32").clip(0, 1) * 255).astype("uint8"), "L")
+    overlay = Image.new("RGBA", alpha.size, color + (0,))
+    overlay.putalpha(alpha)
+    return overlay.resize((size, size), Image.BILINEAR)
+
+
+@profiled
+def show_intro():
+    st.markdown("""
+        <div style="padding-top: 1rem; text-align: left;">
+            <h1 style="text-align: left; font-size: 3rem;">FACESCAN AI</h1>
+            <p style="font-size: 1.1rem; color: var(--color-text-medium); max-width: 700px;">
+                Upload a well-lit, front-facing photo without makeup. FaceScan maps redness, oiliness and
+                blemishes across your skin. Your photo is analyzed on this server and never stored.
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+
+
+# Polls the pending scan without blocking the rest of the page; the full rerun
+# it triggers on completion renders the results and stops the polling.
+@st.fragment(run_every=0.5)
+def wait_for_scan(future):
+    if future.done():
+        st.rerun()
+    st.info("Analyzing your photo…")
+
+
+@profiled
+def show_results(result):
+    if not result.usable:
+        st.warning("We couldn't find enough skin in this photo. Try a closer, well-lit, front-facing shot.")
+        return
+    cols = st.columns(len(facescan.HEATMAPS))
+    for col, (i, name) in zip(cols, enumerate(facescan.HEATMAPS)):
+        with col:
+            st.metric(HEATMAP_LABELS[name], f"{result.scores[name] * 100:.0f} / 100")
+            st.image(heatmap_image(result.heatmaps[i], HEATMAP_COLORS[name]), use_container_width=True)
+    st.caption(f"Model {result.model}. These scores are indicative only and are not a medical diagnosis.")
+
+
+@profiled
+def show_facescan():
+    photo = st.file_uploader("Upload a photo", type=["jpg", "jpeg", "png", "webp"])
+    if photo is None:
+        return
+    # The future lives in session state so reruns keep waiting on the same scan.
+    pending = st.session_state.get("facescan_pending")
+    if pending is None or pending[0] != photo.file_id:
+        pending = (photo.file_id, facescan.get_service().submit(photo.getvalue()))
+        st.session_state.facescan_pending = pending
+    future = pending[1]
+    if not future.done():
+        wait_for_scan(future)
+        return
+    try:
+        show_results(future.result())
+    except ValueError as e:
+        st.error(f"That file could not be scanned ({e}). Please upload a JPEG, PNG or WebP photo.")
+    except Exception:  # e.g. BrokenProcessPool: the worker scanning this photo crashed
+        # Forget the failed scan, so the retry (any rerun) submits the photo again.
+        del st.session_state.facescan_pending
+        st.error("The scan failed on our side. Please try again.")
+        st.button("Try again")
+
+
+# --- MAIN APP LOGIC ---
+with rerun("pages/1_FaceScan.py"):
+    st.markdown(stylesheet_html("dermascribe.css"), unsafe_allow_html=True)
+    show_intro()
+    show_facescan()
@@ -0,0 +1,86 @@
+import datetime
+
+import streamlit as st
+
+import telemetry
+from assets import stylesheet_html
+from render_profile import profiled, rerun
+
+# --- Page Configuration ---
+st.set_page_config(page_title="DermaScribe - Admin", layout="wide")
+
+
+def histogram_rows(histogram, label_names, scale=1000):
+    """One table row per label set: count, mean, p50, p95 and p99 (ms by default), slowest p95 first."""
+    rows = []
+    for labels, (count, total, counts) in histogram.series().items():
+        row = dict(zip(label_names, labels))
+        row.update({
+            "count": count,
+            "mean": round(total / count * scale, 3),
+            "p50": round(histogram.quantile(0.5, counts) * scale, 3),
+            "p95": round(histogram.quantile(0.95, counts) * scale, 3),
+            "p99": round(histogram.quantile(0.99, counts) * scale, 3),
+            "total": round(total * scale, 1),
+        })
+        rows.append(row)
+    return sorted(rows, key=lambda row: row["p95"], reverse=True)
+
+
+@profiled
+def show_reruns():
+    st.subheader("Page reruns (ms)")
+    rows = histogram_rows(telemetry.RERUN_SECONDS, ["page"])
+    if not rows:
+        st.caption("No reruns recorded yet.")
+        return
+    st.dataframe(rows, hide_index=True, use_container_width=True)
+    st.caption("Time in profiled render functions, per rerun:")
+    st.dataframe(histogram_rows(telemetry.RENDER_SECONDS, ["page", "function"]),
+                 hide_index=True, use_container_width=True)
+
+
+@profiled
+def show_statements():
+    st.subheader(f"SQLite statements (ms, sampled 1 in {telemetry.SQL_SAMPLE_EVERY})")
+    rows = histogram_rows(telemetry.STATEMENT_SECONDS, ["statement"])
+    if not rows:
+        st.caption("No statements recorded yet.")
+        return
+    row_counts = {labels: total / count for labels, (count, total, _) in telemetry.STATEMENT_ROWS.series().items()}
+    for row in rows:
+        row["rows (mean)"] = round(row_counts.get((row["statement"],), 0), 1)
+    st.dataframe(sorted(rows, key=lambda row: row["total"], reverse=True), hide_index=True, use_container_width=True)
+
+
+@profiled
+def show_slow_queries():
+    st.subheader(f"Slow queries (≥ {telemetry.SLOW_QUERY_MS:g} ms)")
+    entries = list(telemetry.slow_queries)
+    if not entries:
+        st.caption("None so far.")
+        return
+    for entry in reversed(entries[-50:]):
+        at = datetime.datetime.fromtimestamp(entry.at).strftime("%H:%M:%S")
+        rows = "?" if entry.rows is None else f"{entry.rows:,}"
+        with st.expander(f"{at} · {entry.ms:,.1f} ms · {rows} rows · {entry.statement}"):
+            st.code(entry.sql, language="sql")
+            st.code("\n".join(entry.plan) or "(no plan)", language="text")
+
+
+# --- MAIN APP LOGIC ---
+with rerun("pages/9_Admin.py"):
+    st.markdown(stylesheet_html("dermascribe.css"), unsafe_allow_html=True)
+    st.title("Telemetry")
+    if not telemetry.ENABLED:
+        st.info("Telemetry is off (DERMASCRIBE_TELEMETRY=0).")
+    else:
+        port = telemetry.start_exporter()
+        if port:
+            st.caption(f"Prometheus metrics: http://127.0.0.1:{port}/metrics")
+        st.button("Refresh")
+        telemetry.flush()
+        show_reruns()
+        show_statements()
+        show_slow_queries()
+        st.download_button("Download metrics", telemetry.expose(), file_name="metrics.txt")
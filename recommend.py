@@ -0,0 +1,448 @@
+"""Similar-product and "dupe" recommendations over ingredient vectors.
+
+Each product is a sparse TF-IDF vector over canonical ingredient ids, read
+from the `product_ingredients` postings. Labels list ingredients by
+descending concentration, so an ingredient's term weight falls with its
+position on the label (`position_weight`). Queries are cosine similarity,
+scored for the whole catalog at once. A sparse product over the columns of the
+query's ingredients does the scoring; a masked argpartition picks the top k.
+
+The index follows the catalog through `catalog_changes`. Written products are
+re-read and appended as delta rows, and their old rows are masked out. Once the
+delta (appended or masked-out rows) grows past COMPACT_FRACTION of the compacted
+rows, the rows are merged and the IDF weights recomputed, still without going
+back to SQLite. A bulk load (`catalog_db.mark_catalog_rebuilt`) triggers a full
+rebuild. An index loaded from or saved to disk is saved again after each
+compaction or rebuild, so a restart only replays the changes since then.
+
+On disk the matrix is stored as label positions (uint8), ingredient columns and
+offsets, plus the frozen IDF vector. Weights are re-derived when it is loaded.
+
+    python -m recommend build            # (re)build recommend_index.npz
+    python -m recommend similar 42       # products most like product 42
+"""
+import argparse
+import os
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+from scipy import sparse
+
+import catalog_db
+import ingredients
+
+INDEX_NAME = "recommend_index.npz"  # saved next to the catalog it indexes (see index_path)
+INDEX_PATH = os.path.join(os.path.dirname(catalog_db.DB_PATH), INDEX_NAME)
+FORMAT_VERSION = 1
+MAX_POSITION = 255  # positions are stored as uint8; later ones share the last weight
+COMPACT_FRACTION = 0.02
+
+# A few starting points for profile-based recommendations: ingredients to look
+# for (most important first) and ingredients to steer clear of.
+SKIN_PROFILES = {
+    "oily": (["Niacinamide", "Salicylic Acid", "Zinc PCA", "Tea Tree Oil", "Hyaluronic Acid"], ["Mineral Oil", "Coconut Oil"]),
+    "dry": (["Ceramide NP", "Hyaluronic Acid", "Glycerin", "Squalane", "Shea Butter"], ["Alcohol Denat."]),
+    "sensitive": (["Centella Asiatica", "Panthenol", "Allantoin", "Ceramide NP", "Oat Kernel Extract"], ["Fragrance", "Parfum", "Alcohol Denat."]),
+    "acne-prone": (["Salicylic Acid", "Niacinamide", "Azelaic Acid", "Benzoyl Peroxide", "Zinc PCA"], ["Coconut Oil", "Isopropyl Myristate"]),
+    "pigmentation": (["Ascorbic Acid", "Niacinamide", "Alpha Arbutin", "Tranexamic Acid", "Kojic Acid"], []),
+}
+
+
+class Recommendation(NamedTuple):
+    id: int
+    score: float  # cosine similarity, 0..1
+
+
+def index_path(db_path=catalog_db.DB_PATH):
+    """Where the saved index of the catalog at `db_path` lives: next to it."""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), INDEX_NAME)
+
+
+def position_weight(positions):
+    """Term weight for a label position: 1 for the first ingredient, ~0.29 for the tenth."""
+    return (1.0 / np.log2(np.minimum(positions, MAX_POSITION).astype(np.float32) + 2.0)).astype(np.float32)
+
+
+def smooth_idf(df, n_docs):
+    return (np.log((1.0 + n_docs) / (1.0 + df)) + 1.0).astype(np.float32)
+
+
+def _weigh(rows, cols, positions, idf, n_rows):
+    """L2-normalized TF-IDF weights for COO postings."""
+    weights = position_weight(positions) * idf[cols]
+    norms = np.sqrt(np.bincount(rows, weights=weights.astype(np.float64) ** 2, minlength=n_rows))
+    norms[norms == 0] = 1.0
+    return (weights / norms[rows]).astype(np.float32)
+
+
+def _codes(values, names, lookup):
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        key = (value or "").lower()
+        code = lookup.get(key)
+        if code is None:
+            code = lookup[key] = len(names)
+            names.append(key)
+        codes[i] = code
+    return codes
+
+
+def _fetch_postings(conn, product_ids=None):
+    """(product ids, ingredient ids, positions) as arrays, for all products or the given ones."""
+    sql = "SELECT product_id, ingredient_id, position FROM product_ingredients"
+    dtype = [("product", np.int64), ("ingredient", np.int32), ("position", np.int32)]
+    if product_ids is None:
+        postings = np.fromiter(conn.execute(sql), dtype=dtype)
+    else:
+        chunks = []
+        for start in range(0, len(product_ids), 500):
+            chunk = product_ids[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor = conn.execute(f"{sql} WHERE product_id IN ({placeholders})", chunk)
+            chunks.append(np.fromiter(cursor, dtype=dtype))
+        postings = np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+    return postings["product"], postings["ingredient"], postings["position"]
+
+
+class _Rows(NamedTuple):
+    """One consistent view of the index; refreshes swap in a new one, queries read a snapshot."""
+    ids: np.ndarray  # row -> product id; the base rows come first, sorted by id
+    categories: np.ndarray  # row -> code into category_names
+    brands: np.ndarray
+    alive: np.ndarray  # False once a product was rewritten or deleted
+    base: sparse.csc_matrix  # TF-IDF weights of the compacted rows
+    delta: sparse.csc_matrix  # weights of rows appended since, numbered after the base rows
+    delta_rows: dict  # product id -> row, for the appended rows
+
+
+def _scores(weights, cols, values, n_rows):
+    """Cosine scores of every row of `weights` against a sparse query.
+
+    Slicing out the query's columns and multiplying both run in scipy's C loops,
+    touching only the postings of the query's ingredients.
+    """
+    inside = cols < weights.shape[1]
+    if not inside.any():
+        return np.zeros(n_rows, dtype=np.float32)
+    return np.asarray(weights[:, cols[inside]] @ values[inside], dtype=np.float32)
+
+
+def _rows_with(weights, cols):
+    return np.concatenate([weights.indices[weights.indptr[c]:weights.indptr[c + 1]] for c in cols if c < weights.shape[1]] or [np.empty(0, dtype=np.int32)])
+
+
+class RecommendationIndex:
+    """In-memory TF-IDF index; query with `similar` or `for_ingredients`, keep current with `refresh`."""
+
+    def __init__(self, ids, categories, brands, category_names, brand_names, positions, idf, version):
+        self.category_names = category_names
+        self.brand_names = brand_names
+        self._category_lookup = {name: code for code, name in enumerate(category_names)}
+        self._brand_lookup = {name: code for code, name in enumerate(brand_names)}
+        self.positions = positions  # CSC, base rows x ingredient ids, uint8 label positions
+        self.idf = idf  # frozen between compactions
+        self.version = version
+        self.path = None  # where load() or save() last put it; compactions are saved there
+        self._delta = (np.empty(0, np.int64), np.empty(0, np.int32), np.empty(0, np.uint8))  # COO rows, cols, positions
+        self._lock = threading.Lock()
+        base = self._weigh(positions)
+        empty = sparse.csc_matrix((0, positions.shape[1]), dtype=np.float32)
+        self._rows = _Rows(ids, categories, brands, np.ones(len(ids), dtype=bool), base, empty, {})
+
+    def _weigh(self, positions):
+        cols = np.repeat(np.arange(positions.shape[1], dtype=np.int32), np.diff(positions.indptr))
+        data = _weigh(positions.indices, cols, positions.data, self.idf, positions.shape[0])
+        return sparse.csc_matrix((data, positions.indices, positions.indptr), shape=positions.shape)
+
+    def __len__(self):
+        rows = self._rows
+        return int(rows.alive.sum())
+
+    # --- BUILD / LOAD / SAVE ---
+    @classmethod
+    def build(cls, conn):
+        """Reads the whole catalog; the index is current as of the catalog version read first."""
+        version = catalog_db.catalog_version(conn)
+        products = conn.execute("SELECT id, category, brand FROM products ORDER BY id").fetchall()
+        ids = np.array([row[0] for row in products], dtype=np.int64)
+        category_names, brand_names = [], []
+        categories = _codes([row[1] for row in products], category_names, {})
+        brands = _codes([row[2] for row in products], brand_names, {})
+        product_ids, cols, positions = _fetch_postings(conn)
+        rows = np.searchsorted(ids, product_ids)
+        vocabulary = int(cols.max()) + 1 if len(cols) else 1
+        matrix = sparse.csc_matrix(
+            (np.minimum(positions, MAX_POSITION).astype(np.uint8), (rows, cols)), shape=(len(ids), vocabulary)
+        )
+        idf = smooth_idf(np.diff(matrix.indptr), len(ids))
+        return cls(ids, categories, brands, category_names, brand_names, matrix, idf, version)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        with np.load(path, allow_pickle=False) as f:
+            if int(f["format"]) != FORMAT_VERSION:
+                raise ValueError(f"{path}: unsupported index format {int(f['format'])}")
+            positions = sparse.csc_matrix((f["positions"], f["indices"], f["indptr"]), shape=tuple(f["shape"]))
+            index = cls(
+                f["ids"], f["categories"], f["brands"], list(f["category_names"]), list(f["brand_names"]),
+                positions, f["idf"], int(f["version"]),
+            )
+        index.path = path
+        return index
+
+    def save(self, path=INDEX_PATH):
+        """Compacts the index and writes it atomically."""
+        with self._lock:
+            self._compact()
+            self._write(path)
+            self.path = path
+
+    def _write(self, path):
+        """Writes the compacted index; call with the lock held."""
+        rows = self._rows
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path, format=FORMAT_VERSION, version=self.version, shape=np.array(self.positions.shape),
+            positions=self.positions.data, indices=self.positions.indices, indptr=self.positions.indptr,
+            ids=rows.ids, categories=rows.categories, brands=rows.brands,
+            category_names=np.array(self.category_names, dtype=str), brand_names=np.array(self.brand_names, dtype=str),
+            idf=self.idf,
+        )
+        os.replace(tmp_path, path)
+
+    # --- INCREMENTAL UPDATES ---
+    def refresh(self, conn):
+        """Applies catalog writes since `version`; returns False if there were none."""
+        changed, current = catalog_db.changed_since(conn, self.version)
+        if current == self.version:
+            return False
+        if changed is None:
+            rebuilt = RecommendationIndex.build(conn)
+            with self._lock:
+                self.__dict__.update({k: v for k, v in rebuilt.__dict__.items() if k not in ("_lock", "path")})
+                if self.path:
+                    self._write(self.path)
+            return True
+        products = []
+        for start in range(0, len(changed), 500):
+            chunk = changed[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            products += conn.execute(f"SELECT id, category, brand FROM products WHERE id IN ({placeholders})", chunk).fetchall()
+        postings = _fetch_postings(conn, [row[0] for row in products])
+        with self._lock:
+            self._apply(changed, products, postings)
+            self.version = current
+            rows = self._rows
+            n_base = rows.base.shape[0]
+            # Inserts only grow the delta; rewrites and deletes also leave dead rows behind.
+            if max(len(rows.ids) - n_base, len(rows.ids) - rows.alive.sum()) > COMPACT_FRACTION * n_base:
+                self._compact()
+                if self.path:
+                    self._write(self.path)
+        return True
+
+    def _row(self, rows, product_id):
+        row = rows.delta_rows.get(product_id)
+        if row is not None:
+            return row
+        n_base = rows.base.shape[0]
+        row = int(np.searchsorted(rows.ids[:n_base], product_id))
+        if row < n_base and rows.ids[row] == product_id and rows.alive[row]:
+            return row
+        return None
+
+    def _apply(self, changed, products, postings):
+        """Masks out the old rows of `changed` and appends fresh delta rows for those still in the catalog."""
+        rows = self._rows
+        alive = rows.alive.copy()
+        delta_rows = dict(rows.delta_rows)
+        for product_id in changed:
+            row = self._row(rows, product_id)
+            if row is not None:
+                alive[row] = False
+                delta_rows.pop(product_id, None)
+        first = len(rows.ids)
+        ids = np.array([row[0] for row in products], dtype=np.int64)
+        product_ids, cols, positions = postings
+        local = {int(product_id): i for i, product_id in enumerate(ids)}
+        new_rows = first + np.array([local[int(p)] for p in product_ids], dtype=np.int64)
+        vocabulary = max(rows.base.shape[1], rows.delta.shape[1], int(cols.max()) + 1 if len(cols) else 0)
+        if vocabulary > len(self.idf):
+            # Ingredients new to the catalog: weigh them by how many of these products list them.
+            # Their IDF, like everyone else's, is settled at the next compaction.
+            seen = np.bincount(cols, minlength=vocabulary)[len(self.idf):]
+            self.idf = np.concatenate([self.idf, smooth_idf(seen, rows.base.shape[0])])
+        delta_rows.update((int(product_id), first + i) for i, product_id in enumerate(ids))
+        d_rows, d_cols, d_positions = self._delta
+        self._delta = (
+            np.concatenate([d_rows, new_rows]),
+            np.concatenate([d_cols, cols]),
+            np.concatenate([d_positions, np.minimum(positions, MAX_POSITION).astype(np.uint8)]),
+        )
+        d_rows, d_cols, d_positions = self._delta
+        n_base, n_delta = rows.base.shape[0], first + len(ids) - rows.base.shape[0]
+        local_rows = d_rows - n_base
+        data = _weigh(local_rows, d_cols, d_positions, self.idf, n_delta)
+        delta = sparse.csc_matrix((data, (local_rows, d_cols)), shape=(n_delta, vocabulary))
+        self._rows = _Rows(
+            np.concatenate([rows.ids, ids]),
+            np.concatenate([rows.categories, _codes([row[1] for row in products], self.category_names, self._category_lookup)]),
+            np.concatenate([rows.brands, _codes([row[2] for row in products], self.brand_names, self._brand_lookup)]),
+            np.concatenate([alive, np.ones(len(ids), dtype=bool)]),
+            rows.base, delta, delta_rows,
+        )
+
+    def _compact(self):
+        """Folds the delta into the base, drops dead rows and re-derives the IDF from live rows."""
+        rows = self._rows
+        if not len(rows.delta_rows) and rows.alive.all():
+            return
+        base = self.positions.tocoo()
+        d_rows, d_cols, d_positions = self._delta
+        all_rows = np.concatenate([base.row.astype(np.int64), d_rows])
+        all_cols = np.concatenate([base.col, d_cols])
+        all_positions = np.concatenate([base.data, d_positions])
+        live = rows.alive[all_rows]
+        keep = np.flatnonzero(rows.alive)
+        keep = keep[np.argsort(rows.ids[keep], kind="stable")]
+        renumber = np.full(len(rows.ids), -1, dtype=np.int64)
+        renumber[keep] = np.arange(len(keep))
+        vocabulary = max(self.positions.shape[1], rows.delta.shape[1], len(self.idf))
+        self.positions = sparse.csc_matrix(
+            (all_positions[live], (renumber[all_rows[live]], all_cols[live])), shape=(len(keep), vocabulary)
+        )
+        self.idf = smooth_idf(np.diff(self.positions.indptr), len(keep))
+        self._delta = (np.empty(0, np.int64), np.empty(0, np.int32), np.empty(0, np.uint8))
+        self._rows = _Rows(
+            rows.ids[keep], rows.categories[keep], rows.brands[keep], np.ones(len(keep), dtype=bool),
+            self._weigh(self.positions), sparse.csc_matrix((0, vocabulary), dtype=np.float32), {},
+        )
+
+    # --- QUERIES ---
+    def _top(self, cols, values, k, category=None, exclude_brand=None, exclude_ids=(), avoid=()):
+        rows = self._rows
+        if not len(cols):
+            return []
+        cols = np.asarray(cols, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32)
+        n_base = rows.base.shape[0]
+        scores = np.concatenate([
+            _scores(rows.base, cols, values, n_base),
+            _scores(rows.delta, cols, values, len(rows.ids) - n_base),
+        ])
+        keep = rows.alive & (scores > 0)
+        if category is not None:
+            code = self._category_lookup.get(category.lower())
+            if code is None:
+                return []
+            keep &= rows.categories == code
+        if exclude_brand is not None:
+            code = self._brand_lookup.get(exclude_brand.lower())
+            if code is not None:
+                keep &= rows.brands != code
+        if avoid:
+            keep[_rows_with(rows.base, avoid)] = False
+            keep[n_base + _rows_with(rows.delta, avoid)] = False
+        for product_id in exclude_ids:
+            row = self._row(rows, product_id)
+            if row is not None:
+                keep[row] = False
+        # Selecting among the surviving rows only: argpartition crawls over long runs of tied zeros.
+        candidates = np.flatnonzero(keep)
+        if k < len(candidates):
+            candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [Recommendation(int(rows.ids[row]), float(scores[row])) for row in ranked]
+
+    def similar(self, conn, product_id, k=10, category=None, dupes=False):
+        """Products whose ingredient lists most resemble `product_id`'s.
+
+        With dupes=True only other brands qualify, and the category defaults to the
+        product's own.
+        """
+        row = conn.execute("SELECT category, brand FROM products WHERE id = ?", (product_id,)).fetchone()
+        if row is None:
+            return []
+        _, cols, positions = _fetch_postings(conn, [product_id])
+        if dupes and category is None:
+            category = row[0] or ""
+        return self._top(
+            cols, self._query_weights(cols, positions), k, category=category,
+            exclude_brand=(row[1] or "") if dupes else None, exclude_ids=(product_id,),
+        )
+
+    def for_ingredients(self, conn, wanted, k=10, category=None, avoid=()):
+        """Products that best match a list of wanted ingredient names (most important first)."""
+        cols = [ingredients.resolve(conn, name) for name in wanted]
+        positions = np.array([i for i, col in enumerate(cols) if col is not None], dtype=np.int32)
+        cols = np.array([col for col in cols if col is not None], dtype=np.int64)
+        avoided = [col for col in (ingredients.resolve(conn, name) for name in avoid) if col is not None]
+        return self._top(cols, self._query_weights(cols, positions), k, category=category, avoid=avoided)
+
+    def for_profile(self, conn, profile, k=10, category=None):
+        wanted, avoid = SKIN_PROFILES[profile]
+        return self.for_ingredients(conn, wanted, k, category=category, avoid=avoid)
+
+    def _query_weights(self, cols, positions):
+        if not len(cols):
+            return np.empty(0, dtype=np.float32)
+        idf = self.idf
+        known = cols < len(idf)  # an ingredient the index has never seen cannot match anything
+        weights = position_weight(np.asarray(positions)) * np.where(known, idf[np.where(known, cols, 0)], 1.0)
+        return (weights / np.linalg.norm(weights)).astype(np.float32)
+
+
+def open_index(conn, path=INDEX_PATH):
+    """Loads the saved index (building it if absent or unreadable) and brings it up to date."""
+    try:
+        index = RecommendationIndex.load(path)
+    except (OSError, ValueError, KeyError):
+        index = RecommendationIndex.build(conn)
+        index.save(path)
+        return index
+    index.refresh(conn)
+    return index
+
+
+# --- COMMAND LINE ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DermaScribe ingredient-based recommendations.")
+    parser.add_argument("--db", default=catalog_db.DB_PATH, help="path to products.db")
+    parser.add_argument("--index", help="path to the saved index (default: next to the database)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("build", help="rebuild the index from scratch and save it")
+    similar = commands.add_parser("similar", help="products similar to a product id")
+    similar.add_argument("product_id", type=int)
+    similar.add_argument("--dupes", action="store_true", help="other brands in the same category only")
+    profile = commands.add_parser("profile", help="products for a skin profile")
+    profile.add_argument("profile", choices=sorted(SKIN_PROFILES))
+    for command in (similar, profile):
+        command.add_argument("-k", type=int, default=10)
+        command.add_argument("--category")
+    args = parser.parse_args(argv)
+
+    conn = catalog_db.connect(args.db)
+    args.index = args.index or index_path(args.db)
+    if args.command == "build":
+        start = time.perf_counter()
+        index = RecommendationIndex.build(conn)
+        index.save(args.index)
+        print(f"Indexed {len(index):,} products in {time.perf_counter() - start:.1f} s -> {args.index}")
+        return
+    index = open_index(conn, args.index)
+    if args.command == "similar":
+        results = index.similar(conn, args.product_id, args.k, category=args.category, dupes=args.dupes)
+    else:
+        results = index.for_profile(conn, args.profile, args.k, category=args.category)
+    names = dict(conn.execute(
+        f"SELECT id, product_name FROM products WHERE id IN ({', '.join('?' * len(results))})",
+        [result.id for result in results],
+    )) if results else {}
+    for result in results:
+        print(f"{result.score:.3f}  {result.id:>8}  {names.get(result.id, '')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Per-rerun cost accounting for the Streamlit pages.
+
+A page wraps its body in `rerun(page)` and marks its render functions with
+`@profiled`. During the rerun every message Streamlit sends to the browser is
+counted on the way out. Its serialized size, plus the payload of any media file
+behind an `st.image`, is charged to the innermost profiled function running at
+the time. Each profiled call is also timed. The finished `RerunProfile` is left
+in `st.session_state[PROFILE_KEY]`, where benchmarks/bench_render.py reads it
+through AppTest, and is reported to telemetry.record_rerun.
+
+Counting bytes relies on two private Streamlit attributes, reached only through
+`_StreamlitTap`. If an upgrade moves either one, the profile's byte counts are
+None ("not measured") instead of zero; timing still works.
+
+Outside `rerun()`, `@profiled` functions run untouched.
+"""
+import contextlib
+import functools
+import os
+import threading
+import time
+from collections import Counter
+
+import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import telemetry
+
+PROFILE_KEY = "_render_profile"
+PAGE_BODY = "<page>"  # elements emitted outside any profiled function
+
+_local = threading.local()
+
+
+class FunctionCost:
+    __slots__ = ("calls", "ms", "bytes", "elements")
+
+    def __init__(self):
+        self.calls = 0
+        self.ms = 0.0
+        self.bytes = 0
+        self.elements = Counter()
+
+
+class RerunProfile:
+    """Wall time and bytes emitted by one rerun of one page, broken down per render function."""
+
+    def __init__(self, page):
+        self.page = page
+        self.ms = 0.0
+        self.functions = {}
+        self.measured = True  # False when the bytes could not be counted; see _StreamlitTap
+        self._stack = []
+        self._tap = None
+
+    def _cost(self, name):
+        cost = self.functions.get(name)
+        if cost is None:
+            cost = self.functions[name] = FunctionCost()
+        return cost
+
+    @property
+    def bytes(self):
+        """Total bytes emitted, or None if they were not measured."""
+        if not self.measured:
+            return None
+        return sum(cost.bytes for cost in self.functions.values())
+
+    def bytes_by_element(self):
+        sizes = Counter()
+        for cost in self.functions.values():
+            sizes.update(cost.elements)
+        return sizes
+
+    def record_message(self, msg):
+        if not msg.HasField("delta") or not msg.delta.HasField("new_element"):
+            return
+        element = msg.delta.new_element
+        kind = element.WhichOneof("type")
+        size = msg.ByteSize()
+        if kind == "imgs":
+            media = [self._tap.media_bytes(image.url) for image in element.imgs.imgs]
+            if None in media:
+                self.measured = False
+                return
+            size += sum(media)
+        cost = self._cost(self._stack[-1] if self._stack else PAGE_BODY)
+        cost.bytes += size
+        cost.elements[kind] += size
+
+    def as_dict(self):
+        return {
+            "page": self.page,
+            "ms": round(self.ms, 3),
+            "bytes": self.bytes,
+            "elements": dict(self.bytes_by_element()) if self.measured else None,
+            "functions": {
+                name: {"calls": cost.calls, "ms": round(cost.ms, 3), "bytes": cost.bytes if self.measured else None}
+                for name, cost in self.functions.items()
+            },
+        }
+
+
+# --- STREAMLIT INTERNALS ---
+class _StreamlitTap:
+    """The private Streamlit hooks byte counting needs, each checked before use.
+
+    `ScriptRunContext._enqueue` sees every message sent to the browser, and the
+    media file manager's `_storage` holds what `st.image` uploads. Neither is a
+    public API, so anything unexpected marks the profile as not measured.
+    """
+
+    def __init__(self, ctx, profile):
+        self._ctx = ctx
+        self._profile = profile
+        self._enqueue = getattr(ctx, "_enqueue", None)
+        self._storage = None
+        try:
+            if runtime.exists():
+                self._storage = getattr(runtime.get_instance().media_file_mgr, "_storage", None)
+        except Exception:
+            pass
+
+    def install(self):
+        """Starts counting outgoing messages; returns False (and counts nothing) if the hook is gone."""
+        if not callable(self._enqueue):
+            return False
+        enqueue, profile = self._enqueue, self._profile
+
+        def counting_enqueue(msg):
+            try:
+                profile.record_message(msg)
+            except Exception:
+                profile.measured = False
+            enqueue(msg)
+
+        self._ctx._enqueue = counting_enqueue
+        return True
+
+    def remove(self):
+        if callable(self._enqueue):
+            self._ctx._enqueue = self._enqueue
+
+    def media_bytes(self, url):
+        """Size of an in-memory media file, 0 for external URLs, or None if it cannot be read."""
+        if url.startswith(("http://", "https://", "data:")):
+            return 0
+        try:
+            return len(self._storage.get_file(os.path.basename(url)).content)
+        except Exception:
+            return None
+
+
+def active_profile():
+    return getattr(_local, "profile", None)
+
+
+@contextlib.contextmanager
+def rerun(page):
+    """Profiles the enclosed page body; a no-op outside a Streamlit script run."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        yield None
+        return
+    telemetry.start_exporter()
+    profile = RerunProfile(page)
+    profile._tap = _StreamlitTap(ctx, profile)
+    profile.measured = profile._tap.install()
+    _local.profile = profile
+    start = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.ms = (time.perf_counter() - start) * 1000
+        profile._tap.remove()
+        profile._tap = None
+        _local.profile = None
+        st.session_state[PROFILE_KEY] = profile
+        telemetry.record_rerun(profile)
+
+
+def profiled(func):
+    """Charges the call's wall time and emitted bytes to `func` in the active rerun profile."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = active_profile()
+        if profile is None:
+            return func(*args, **kwargs)
+        profile._stack.append(name)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            cost = profile._cost(name)
+            cost.calls += 1
+            cost.ms += (time.perf_counter() - start) * 1000
+            profile._stack.pop()
+
+    return wrapper
@@ -0,0 +1,174 @@
+"""Shared cache of Product Analyzer results, keyed by an order-insensitive routine fingerprint.
+
+Many sessions check the same popular routines. A routine's fingerprint hashes
+three things: its sorted, de-duplicated product ids; the catalog version at
+which any of those products last changed (`catalog_db.last_changed`); and the
+conflict rules version. Listing the same products in another order hits the
+same entry. Editing one of the products, or changing the rules, yields a new
+fingerprint, so a stale result can never be served. Writes to unrelated
+products leave the entry alone.
+
+There are two tiers. The first is an in-process LRU with a TTL and a cap on the
+serialized bytes it holds. The second is the routine_cache table in
+products.db, which survives restarts and is shared by every server process.
+The products_au/products_ad triggers delete persisted entries that mention a
+changed product (see catalog_db.ROUTINE_CACHE_SQL). Memory entries for that
+product simply stop being looked up and age out.
+
+Findings come back in product id order rather than routine order. Conflicts
+are symmetric, so only which side of a pair a product is reported on can
+differ.
+"""
+import contextlib
+import hashlib
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import catalog_db
+from conflicts import Finding
+
+MEMORY_TTL = 600.0  # seconds
+MAX_BYTES = 32 * 2**20  # serialized findings held in memory
+DISK_TTL = 7 * 24 * 3600.0
+PRUNE_EVERY = 1000  # persisted entries written between sweeps of expired rows
+
+
+def fingerprint(product_ids, version, rules_version):
+    ids = ",".join(map(str, sorted(set(product_ids))))
+    return hashlib.sha256(f"{ids}|{version}|{rules_version}".encode()).hexdigest()
+
+
+def encode(findings):
+    return json.dumps([list(finding) for finding in findings], separators=(",", ":"))
+
+
+def decode(text):
+    return tuple(Finding(*fields) for fields in json.loads(text))
+
+
+class RoutineCache:
+    """Two-tier, thread-safe cache of `ConflictEngine.analyze` results (see the module docstring).
+
+    `stats` counts memory_hits, disk_hits, misses, disk_writes, evictions
+    (dropped for the byte cap) and expirations (dropped for the TTL); every
+    update holds the lock.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES, ttl=MEMORY_TTL, disk_ttl=DISK_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_ttl = disk_ttl
+        self.stats = Counter()
+        self._entries = OrderedDict()  # fingerprint -> (expires, size, findings)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    # --- MEMORY TIER ---
+    def _get_memory(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, size, findings = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.stats["expirations"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return findings
+
+    def _put_memory(self, key, findings, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (time.monotonic() + self.ttl, size, findings)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _count(self, name):
+        """Bumps `stats[name]` under the lock and returns the new value."""
+        with self._lock:
+            self.stats[name] += 1
+            return self.stats[name]
+
+    # --- PERSISTENT TIER ---
+    def _get_disk(self, conn, key):
+        row = conn.execute(
+            "SELECT result FROM routine_cache WHERE fingerprint = ? AND created_at > ?",
+            (key, time.time() - self.disk_ttl),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _put_disk(self, conn, key, product_ids, text):
+        conn.execute(
+            "INSERT OR REPLACE INTO routine_cache(fingerprint, result, created_at) VALUES (?, ?, ?)",
+            (key, text, time.time()),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO routine_cache_members(product_id, fingerprint) VALUES (?, ?)",
+            [(product_id, key) for product_id in product_ids],
+        )
+        if self._count("disk_writes") % PRUNE_EVERY == 0:
+            prune(conn, self.disk_ttl)
+
+    # --- LOOKUP ---
+    def analyze(self, conn, engine, product_ids, writer=None):
+        """`engine.analyze(conn, product_ids)`, served from the cache when possible.
+
+        `writer` opens a connection for persisting misses (e.g.
+        `CatalogRepository.writer`); without it they are written and committed on `conn`.
+        """
+        ids = sorted(set(product_ids))
+        if not ids:
+            return []
+        key = fingerprint(ids, catalog_db.last_changed(conn, ids), engine.version)
+        findings = self._get_memory(key)
+        if findings is not None:
+            return list(findings)
+        text = self._get_disk(conn, key)
+        if text is not None:
+            self._count("disk_hits")
+            findings = decode(text)
+        else:
+            self._count("misses")
+            findings = tuple(engine.analyze(conn, ids))
+            text = encode(findings)
+            with writer() if writer is not None else contextlib.nullcontext(conn) as write_conn:
+                self._put_disk(write_conn, key, ids, text)
+            if writer is None:
+                conn.commit()
+        self._put_memory(key, findings, len(text))
+        return list(findings)
+
+
+def prune(conn, disk_ttl=DISK_TTL):
+    """Deletes persisted entries older than `disk_ttl` seconds; returns how many."""
+    cutoff = time.time() - disk_ttl
+    conn.execute(
+        "DELETE FROM routine_cache_members WHERE fingerprint IN "
+        "(SELECT fingerprint FROM routine_cache WHERE created_at <= ?)",
+        (cutoff,),
+    )
+    return conn.execute("DELETE FROM routine_cache WHERE created_at <= ?", (cutoff,)).rowcount
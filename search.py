@@ -0,0 +1,178 @@
+"""Search-as-you-type over the product catalog.
+
+Queries are normalized with the same `normalize_search_text()` used to index
+the catalog. They then run as an all-words match on `products_fts`, with only
+the last word treated as a prefix, since it is the one still being typed, and
+are ranked by FTS5's bm25 with the column weights in `catalog_db.FTS_RANK`. If
+that finds too few products, each word is checked against the `search_terms`
+vocabulary. Misspelled words are corrected through its trigram shadow table,
+and words split by a stray space ("de tan") are joined. The corrected query
+then fills the remaining slots. Results are cached per normalized query until
+the catalog version changes.
+"""
+import difflib
+import re
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import catalog_db
+
+MAX_TRIGRAMS = 12
+MIN_SIMILARITY = 0.75
+
+
+class SearchResult(NamedTuple):
+    id: int
+    product_name: str
+    brand: str
+    category: str
+    score: float  # -bm25 (FTS5's rank), higher is better
+
+
+class QueryCache:
+    """Thread-safe LRU of recent results, emptied whenever the catalog version moves."""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+                return None
+            results = self._entries.get(key)
+            if results is not None:
+                self._entries.move_to_end(key)
+            return results
+
+    def put(self, key, version, results):
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = results
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def match_expression(tokens):
+    """All words must appear; only the last one may be a prefix ("dot key ci" -> dot AND key AND ci*)."""
+    *complete, partial = tokens
+    return " AND ".join([*(f'"{token}"' for token in complete), f'"{partial}"*'])
+
+
+def trigram_expression(word):
+    grams = list(dict.fromkeys(word[i:i + 3] for i in range(len(word) - 2)))
+    return " OR ".join(f'"{gram}"' for gram in grams[:MAX_TRIGRAMS])
+
+
+# `rank` is the bm25(...) configured on products_fts by catalog_db.FTS_RANK.
+_RANKED_SQL = """
+    SELECT rowid, -rank FROM products_fts
+    WHERE products_fts MATCH ?
+    ORDER BY rank
+    LIMIT ?
+"""
+
+
+class ProductSearch:
+    """Ranked product search on one connection; share a `QueryCache` between instances."""
+
+    def __init__(self, conn, cache=None):
+        self.conn = conn
+        self.cache = cache if cache is not None else QueryCache()
+
+    def tokens(self, text):
+        normalized = catalog_db.normalize_query(self.conn, text) or ""
+        tokens = re.findall(r"[^\W_]+", normalized)
+        # A lone trailing letter matches a huge share of the catalog; wait for the next keystroke.
+        if len(tokens) > 1 and len(tokens[-1]) == 1:
+            tokens.pop()
+        return tokens
+
+    def search(self, text, limit=10):
+        """Returns up to `limit` SearchResults, best match first."""
+        tokens = self.tokens(text)
+        if not tokens or sum(map(len, tokens)) < 2:
+            return []
+        key = (" ".join(tokens), limit)
+        version = catalog_db.catalog_version(self.conn)
+        results = self.cache.get(key, version)
+        if results is None:
+            results = self._run(tokens, limit)
+            self.cache.put(key, version, results)
+        return results
+
+    def _run(self, tokens, limit):
+        hits = self._ranked(tokens, limit)
+        if len(hits) < limit:
+            corrected = self.correct(tokens)
+            if corrected and corrected != tokens:
+                seen = {product_id for product_id, _ in hits}
+                extra = [hit for hit in self._ranked(corrected, limit) if hit[0] not in seen]
+                hits += extra[:limit - len(hits)]
+        if not hits:
+            return []
+        placeholders = ", ".join("?" * len(hits))
+        rows = {row[0]: row for row in self.conn.execute(
+            f"SELECT id, product_name, brand, category FROM products WHERE id IN ({placeholders})",
+            [product_id for product_id, _ in hits],
+        )}
+        return [SearchResult(*rows[product_id], score) for product_id, score in hits if product_id in rows]
+
+    def _ranked(self, tokens, limit):
+        """The best `limit` matches of `tokens` over the whole catalog, as `(product id, score)` pairs."""
+        return self.conn.execute(_RANKED_SQL, (match_expression(tokens), limit)).fetchall()
+
+    # --- SPELLING CORRECTION ---
+    def _known(self, word, prefix):
+        if prefix:
+            sql = "SELECT 1 FROM search_terms WHERE term >= ? AND term < ? LIMIT 1"
+            return self.conn.execute(sql, (word, word + "\uffff")).fetchone() is not None
+        return self.conn.execute("SELECT 1 FROM search_terms WHERE term = ?", (word,)).fetchone() is not None
+
+    def _closest(self, word, prefix):
+        if len(word) < 3:
+            return None
+        candidates = [row[0] for row in self.conn.execute(
+            "SELECT term FROM search_terms_trigram WHERE search_terms_trigram MATCH ? ORDER BY rank LIMIT 50",
+            (trigram_expression(word),),
+        )]
+        best, best_score = None, MIN_SIMILARITY
+        for candidate in candidates:
+            # While typing, compare against a same-length start of the candidate.
+            target = candidate[:len(word) + 1] if prefix else candidate
+            score = difflib.SequenceMatcher(None, word, target).ratio()
+            if score > best_score:
+                best, best_score = candidate, score
+        return best
+
+    def correct(self, tokens):
+        """Maps each query word onto the catalog vocabulary, dropping words with no close match."""
+        corrected = []
+        i = 0
+        while i < len(tokens):
+            token, last = tokens[i], i == len(tokens) - 1
+            if self._known(token, prefix=last):
+                corrected.append(token)
+                i += 1
+                continue
+            if not last:
+                joined = token + tokens[i + 1]
+                if self._known(joined, prefix=i + 1 == len(tokens) - 1):
+                    corrected.append(joined)
+                    i += 2
+                    continue
+            guess = self._closest(token, prefix=last)
+            if guess is not None:
+                corrected.append(guess)
+            i += 1
+        return corrected
@@ -0,0 +1,383 @@
+"""Compiled, memory-mapped snapshot of the product catalog for read-mostly processes.
+
+`python -m snapshot build` compiles products.db into one read-only file. It holds
+an interned string table, the products sorted by id with their ingredient ids in
+label order, the ingredient dictionary, and offset indexes for lookups by id, by
+name and by ingredient. Every server process maps the same file, so they all
+share one copy of the catalog in the page cache instead of each keeping its own
+heap of Python strings. Opening it takes milliseconds at any catalog size.
+
+Nothing is decoded on open. A `ProductView` is just a row number, and each
+field is decoded when it is read. The header records the `db_stamp` the
+snapshot was compiled from, so `open_snapshot` can recompile when the catalog
+has moved on. It also stores a CRC32 of the body, which `verify()` checks.
+
+Arrays are stored in the compiling machine's byte order: like the
+recommendation index, a snapshot is a per-host build artifact.
+"""
+import argparse
+import bisect
+import mmap
+import os
+import struct
+import time
+import zlib
+from array import array
+
+import streamlit as st
+
+import catalog_db
+
+FORMAT_VERSION = 1
+MAGIC = b"DSCATSNP"
+BYTE_ORDER_MARK = 0x01020304  # reads back differently on a machine of the other endianness
+NONE = 0xFFFFFFFF  # string index of a NULL brand or category
+ALIGN = 8
+
+# Section name -> array typecode. Offsets ("*_offsets") have one extra entry,
+# so item i spans [offsets[i], offsets[i + 1]).
+SECTIONS = {
+    "string_offsets": "I",  # string i -> its UTF-8 bytes in "strings"
+    "strings": "B",
+    "product_ids": "q",  # ascending, so lookups by id bisect
+    "product_fields": "I",  # (name, brand, category) string indexes per product
+    "ingredient_offsets": "I",  # product row -> its run of "ingredient_refs"
+    "ingredient_refs": "I",  # ingredient rows, in label order
+    "ingredient_ids": "q",  # ascending
+    "ingredient_names": "I",  # ingredient row -> string index of its canonical name
+    "names_sorted": "I",  # product rows ordered by the UTF-8 bytes of their names
+    "posting_offsets": "I",  # ingredient row -> its run of "postings"
+    "postings": "I",  # product rows, ascending
+}
+
+# magic, format, byte-order mark, CRC32 of everything after the header,
+# db_stamp, then (offset, length in bytes) for each section.
+_HEADER = struct.Struct("=8sIII3q" + "QQ" * len(SECTIONS))
+
+
+def snapshot_path(db_path=catalog_db.DB_PATH):
+    """Where the snapshot of the catalog at `db_path` lives: next to it."""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), "products.snapshot")
+
+
+SNAPSHOT_PATH = snapshot_path()
+
+
+def db_stamp(conn):
+    """(catalog version, ingredient count, synonym count): changes whenever a snapshot of `conn` would."""
+    counts = conn.execute(
+        "SELECT (SELECT COUNT(*) FROM ingredients), (SELECT COUNT(*) FROM ingredient_synonyms)"
+    ).fetchone()
+    return (catalog_db.catalog_version(conn), *counts)
+
+
+# --- COMPILING ---
+class _StringTable:
+    """Interns strings into one UTF-8 blob plus an offsets array."""
+
+    def __init__(self):
+        self.index = {}
+        self.offsets = array("I", [0])
+        self.data = bytearray()
+
+    def add(self, text):
+        if text is None:
+            return NONE
+        i = self.index.get(text)
+        if i is None:
+            i = self.index[text] = len(self.offsets) - 1
+            self.data += text.encode()
+            self.offsets.append(len(self.data))
+        return i
+
+
+def _compile_sections(conn):
+    strings = _StringTable()
+    ingredient_ids, ingredient_names, rows_by_ingredient = array("q"), array("I"), {}
+    for ingredient_id, name in conn.execute("SELECT id, name FROM ingredients ORDER BY id"):
+        rows_by_ingredient[ingredient_id] = len(ingredient_ids)
+        ingredient_ids.append(ingredient_id)
+        ingredient_names.append(strings.add(name))
+
+    product_ids, fields, names = array("q"), array("I"), []
+    for product_id, name, brand, category in conn.execute(
+        "SELECT id, product_name, brand, category FROM products ORDER BY id"
+    ):
+        names.append(name.encode())
+        product_ids.append(product_id)
+        fields.extend((strings.add(name), strings.add(brand), strings.add(category)))
+
+    # Postings come back grouped by product in id order, so a cursor over the
+    # product rows keeps up with them without a lookup per posting.
+    ingredient_offsets, refs = array("I", [0]), array("I")
+    postings = [array("I") for _ in ingredient_ids]
+    row = 0
+    for product_id, ingredient_id in conn.execute(
+        "SELECT product_id, ingredient_id FROM product_ingredients ORDER BY product_id, position"
+    ):
+        while row < len(product_ids) and product_ids[row] < product_id:
+            row += 1
+            ingredient_offsets.append(len(refs))
+        if row == len(product_ids) or product_ids[row] != product_id:
+            continue  # a posting whose product is gone
+        ingredient = rows_by_ingredient[ingredient_id]
+        refs.append(ingredient)
+        postings[ingredient].append(row)
+    ingredient_offsets.extend([len(refs)] * (len(product_ids) + 1 - len(ingredient_offsets)))
+
+    posting_offsets, posting_rows = array("I", [0]), array("I")
+    for rows in postings:
+        posting_rows.extend(rows)
+        posting_offsets.append(len(posting_rows))
+
+    return {
+        "string_offsets": strings.offsets,
+        "strings": strings.data,
+        "product_ids": product_ids,
+        "product_fields": fields,
+        "ingredient_offsets": ingredient_offsets,
+        "ingredient_refs": refs,
+        "ingredient_ids": ingredient_ids,
+        "ingredient_names": ingredient_names,
+        "names_sorted": array("I", sorted(range(len(names)), key=names.__getitem__)),
+        "posting_offsets": posting_offsets,
+        "postings": posting_rows,
+    }
+
+
+def compile_snapshot(conn, path=SNAPSHOT_PATH):
+    """Writes a snapshot of the catalog behind `conn` to `path`, atomically; returns its db_stamp.
+
+    Processes that still map the old file keep reading it until they reopen.
+    """
+    # One read transaction, so the stamp and the contents agree.
+    own_transaction = not conn.in_transaction
+    if own_transaction:
+        conn.execute("BEGIN")
+    try:
+        stamp = db_stamp(conn)
+        sections = _compile_sections(conn)
+    finally:
+        if own_transaction:
+            conn.rollback()
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    layout, crc, offset = [], 0, _HEADER.size
+    with open(tmp_path, "wb") as f:
+        f.write(bytes(_HEADER.size))
+        for name in SECTIONS:
+            padding = bytes(-offset % ALIGN)
+            data = memoryview(sections[name]).cast("B")
+            f.write(padding)
+            f.write(data)
+            crc = zlib.crc32(data, zlib.crc32(padding, crc))
+            offset += len(padding)
+            layout += [offset, len(data)]
+            offset += len(data)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDER_MARK, crc, *stamp, *layout))
+    os.replace(tmp_path, path)
+    return stamp
+
+
+# --- READING ---
+class ProductView:
+    """One product in a snapshot; fields are decoded from the mapping on access."""
+
+    __slots__ = ("_snapshot", "_row")
+
+    def __init__(self, snapshot, row):
+        self._snapshot = snapshot
+        self._row = row
+
+    @property
+    def id(self):
+        return self._snapshot._product_ids[self._row]
+
+    @property
+    def product_name(self):
+        return self._snapshot._string(self._snapshot._product_fields[3 * self._row])
+
+    @property
+    def brand(self):
+        return self._snapshot._string(self._snapshot._product_fields[3 * self._row + 1])
+
+    @property
+    def category(self):
+        return self._snapshot._string(self._snapshot._product_fields[3 * self._row + 2])
+
+    def _ingredient_rows(self):
+        snapshot = self._snapshot
+        offsets = snapshot._ingredient_offsets
+        return snapshot._ingredient_refs[offsets[self._row]:offsets[self._row + 1]]
+
+    @property
+    def ingredient_ids(self):
+        """Canonical ingredient ids, in label order."""
+        ids = self._snapshot._ingredient_ids
+        return [ids[i] for i in self._ingredient_rows()]
+
+    @property
+    def ingredients(self):
+        """Canonical ingredient names (as `ingredients.ingredients_of` returns them), in label order."""
+        snapshot = self._snapshot
+        return [snapshot._string(snapshot._ingredient_names[i]) for i in self._ingredient_rows()]
+
+    def __repr__(self):
+        return f"ProductView(id={self.id}, product_name={self.product_name!r})"
+
+
+class CatalogSnapshot:
+    """A read-only, memory-mapped catalog snapshot (see the module docstring)."""
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # an empty file cannot be mapped
+                raise ValueError(f"{path}: not a catalog snapshot") from None
+        buffer = memoryview(self._mmap)
+        self._views = [buffer]
+        if len(buffer) < _HEADER.size:
+            raise ValueError(f"{path}: not a catalog snapshot")
+        magic, fmt, mark, self.crc, *fields = _HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a catalog snapshot")
+        if fmt != FORMAT_VERSION or mark != BYTE_ORDER_MARK:
+            raise ValueError(f"{path}: unsupported snapshot format {fmt} (or another machine's byte order)")
+        self.stamp = tuple(fields[:3])
+        layout = fields[3:]
+        for i, (name, typecode) in enumerate(SECTIONS.items()):
+            offset, length = layout[2 * i], layout[2 * i + 1]
+            if offset + length > len(buffer) or length % array(typecode).itemsize:
+                raise ValueError(f"{path}: truncated snapshot")
+            view = buffer[offset:offset + length].cast(typecode)
+            self._views.append(view)
+            setattr(self, f"_{name}", view)
+        self._body = (_HEADER.size, offset + length)
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def verify(self):
+        """Checks the body against the CRC32 in the header (reads the whole file)."""
+        start, end = self._body
+        return zlib.crc32(self._views[0][start:end]) == self.crc
+
+    def is_current(self, conn):
+        return self.stamp == db_stamp(conn)
+
+    def _string(self, index):
+        if index == NONE:
+            return None
+        offsets = self._string_offsets
+        return str(self._strings[offsets[index]:offsets[index + 1]], "utf-8")
+
+    # --- LOOKUPS ---
+    def __len__(self):
+        return len(self._product_ids)
+
+    def __iter__(self):
+        return (ProductView(self, row) for row in range(len(self._product_ids)))
+
+    def get(self, product_id):
+        ids = self._product_ids
+        row = bisect.bisect_left(ids, product_id)
+        return ProductView(self, row) if row < len(ids) and ids[row] == product_id else None
+
+    def get_by_name(self, product_name):
+        target = product_name.encode()
+        offsets, fields, data = self._string_offsets, self._product_fields, self._strings
+
+        def name_bytes(row):
+            index = fields[3 * row]
+            return data[offsets[index]:offsets[index + 1]].tobytes()
+
+        order = self._names_sorted
+        i = bisect.bisect_left(order, target, key=name_bytes)
+        return ProductView(self, order[i]) if i < len(order) and name_bytes(order[i]) == target else None
+
+    def ingredient_name(self, ingredient_id):
+        ids = self._ingredient_ids
+        row = bisect.bisect_left(ids, ingredient_id)
+        return self._string(self._ingredient_names[row]) if row < len(ids) and ids[row] == ingredient_id else None
+
+    def products_containing(self, ingredient_id):
+        """Ids of products listing the canonical ingredient `ingredient_id`, ascending."""
+        ids = self._ingredient_ids
+        row = bisect.bisect_left(ids, ingredient_id)
+        if row == len(ids) or ids[row] != ingredient_id:
+            return []
+        offsets, product_ids = self._posting_offsets, self._product_ids
+        return [product_ids[i] for i in self._postings[offsets[row]:offsets[row + 1]]]
+
+
+def open_snapshot(conn, path=SNAPSHOT_PATH):
+    """Maps the snapshot at `path`, compiling it first if it is missing, unreadable or older than `conn`."""
+    try:
+        snapshot = CatalogSnapshot(path)
+    except (OSError, ValueError):
+        snapshot = None
+    if snapshot is not None and snapshot.is_current(conn):
+        return snapshot
+    if snapshot is not None:
+        snapshot.close()
+    compile_snapshot(conn, path)
+    return CatalogSnapshot(path)
+
+
+@st.cache_resource
+def get_snapshot():
+    """The process-wide snapshot of products.db. Recompile (`python -m snapshot build`) after catalog loads."""
+    conn = catalog_db.connect()
+    try:
+        return open_snapshot(conn)
+    finally:
+        conn.close()
+
+
+# --- COMMAND LINE ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DermaScribe catalog snapshot.")
+    parser.add_argument("--db", default=catalog_db.DB_PATH, help="path to products.db")
+    parser.add_argument("--snapshot", help="path to the snapshot (default: next to the database)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("build", help="compile the snapshot from the database")
+    commands.add_parser("check", help="verify the snapshot's checksum and that it matches the database")
+    show = commands.add_parser("show", help="print one product from the snapshot")
+    show.add_argument("product_id", type=int)
+    args = parser.parse_args(argv)
+
+    conn = catalog_db.connect(args.db)
+    path = args.snapshot or snapshot_path(args.db)
+    if args.command == "build":
+        start = time.perf_counter()
+        compile_snapshot(conn, path)
+        print(f"Compiled {path} ({os.path.getsize(path) / 2**20:.1f} MiB) in {time.perf_counter() - start:.1f} s")
+        return
+    with CatalogSnapshot(path) as snapshot:
+        if args.command == "check":
+            intact, current = snapshot.verify(), snapshot.is_current(conn)
+            print(f"{len(snapshot):,} products; checksum {'ok' if intact else 'MISMATCH'}; "
+                  f"{'current' if current else 'stale'} (stamp {snapshot.stamp}, database {db_stamp(conn)})")
+            if not (intact and current):
+                raise SystemExit(1)
+            return
+        product = snapshot.get(args.product_id)
+        if product is None:
+            raise SystemExit(f"No product {args.product_id} in {path}")
+        print(f"{product.id}  {product.product_name}  [{product.brand} / {product.category}]")
+        print(", ".join(product.ingredients))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""Process-wide performance telemetry: SQLite statement timing, a slow-query log and rerun times.
+
+Connections opened with `factory=connection_class()` sample one statement in
+SQL_SAMPLE_EVERY. A sampled statement is timed from `execute` through its last
+fetch and its rows are counted; it is weighted by SQL_SAMPLE_EVERY in the
+histograms. Every other statement only has its `execute` timed, and its rows
+are fetched by sqlite3 in C, untouched. Any statement found slower than
+SLOW_QUERY_MS is added to `slow_queries` with its EXPLAIN QUERY PLAN. Each plan
+is captured once per statement text.
+render_profile.rerun() reports every page rerun and its profiled render
+functions here, so a slow page can be split into SQLite time, render-function
+time (images included) and the rest of the rerun.
+
+Everything is aggregated into Prometheus-style histograms. Scrape them from
+http://127.0.0.1:DERMASCRIBE_METRICS_PORT/metrics (default 9464) or browse them
+on the Admin page. DERMASCRIBE_TELEMETRY=0 turns all of it off, and
+connection_class() then returns plain sqlite3.Connection.
+"""
+import bisect
+import collections
+import functools
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple, Optional
+
+ENABLED = os.environ.get("DERMASCRIBE_TELEMETRY", "1") != "0"
+METRICS_PORT = int(os.environ.get("DERMASCRIBE_METRICS_PORT", "9464"))  # 0: no endpoint
+SLOW_QUERY_MS = float(os.environ.get("DERMASCRIBE_SLOW_QUERY_MS", "25"))
+SQL_SAMPLE_EVERY = max(1, int(os.environ.get("DERMASCRIBE_SQL_SAMPLE_EVERY", "8")))
+SLOW_LOG_ENTRIES = 200
+PLAN_CACHE_ENTRIES = 256
+FLUSH_EVERY = 4096  # statements buffered before they are folded into the histograms
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 10000, 100000)
+BYTE_BUCKETS = (1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 1000000)
+
+
+# --- METRICS ---
+def _format(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Thread-safe Prometheus histogram with optional labels; observe() in seconds (or rows, bytes)."""
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}  # label values -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        self.observe_many(((value, labels, 1),))
+
+    def observe_many(self, observations):
+        """observe() for many (value, label values, weight) triples under a single lock.
+
+        A sampled observation standing for `weight` of them counts that many times.
+        """
+        buckets = self.buckets
+        with self._lock:
+            for value, labels, weight in observations:
+                series = self._series.get(labels)
+                if series is None:
+                    series = self._series[labels] = [[0] * (len(buckets) + 1), 0.0]
+                series[0][bisect.bisect_left(buckets, value)] += weight
+                series[1] += value * weight
+
+    def series(self):
+        """{label values: (count, sum, per-bucket counts)}, a consistent copy."""
+        with self._lock:
+            return {labels: (sum(counts), total, list(counts)) for labels, (counts, total) in self._series.items()}
+
+    def quantile(self, q, counts):
+        """Estimates the q-quantile from per-bucket counts, interpolating within the bucket."""
+        count = sum(counts)
+        if not count:
+            return 0.0
+        rank, seen = q * count, 0
+        for i, n in enumerate(counts):
+            if seen + n >= rank and n:
+                low = self.buckets[i - 1] if i else 0.0
+                high = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return low + (high - low) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (count, total, counts) in sorted(self.series().items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_format(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_format(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = collections.Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines += [f"{self.name}{_labels(self.labelnames, labels)} {_format(value)}" for labels, value in values]
+        return lines
+
+
+STATEMENT_SECONDS = Histogram(
+    "dermascribe_sqlite_statement_seconds",
+    "SQLite statement time, execute through last fetch (sampled, scaled to all statements).",
+    labelnames=("statement",))
+STATEMENT_ROWS = Histogram(
+    "dermascribe_sqlite_statement_rows",
+    "Rows returned (or changed) per SQLite statement (sampled, scaled to all statements).",
+    ROW_BUCKETS, labelnames=("statement",))
+SLOW_QUERIES = Counter(
+    "dermascribe_sqlite_slow_queries_total", "SQLite statements slower than the slow-query threshold.",
+    labelnames=("statement",))
+RERUN_SECONDS = Histogram(
+    "dermascribe_rerun_seconds", "Wall time of one Streamlit rerun of a page.", labelnames=("page",))
+RERUN_BYTES = Histogram(
+    "dermascribe_rerun_bytes", "Bytes sent to the browser by one rerun of a page.", BYTE_BUCKETS, labelnames=("page",))
+RENDER_SECONDS = Histogram(
+    "dermascribe_render_function_seconds", "Wall time spent in a profiled render function during one rerun.",
+    labelnames=("page", "function"))
+
+METRICS = [STATEMENT_SECONDS, STATEMENT_ROWS, SLOW_QUERIES, RERUN_SECONDS, RERUN_BYTES, RENDER_SECONDS]
+
+
+def expose():
+    """All metrics in the Prometheus text exposition format."""
+    flush()
+    return "\n".join(line for metric in METRICS for line in metric.expose()) + "\n"
+
+
+# --- SQLITE ---
+class SlowQuery(NamedTuple):
+    at: float  # time.time()
+    ms: float
+    rows: Optional[int]  # None when the statement was not sampled
+    statement: str  # the metric label
+    sql: str
+    plan: tuple  # EXPLAIN QUERY PLAN detail lines, empty if unavailable
+
+
+slow_queries = collections.deque(maxlen=SLOW_LOG_ENTRIES)
+_pending = collections.deque()  # (sql, seconds, rows, weight) not yet in the histograms
+_flush_lock = threading.Lock()
+_plans = {}
+
+_WHITESPACE = re.compile(r"\s+")
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE|TRIGGER)\s+\"?(\w+)", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def statement_label(sql):
+    """A low-cardinality metric label: the verb and first table, e.g. "SELECT products"."""
+    words = sql.split(None, 1)
+    verb = words[0].upper() if words else "?"
+    table = _TABLE.search(sql)
+    return f"{verb} {table.group(1)}" if table else verb
+
+
+def _query_plan(conn, sql, parameters):
+    text = _WHITESPACE.sub(" ", sql).strip()
+    plan = _plans.get(text)
+    if plan is None:
+        try:
+            rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+            plan = tuple(row[3] for row in rows)
+        except (sqlite3.Error, ValueError):
+            plan = ()
+        if len(_plans) >= PLAN_CACHE_ENTRIES:
+            _plans.clear()
+        _plans[text] = plan
+    return text, plan
+
+
+def record_slow(conn, sql, parameters, seconds, rows=None):
+    label = statement_label(sql)
+    SLOW_QUERIES.inc(label)
+    text, plan = _query_plan(conn, sql, parameters) if parameters is not None else (sql, ())
+    slow_queries.append(SlowQuery(time.time(), seconds * 1000, rows, label, text, plan))
+
+
+def record_statement(conn, sql, parameters, seconds, rows, weight=1):
+    # Only the slow path does any work here; the histograms are updated a batch at a time.
+    _pending.append((sql, seconds, rows, weight))
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        record_slow(conn, sql, parameters, seconds, rows)
+    if len(_pending) >= FLUSH_EVERY:
+        flush()
+
+
+def flush():
+    """Folds the statements recorded so far into the statement histograms; call it before reading them."""
+    with _flush_lock:
+        batch = [_pending.popleft() for _ in range(len(_pending))]
+    labelled = [(statement_label(sql), seconds, rows, weight) for sql, seconds, rows, weight in batch]
+    STATEMENT_SECONDS.observe_many((seconds, (label,), weight) for label, seconds, _, weight in labelled)
+    STATEMENT_ROWS.observe_many((rows, (label,), weight) for label, _, rows, weight in labelled)
+
+
+_Connection = sqlite3.Connection
+_Cursor = sqlite3.Cursor
+_clock = time.perf_counter
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Times a statement across execute and every fetch; it is recorded once exhausted, re-executed or dropped.
+
+    This sits on the sampled queries, so it calls the base class directly
+    instead of going through super().
+    """
+
+    _sql = None  # the statement still being fetched
+    _weight = 1  # statements this one stands for in the histograms
+
+    def execute(self, sql, parameters=()):
+        if self._sql is not None:
+            self._finish()
+        start = _clock()
+        _Cursor.execute(self, sql, parameters)
+        seconds = _clock() - start
+        if self.description is None:  # nothing to fetch: DML, DDL, PRAGMA with no result
+            record_statement(self.connection, sql, parameters, seconds, max(self.rowcount, 0), self._weight)
+        else:
+            self._sql, self._parameters, self._seconds, self._rows = sql, parameters, seconds, 0
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        if self._sql is not None:
+            self._finish()
+        start = _clock()
+        _Cursor.executemany(self, sql, seq_of_parameters)
+        record_statement(self.connection, sql, None, _clock() - start, max(self.rowcount, 0))
+        return self
+
+    def _finish(self):
+        sql, self._sql = self._sql, None
+        record_statement(self.connection, sql, self._parameters, self._seconds, self._rows, self._weight)
+
+    def fetchone(self):
+        start = _clock()
+        row = _Cursor.fetchone(self)
+        if self._sql is not None:
+            self._seconds += _clock() - start
+            if row is None:
+                self._finish()
+            else:
+                self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = _clock()
+        rows = _Cursor.fetchmany(self, size)
+        if self._sql is not None:
+            self._seconds += _clock() - start
+            self._rows += len(rows)
+            if len(rows) < size:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        start = _clock()
+        rows = _Cursor.fetchall(self)
+        if self._sql is not None:
+            self._seconds += _clock() - start
+            self._rows += len(rows)
+            self._finish()
+        return rows
+
+    def __next__(self):
+        start = _clock()
+        try:
+            row = _Cursor.__next__(self)
+        except StopIteration:
+            if self._sql is not None:
+                self._seconds += _clock() - start
+                self._finish()
+            raise
+        if self._sql is not None:
+            self._seconds += _clock() - start
+            self._rows += 1
+        return row
+
+    def close(self):
+        if self._sql is not None:
+            self._finish()
+        _Cursor.close(self)
+
+    def __del__(self):
+        if self._sql is not None:
+            try:
+                self._finish()
+            except Exception:  # the connection may already be closed
+                pass
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3.Connection that samples `execute` onto a TimedCursor and times the rest cheaply.
+
+    Unsampled statements return a plain cursor after timing only `execute`, so
+    fetching their rows costs nothing extra; that covers all of a point lookup,
+    and the sort or aggregate of most slow queries. Explicit `cursor()`s and
+    `executemany` (writes) are always timed in full.
+    """
+
+    _countdown = 1  # statements until the next sampled one
+
+    def cursor(self, factory=TimedCursor):
+        return _Connection.cursor(self, factory)
+
+    def execute(self, sql, parameters=()):
+        countdown = self._countdown - 1
+        if countdown:
+            self._countdown = countdown
+            start = _clock()
+            cursor = _Connection.execute(self, sql, parameters)
+            seconds = _clock() - start
+            if seconds * 1000 >= SLOW_QUERY_MS:
+                record_slow(self, sql, parameters, seconds)
+            return cursor
+        self._countdown = SQL_SAMPLE_EVERY
+        cursor = TimedCursor(self)
+        cursor._weight = SQL_SAMPLE_EVERY
+        return cursor.execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return TimedCursor(self).executemany(sql, seq_of_parameters)
+
+
+def connection_class():
+    """The `factory=` for sqlite3.connect: TimedConnection, or plain Connection when telemetry is off."""
+    return TimedConnection if ENABLED else sqlite3.Connection
+
+
+# --- STREAMLIT RERUNS ---
+def record_rerun(profile):
+    """Records a finished render_profile.RerunProfile."""
+    if not ENABLED:
+        return
+    RERUN_SECONDS.observe(profile.ms / 1000, profile.page)
+    if profile.bytes is not None:
+        RERUN_BYTES.observe(profile.bytes, profile.page)
+    for name, cost in profile.functions.items():
+        if cost.calls:
+            RENDER_SECONDS.observe(cost.ms / 1000, profile.page, name)
+
+
+# --- PROMETHEUS ENDPOINT ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = expose().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def start_exporter(port=METRICS_PORT):
+    """Serves /metrics on 127.0.0.1:`port` from a daemon thread, once per process; returns the port or None."""
+    global _exporter
+    if _exporter is not None or not ENABLED or not port:
+        return _exporter.server_port if _exporter else None
+    with _exporter_lock:
+        if _exporter is None:
+            try:
+                _exporter = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+            except OSError as e:  # e.g. another server process on this host has the port
+                print(f"telemetry: not serving metrics on port {port}: {e}", file=sys.stderr)
+                _exporter = False
+                return None
+            threading.Thread(target=_exporter.serve_forever, name="telemetry-metrics", daemon=True).start()
+    return _exporter.server_port if _exporter else None
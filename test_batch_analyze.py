@@ -0,0 +1,86 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import batch_analyze
+import catalog_db
+import ingest
+
+PRODUCTS = [
+    {"product_name": "Retinol Night Serum", "brand": "Minimalist", "ingredients_list": ["Water", "Retinol"]},
+    {"product_name": "Glycolic Toner", "brand": "Pilgrim", "ingredients_list": ["Water", "Glycolic Acid"]},
+    {"product_name": "Cica Calming Gel", "brand": "Dot & Key", "ingredients_list": ["Aqua", "CICA"]},
+]
+
+
+@pytest.fixture
+def analyzer(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    conn = catalog_db.connect(path)
+    ingest.ingest(conn, iter(PRODUCTS), log=lambda message: None)
+    conn.close()
+    analyzer = batch_analyze.BatchAnalyzer(path, workers=1, chunk_size=2)
+    yield analyzer
+    analyzer.close()
+
+
+def run(analyzer, lines):
+    output = []
+    analyzer.run(lines, output.append)
+    return [json.loads(line) for line in "".join(output).splitlines()]
+
+
+def all_slots_free(analyzer):
+    taken = [analyzer._slots.acquire(blocking=False) for _ in range(analyzer.max_inflight)]
+    for _ in range(sum(taken)):
+        analyzer._slots.release()
+    return all(taken)
+
+
+def test_bad_lines_fail_alone_and_results_keep_input_order(analyzer):
+    lines = [
+        json.dumps({"id": "a", "products": [1, 2]}),
+        "{not json",
+        json.dumps(["not", "an", "object"]),
+        json.dumps({"id": "b", "products": ["Cica Calming Gel", "No Such Product", 99]}),
+        json.dumps({"products": "not a list"}),
+    ]
+    results = run(analyzer, lines)
+    assert [result.get("id") for result in results] == ["a", None, None, "b", None]
+    assert results[0]["products"] == [1, 2] and "error" not in results[0]
+    assert [result["line"] for result in results if "error" in result] == [2, 3, 5]
+    assert results[3]["products"] == [3] and results[3]["unresolved"] == ["No Such Product", 99]
+    assert all_slots_free(analyzer)
+
+
+def test_pool_shut_down_before_submit_fails_the_chunk_and_frees_its_slot(analyzer):
+    dead = ProcessPoolExecutor(1)
+    dead.shutdown()
+    analyzer._pool.shutdown()
+    analyzer._pool = dead
+    lines = [json.dumps({"id": n, "products": [1]}) for n in range(5)]
+    results = run(analyzer, lines)
+    # Both chunks submitted before the first result is written hit the dead pool (max_inflight is 2).
+    assert [result.get("error") for result in results[:4]] == ["worker process failed"] * 4
+    assert [result["line"] for result in results[:4]] == [1, 2, 3, 4]
+    assert results[4]["id"] == 4 and "error" not in results[4]
+    assert analyzer._pool is not dead
+    assert all_slots_free(analyzer)
+
+
+def test_pool_replaced_by_another_batch_during_submit_is_retried(analyzer):
+    class Replaced(ProcessPoolExecutor):
+        def submit(self, *args, **kwargs):
+            # Another batch's _emit swaps the pool and shuts this one down under our feet.
+            with analyzer._lock:
+                analyzer._pool = analyzer._new_pool()
+            self.shutdown(wait=False)
+            return super().submit(*args, **kwargs)
+
+    analyzer._pool.shutdown()
+    analyzer._pool = Replaced(1)
+    results = run(analyzer, [json.dumps({"id": n, "products": [1, 2]}) for n in range(3)])
+    assert [result["id"] for result in results] == [0, 1, 2]
+    assert not any("error" in result for result in results)
+    assert all_slots_free(analyzer)
@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+
+import catalog_db
+import search
+
+
+@pytest.fixture
+def path(tmp_path, catalog):
+    catalog.executemany("INSERT INTO products(product_name, brand, category, ingredients_list) VALUES (?, ?, ?, '[]')", [
+        ("CICA Calming Gel", "Dot & Key", "gel"),
+        ("Watermelon Sunscreen", "Dot & Key", "sunscreen"),
+        ("Ubtan Face Wash", "Mama Earth", "cleanser"),
+    ])
+    catalog.commit()
+    return str(tmp_path / "catalog.db")
+
+
+def fts_is_consistent(conn):
+    try:
+        conn.execute("INSERT INTO products_fts(products_fts, rank) VALUES ('integrity-check', 1)")
+    except sqlite3.DatabaseError:
+        return False
+    return True
+
+
+def test_normalizer_folds_brand_aliases(catalog):
+    assert catalog_db.normalize_query(catalog, "Mama Earth's De-Tan") == "mamaearth detan"
+    assert catalog_db.normalize_query(catalog, "The Derma Company") == "the dermaco"
+
+
+def test_an_alias_edit_reaches_connections_opened_before_it(path):
+    other = catalog_db.connect(path)  # opened before the edit, with the old aliases loaded
+    editor = catalog_db.connect(path)
+    catalog_db.add_brand_alias(editor, "dot and key", "dotkey")
+    editor.close()
+
+    assert catalog_db.normalize_query(other, "Dot & Key gel") == "dotkey gel"
+    # Writes on the older connection must unindex with the aliases the index was built with.
+    other.execute("UPDATE products SET brand = 'Dot and Key Labs' WHERE product_name = 'CICA Calming Gel'")
+    other.execute("DELETE FROM products WHERE product_name = 'Watermelon Sunscreen'")
+    other.commit()
+    assert fts_is_consistent(other)
+    names = [result.product_name for result in search.ProductSearch(other).search("dotkey")]
+    assert names == ["CICA Calming Gel"]
+    other.close()
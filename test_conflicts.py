@@ -0,0 +1,65 @@
+import json
+import sqlite3
+
+import pytest
+
+import conflicts
+import ingest
+import ingredients
+
+
+def load(conn, records):
+    ingest.ingest(conn, iter(records), log=lambda message: None)
+    return {name: product_id for product_id, name in conn.execute("SELECT id, product_name FROM products")}
+
+
+@pytest.fixture
+def read_only(tmp_path, catalog):
+    conn = sqlite3.connect(f"file:{tmp_path / 'catalog.db'}?mode=ro", uri=True)
+    yield conn
+    conn.close()
+
+
+def test_rule_ingredients_are_registered_by_the_schema(catalog):
+    for name in ("Retinol", "Glycolic Acid", "Benzoyl Peroxide", "Sodium Ascorbyl Phosphate"):
+        assert ingredients.resolve(catalog, name) is not None
+
+
+def test_compiling_only_reads(catalog, read_only):
+    engine = conflicts.compile_rules(read_only)
+    assert engine.names and engine.version == conflicts.compile_rules(catalog).version
+
+
+def test_products_added_after_compiling_are_checked(catalog, read_only):
+    engine = conflicts.compile_rules(read_only)
+    ids = load(catalog, [
+        {"product_name": "Retinol Serum", "ingredients_list": ["Water", "retinol"]},
+        {"product_name": "Glycolic Toner", "ingredients_list": ["Aqua", "Glycolic Acid"]},
+    ])
+    findings = engine.analyze(read_only, [ids["Retinol Serum"], ids["Glycolic Toner"]])
+    assert [(f.ingredient_a, f.ingredient_b, f.severity) for f in findings] == [
+        ("Retinol", "Glycolic Acid", "high")]
+
+
+def test_citric_acid_as_a_ph_adjuster_is_not_flagged(catalog):
+    ids = load(catalog, [
+        {"product_name": "Retinol Serum", "ingredients_list": ["Water", "Retinol"]},
+        {"product_name": "Gentle Cleanser", "ingredients_list": ["Water", "Glycerin", "Citric Acid"]},
+        {"product_name": "Vitamin C Serum", "ingredients_list": ["Water", "Ascorbic Acid", "Citric Acid"]},
+    ])
+    engine = conflicts.compile_rules(catalog)
+    assert engine.analyze(catalog, [ids["Retinol Serum"], ids["Gentle Cleanser"]]) == []
+    assert engine.analyze(catalog, [ids["Gentle Cleanser"], ids["Vitamin C Serum"]]) == []
+
+
+def test_editing_the_rules_file_registers_new_ingredients(tmp_path, catalog):
+    rules = json.loads(open(conflicts.RULES_PATH, encoding="utf-8").read())
+    rules["groups"]["aha"].append("Tartaric Acid")
+    path = str(tmp_path / "rules.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(rules, f)
+    assert ingredients.resolve(catalog, "Tartaric Acid") is None
+    conflicts.register_ingredients(catalog, path)
+    tartaric = ingredients.resolve(catalog, "Tartaric Acid")
+    assert tartaric is not None
+    assert tartaric in conflicts.compile_rules(catalog, path).bit_of
@@ -0,0 +1,67 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import facescan
+
+
+def encode(image, fmt="PNG"):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="module")
+def photo():
+    rng = np.random.default_rng(3)
+    pixels = np.clip(rng.normal((200, 140, 120), 20, (400, 300, 3)), 0, 255).astype(np.uint8)
+    return encode(Image.fromarray(pixels), "JPEG")
+
+
+@pytest.fixture(scope="module")
+def bomb():
+    # A few KiB on the wire, but 200 million pixels once decoded.
+    return encode(Image.new("1", (20_000, 10_000)))
+
+
+def test_downsample_crops_to_the_model_input(photo):
+    array = facescan.downsample(photo)
+    assert array.shape == (facescan.INPUT_SIZE, facescan.INPUT_SIZE, 3) and array.dtype == np.uint8
+
+
+@pytest.mark.parametrize("data", [b"", b"not an image", b"\x89PNG\r\n\x1a\n" + b"\0" * 64])
+def test_downsample_rejects_unreadable_data(data):
+    with pytest.raises(ValueError, match="not a readable image"):
+        facescan.downsample(data)
+
+
+def test_downsample_rejects_truncated_photo(photo):
+    with pytest.raises(ValueError, match="not a readable image"):
+        facescan.downsample(photo[:len(photo) // 3])
+
+
+def test_downsample_refuses_decompression_bomb_before_decoding(bomb):
+    assert len(bomb) < 100_000
+    with pytest.raises(ValueError, match="too large"):
+        facescan.downsample(bomb)
+
+
+def test_one_bad_upload_fails_only_its_own_item(monkeypatch, photo, bomb):
+    monkeypatch.setattr(facescan, "_worker_model", facescan.ReferenceSkinModel())
+    items = [("a", photo), ("b", bomb), ("c", b"junk"), ("d", photo)]
+    results = facescan._scan_batch(items)
+    assert [type(result).__name__ for result in results] == ["ScanResult", "ValueError", "ValueError", "ScanResult"]
+    assert results[0].scores == results[3].scores
+
+
+def test_service_isolates_a_bomb_in_a_micro_batch(photo, bomb):
+    service = facescan.FaceScanService(workers=1, max_wait_ms=50)
+    try:
+        futures = [service.submit(photo), service.submit(bomb)]
+        assert futures[0].result(timeout=60).digest == facescan.image_digest(photo)
+        with pytest.raises(ValueError, match="too large"):
+            futures[1].result(timeout=60)
+    finally:
+        service.close()
@@ -0,0 +1,90 @@
+import io
+import json
+
+import pytest
+
+import catalog_db
+import ingest
+
+FEED = [
+    {"product_name": "Cica Calming Gel", "brand": "Dot & Key", "category": "gel",
+     "ingredients_list": ["Aqua", "CICA", "Niacinamide"]},
+    {"product_name": "Vitamin C Serum", "brand": "Minimalist", "category": "serum",
+     "ingredients_list": '["Water", "Vitamin C", "Tocopherol"]'},
+    {"product_name": "Daily Sunscreen", "brand": "Re'equil", "category": "sunscreen",
+     "ingredients": "Water, Zinc Oxide, Niacinamide"},
+    {"product_name": "Barrier Cream", "brand": 42, "category": None, "ingredients_list": []},
+]
+
+
+def load(conn, records, **kwargs):
+    return ingest.ingest(conn, iter(records), log=lambda message: None, **kwargs)
+
+
+def snapshot(conn):
+    """Everything the triggers (or a bulk rebuild) derive from `products`."""
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts_vocab USING fts5vocab(main, products_fts, instance)")
+    return {
+        "postings": conn.execute(
+            "SELECT p.product_name, i.name, pi.position FROM product_ingredients pi "
+            "JOIN products p ON p.id = pi.product_id JOIN ingredients i ON i.id = pi.ingredient_id ORDER BY 1, 2"
+        ).fetchall(),
+        "fts": conn.execute("SELECT term, doc, col, offset FROM temp.fts_vocab ORDER BY 1, 2, 3, 4").fetchall(),
+        "terms": conn.execute("SELECT * FROM search_terms ORDER BY 1").fetchall(),
+    }
+
+
+@pytest.mark.parametrize("record, reason", [
+    ({"product_name": "A", "ingredients_list": 42}, "not a list of strings"),
+    ({"product_name": "A", "ingredients_list": "[not json"}, "not valid JSON"),
+    ({"product_name": "A", "ingredients_list": '[{"Water": 1}]'}, "not a list of strings"),
+    ({"product_name": "A", "ingredients_list": '["Water", 3]'}, "not a list of strings"),
+    ({"product_name": "A", "brand": {"name": "Nested"}}, "brand is a dict"),
+    ({"product_name": "A", "category": ["serum"]}, "category is a list"),
+    ({"product_name": ["A"]}, "product_name is a list"),
+    ({"product_name": "A", "brand": True}, "brand is a bool"),
+])
+def test_to_row_rejects_non_scalar_fields(record, reason):
+    with pytest.raises(ValueError, match=reason):
+        ingest.to_row(record)
+
+
+def test_to_row_coerces_and_normalizes_labels():
+    assert ingest.to_row({"product_name": " Gel ", "brand": 42, "ingredients": "Aqua, , CICA"}) == (
+        "Gel", "42", None, '["Aqua", "CICA"]')
+    assert ingest.to_row({"product_name": "Gel", "ingredients_list": ' ["Aqua"] '})[3] == '["Aqua"]'
+    assert ingest.to_row({"product_name": "  "}) is None
+
+
+def test_bad_records_are_skipped_without_losing_the_batch(catalog):
+    messages = []
+    records = [*FEED, {"product_name": "Bad Brand", "brand": {"x": 1}},
+               {"product_name": "Bad Label", "ingredients_list": 42}, None]
+    read, written, skipped = ingest.ingest(catalog, iter(records), log=messages.append)
+    assert (read, written, skipped) == (7, 4, 3)
+    assert {row[0] for row in catalog.execute("SELECT product_name FROM products")} == {
+        record["product_name"] for record in FEED}
+    assert any(message.startswith("Record 5: skipped, brand is a dict") for message in messages)
+    assert any(message.startswith("Record 6: skipped, ingredients_list") for message in messages)
+
+
+def test_malformed_jsonl_lines_are_logged_and_skipped(catalog):
+    lines = [json.dumps(FEED[0]), "{not json", "[1, 2]", "", json.dumps(FEED[1])]
+    messages = []
+    records = ingest.read_feed(io.StringIO("\n".join(lines)), "jsonl", log=messages.append)
+    assert ingest.ingest(catalog, records, log=lambda message: None) == (4, 2, 2)
+    assert [message.split(",")[0] for message in messages] == ["Line 2: skipped", "Line 3: skipped"]
+
+
+def test_bulk_ingest_builds_the_same_indexes_as_the_triggers(tmp_path):
+    updated = [dict(FEED[0], ingredients_list=["Water", "Centella", "Panthenol"]), FEED[2]]
+    results = []
+    for bulk in (False, True):
+        conn = catalog_db.connect(str(tmp_path / f"bulk-{bulk}.db"))
+        load(conn, FEED, bulk=bulk)
+        load(conn, updated, bulk=bulk)
+        results.append(snapshot(conn))
+        conn.close()
+    trigger_path, bulk_path = results
+    assert trigger_path["postings"]
+    assert trigger_path == bulk_path
@@ -0,0 +1,69 @@
+import json
+
+import ingest
+import ingredients
+
+
+def add(conn, name, label):
+    text = label if isinstance(label, str) else json.dumps(label)
+    return conn.execute("INSERT INTO products(product_name, ingredients_list) VALUES (?, ?)", (name, text)).lastrowid
+
+
+def postings(conn):
+    return conn.execute("SELECT product_id, ingredient_id, position FROM product_ingredients ORDER BY 1, 2").fetchall()
+
+
+def test_insert_indexes_canonical_ingredients_in_label_order(catalog):
+    product = add(catalog, "Gel", ["Aqua", " cica ", "Niacinamide", "Water", "Vitamin B3"])
+    assert ingredients.ingredients_of(catalog, product) == ["Water", "Centella Asiatica", "Niacinamide"]
+    assert ingredients.products_containing(catalog, "Gotu Kola") == [product]
+    assert ingredients.products_containing_all(catalog, ["eau", "nicotinamide"]) == [product]
+
+
+def test_new_names_join_the_dictionary(catalog):
+    product = add(catalog, "Balm", ["Shea Butter", "shea butter ", "Beeswax"])
+    assert ingredients.ingredients_of(catalog, product) == ["Shea Butter", "Beeswax"]
+    assert ingredients.resolve(catalog, "SHEA BUTTER") == ingredients.resolve(catalog, "Shea Butter")
+
+
+def test_updates_and_deletes_keep_postings_in_sync(catalog):
+    product = add(catalog, "Serum", ["Water", "Ascorbic Acid"])
+    other = add(catalog, "Toner", ["Water", "Glycolic Acid"])
+    catalog.execute("UPDATE products SET ingredients_list = ? WHERE id = ?", ('["Water", "Retinol"]', product))
+    assert ingredients.products_containing(catalog, "Ascorbic Acid") == []
+    assert ingredients.products_containing(catalog, "Retinol") == [product]
+    catalog.execute("UPDATE products SET brand = 'Plum' WHERE id = ?", (other,))
+    assert ingredients.ingredients_of(catalog, other) == ["Water", "Glycolic Acid"]
+    catalog.execute("DELETE FROM products WHERE id = ?", (product,))
+    assert {row[0] for row in postings(catalog)} == {other}
+
+
+def test_upserts_reindex_through_the_triggers(catalog):
+    log = lambda message: None
+    ingest.ingest(catalog, iter([{"product_name": "Cream", "ingredients_list": ["Water", "Squalane"]}]), log=log)
+    ingest.ingest(catalog, iter([{"product_name": "Cream", "ingredients_list": ["Aqua", "Ceramide NP"]}]), log=log)
+    (product,) = ingredients.products_containing(catalog, "Ceramide NP")
+    assert ingredients.ingredients_of(catalog, product) == ["Water", "Ceramide NP"]
+    assert ingredients.products_containing(catalog, "Squalane") == []
+
+
+def test_malformed_labels_are_stored_but_not_indexed(catalog):
+    product = add(catalog, "Broken", '["Water", ')
+    assert catalog.execute("SELECT ingredients_list FROM products WHERE id = ?", (product,)).fetchone()[0] == '["Water", '
+    assert ingredients.ingredients_of(catalog, product) == []
+
+
+def test_add_synonym_merges_existing_postings(catalog):
+    product = add(catalog, "Mist", ["Rose Water", "Glycerin"])
+    ingredients.add_synonym(catalog, "Rose Water", "Rosa Damascena Flower Water")
+    assert ingredients.ingredients_of(catalog, product) == ["Rosa Damascena Flower Water", "Glycerin"]
+    assert ingredients.products_containing(catalog, "rose water") == [product]
+
+
+def test_rebuild_matches_the_triggers(catalog):
+    for name, label in [("A", ["Aqua", "CICA", "Water"]), ("B", ["Retinol", "Squalane"]), ("C", "not json")]:
+        add(catalog, name, label)
+    catalog.execute("UPDATE products SET ingredients_list = '[\"Niacinamide\"]' WHERE product_name = 'B'")
+    by_triggers = postings(catalog)
+    ingredients.rebuild_postings(catalog)
+    assert postings(catalog) == by_triggers
@@ -0,0 +1,89 @@
+import random
+
+import numpy as np
+import pytest
+
+import ingest
+import recommend
+
+NAMES = [f"Ingredient {i:02d}" for i in range(40)]
+
+
+def records(count, seed, start=0):
+    rng = random.Random(seed)
+    for i in range(start, start + count):
+        yield {"product_name": f"Product {i}", "brand": f"Brand {i % 7}", "category": ["serum", "toner", "cream"][i % 3],
+               "ingredients_list": rng.sample(NAMES, rng.randint(3, 12))}
+
+
+def load(conn, rows):
+    ingest.ingest(conn, rows, log=lambda message: None)
+
+
+def scores(index, conn, product_ids, **kwargs):
+    """{query id: {product id: score}} over every match, so ties cannot reorder anything."""
+    return {product_id: {r.id: r.score for r in index.similar(conn, product_id, k=10_000, **kwargs)}
+            for product_id in product_ids}
+
+
+def assert_same(actual, expected):
+    assert actual.keys() == expected.keys()
+    for query in expected:
+        assert actual[query].keys() == expected[query].keys(), query
+        ids = sorted(expected[query])
+        np.testing.assert_allclose([actual[query][i] for i in ids], [expected[query][i] for i in ids], rtol=1e-5)
+
+
+@pytest.fixture
+def catalog_with_products(catalog):
+    load(catalog, records(300, seed=1))
+    return catalog
+
+
+def edit(conn):
+    """Rewrites, deletes and inserts a few products, including a brand-new ingredient."""
+    conn.execute("UPDATE products SET ingredients_list = '[\"Ingredient 01\", \"Ingredient 02\"]' WHERE id IN (5, 6)")
+    conn.execute("UPDATE products SET category = 'mask' WHERE id = 7")
+    conn.execute("DELETE FROM products WHERE id IN (10, 11, 12)")
+    conn.commit()
+    load(conn, records(3, seed=2, start=300))
+    load(conn, [{"product_name": "Novel", "category": "serum", "ingredients_list": ["Brand New Extract", "Ingredient 01"]}])
+
+
+def test_refresh_then_compaction_matches_a_full_rebuild(catalog_with_products, tmp_path):
+    conn = catalog_with_products
+    index = recommend.RecommendationIndex.build(conn)
+    edit(conn)
+    assert index.refresh(conn)
+    assert not index.refresh(conn)
+    queries = [1, 5, 6, 7, 301, conn.execute("SELECT id FROM products WHERE product_name = 'Novel'").fetchone()[0]]
+    rebuilt = recommend.RecommendationIndex.build(conn)
+    # Before compaction the IDF is frozen, so scores drift, but the same live products match.
+    assert {q: set(s) for q, s in scores(index, conn, queries).items()} == {
+        q: set(s) for q, s in scores(rebuilt, conn, queries).items()}
+    index.save(str(tmp_path / "index.npz"))
+    assert_same(scores(index, conn, queries), scores(rebuilt, conn, queries))
+    assert_same(scores(index, conn, queries, dupes=True), scores(rebuilt, conn, queries, dupes=True))
+    assert len(index) == len(rebuilt)
+
+
+def test_inserts_past_the_compact_fraction_compact_and_persist(catalog_with_products, tmp_path):
+    conn = catalog_with_products
+    path = str(tmp_path / "index.npz")
+    index = recommend.open_index(conn, path)
+    load(conn, records(int(300 * recommend.COMPACT_FRACTION) + 2, seed=3, start=400))
+    assert index.refresh(conn)
+    assert not index._rows.delta_rows  # compacted
+    saved = recommend.RecommendationIndex.load(path)
+    assert saved.version == index.version and len(saved) == len(index) == 300 + 8
+    assert_same(scores(saved, conn, [1, 400]), scores(recommend.RecommendationIndex.build(conn), conn, [1, 400]))
+
+
+def test_a_reloaded_index_replays_only_later_changes(catalog_with_products, tmp_path):
+    conn = catalog_with_products
+    path = str(tmp_path / "index.npz")
+    recommend.open_index(conn, path)
+    edit(conn)
+    reopened = recommend.open_index(conn, path)
+    reopened.save(path)
+    assert_same(scores(reopened, conn, [1, 5, 301]), scores(recommend.RecommendationIndex.build(conn), conn, [1, 5, 301]))
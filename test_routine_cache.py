@@ -0,0 +1,101 @@
+import pytest
+
+import conflicts
+import ingest
+import routine_cache
+
+
+class CountingEngine:
+    """Wraps a ConflictEngine, counting the analyses the cache could not serve."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.version = engine.version
+        self.calls = 0
+
+    def analyze(self, conn, product_ids):
+        self.calls += 1
+        return self.engine.analyze(conn, product_ids)
+
+
+@pytest.fixture
+def products(catalog):
+    ingest.ingest(catalog, iter([
+        {"product_name": "Night Serum", "ingredients_list": ["Water", "Retinol"]},
+        {"product_name": "Peel Toner", "ingredients_list": ["Water", "Glycolic Acid"]},
+        {"product_name": "Moisturizer", "ingredients_list": ["Water", "Glycerin"]},
+    ]), log=lambda message: None)
+    return {name: product_id for product_id, name in catalog.execute("SELECT id, product_name FROM products")}
+
+
+@pytest.fixture
+def engine(catalog):
+    return CountingEngine(conflicts.compile_rules(catalog))
+
+
+def persisted(conn):
+    return conn.execute("SELECT COUNT(*) FROM routine_cache").fetchone()[0]
+
+
+def test_hits_ignore_routine_order(catalog, products, engine):
+    cache = routine_cache.RoutineCache()
+    routine = [products["Night Serum"], products["Peel Toner"]]
+    findings = cache.analyze(catalog, engine, routine)
+    assert findings and findings[0].severity == "high"
+    assert cache.analyze(catalog, engine, routine[::-1] + routine) == findings
+    assert engine.calls == 1
+    assert cache.stats["misses"] == 1 and cache.stats["memory_hits"] == 1
+
+
+def test_persisted_entries_serve_other_processes(catalog, products, engine):
+    routine = [products["Night Serum"], products["Peel Toner"]]
+    findings = routine_cache.RoutineCache().analyze(catalog, engine, routine)
+    restarted = routine_cache.RoutineCache()
+    assert restarted.analyze(catalog, engine, routine) == findings
+    assert engine.calls == 1 and restarted.stats["disk_hits"] == 1
+
+
+def test_editing_a_product_invalidates_both_tiers(catalog, products, engine):
+    cache = routine_cache.RoutineCache()
+    routine = [products["Night Serum"], products["Peel Toner"]]
+    assert cache.analyze(catalog, engine, routine)
+    catalog.execute(
+        "UPDATE products SET ingredients_list = '[\"Water\", \"Ceramide NP\"]' WHERE id = ?", (products["Peel Toner"],)
+    )
+    catalog.commit()
+    assert persisted(catalog) == 0
+    assert cache.analyze(catalog, engine, routine) == []
+    assert engine.calls == 2 and cache.stats["memory_hits"] == 0
+
+
+def test_deleting_a_product_drops_its_entries(catalog, products, engine):
+    cache = routine_cache.RoutineCache()
+    cache.analyze(catalog, engine, [products["Night Serum"], products["Peel Toner"]])
+    cache.analyze(catalog, engine, [products["Moisturizer"]])
+    catalog.execute("DELETE FROM products WHERE id = ?", (products["Peel Toner"],))
+    catalog.commit()
+    assert persisted(catalog) == 1
+    assert catalog.execute(
+        "SELECT COUNT(*) FROM routine_cache_members WHERE product_id = ?", (products["Peel Toner"],)
+    ).fetchone()[0] == 0
+
+
+def test_unrelated_writes_keep_entries(catalog, products, engine):
+    cache = routine_cache.RoutineCache()
+    routine = [products["Night Serum"], products["Peel Toner"]]
+    findings = cache.analyze(catalog, engine, routine)
+    catalog.execute("UPDATE products SET brand = 'Plum' WHERE id = ?", (products["Moisturizer"],))
+    catalog.commit()
+    assert persisted(catalog) == 1
+    assert cache.analyze(catalog, engine, routine) == findings
+    assert engine.calls == 1
+
+
+def test_memory_tier_caps_bytes_and_expires(catalog, products, engine):
+    cache = routine_cache.RoutineCache(max_bytes=1)
+    cache.analyze(catalog, engine, [products["Night Serum"], products["Peel Toner"]])
+    assert len(cache) == 0 and cache.bytes == 0
+    cache = routine_cache.RoutineCache(ttl=0)
+    cache.analyze(catalog, engine, [products["Moisturizer"]])
+    cache.analyze(catalog, engine, [products["Moisturizer"]])
+    assert cache.stats["expirations"] == 1 and cache.stats["disk_hits"] == 1
@@ -0,0 +1,48 @@
+import pytest
+
+import ingest
+import search
+
+
+def load(conn, records):
+    ingest.ingest(conn, iter(records), log=lambda message: None)
+
+
+@pytest.fixture
+def engine(catalog):
+    load(catalog, [
+        {"product_name": "Ceramide Cream", "brand": "CeraVe", "category": "moisturizer"},
+        {"product_name": "Vitamin C Serum", "brand": "Minimalist", "category": "serum"},
+        {"product_name": "De-Tan Face Wash", "brand": "Pond's", "category": "cleanser"},
+    ])
+    return search.ProductSearch(catalog)
+
+
+def test_an_older_exact_name_match_outranks_many_newer_matches(engine, catalog):
+    load(catalog, [
+        {"product_name": f"Ceramide Cream Intensive Barrier Repair Night Formula {i}", "brand": "Plum",
+         "category": "moisturizer"} for i in range(300)
+    ] + [
+        {"product_name": f"Hydrating Gel {i}", "brand": "Ceramide Labs", "category": "ceramide cream"}
+        for i in range(300)
+    ])
+    results = engine.search("ceramide cream", limit=5)
+    assert results[0].product_name == "Ceramide Cream"
+    assert all("Ceramide Cream" in result.product_name for result in results)
+    assert [result.score for result in results] == sorted((result.score for result in results), reverse=True)
+
+
+def test_last_word_is_a_prefix(engine):
+    assert [result.product_name for result in engine.search("vitamin c ser")] == ["Vitamin C Serum"]
+
+
+def test_typos_and_split_words_are_corrected(engine):
+    assert engine.search("ceramdie cream")[0].product_name == "Ceramide Cream"
+    assert engine.search("de tan face")[0].product_name == "De-Tan Face Wash"
+
+
+def test_cached_results_are_dropped_when_the_catalog_changes(engine, catalog):
+    assert engine.search("serum")[0].product_name == "Vitamin C Serum"
+    catalog.execute("UPDATE products SET product_name = 'Vitamin C Booster' WHERE product_name = 'Vitamin C Serum'")
+    catalog.commit()
+    assert [result.product_name for result in engine.search("serum")] == ["Vitamin C Booster"]
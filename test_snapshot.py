@@ -0,0 +1,85 @@
+import json
+
+import ingredients
+import snapshot
+
+PRODUCTS = [
+    ("Dot & Key CICA Calming Blemish Clearing Facewash", "Dot & Key", "Face Wash", ["Aqua", "Cica", "Niacinamide"]),
+    ("Plum Green Tea Toner", "Plum", None, ["Water", "Camellia Sinensis Leaf Extract", "Glycolic Acid"]),
+    ("Unbranded Balm", None, "Balm", ["Shea Butter", "Vitamin B3"]),
+    ("Empty Label", None, None, []),
+    ("Crème Légère", "Maison", "Moisturizer", ["Eau", "Squalane"]),
+]
+
+
+def fill(conn):
+    conn.executemany(
+        "INSERT INTO products(product_name, brand, category, ingredients_list) VALUES (?, ?, ?, ?)",
+        [(name, brand, category, json.dumps(label)) for name, brand, category, label in PRODUCTS],
+    )
+    conn.commit()
+
+
+def test_round_trip_matches_the_catalog(catalog, tmp_path):
+    fill(catalog)
+    path = str(tmp_path / "products.snapshot")
+    stamp = snapshot.compile_snapshot(catalog, path)
+    with snapshot.CatalogSnapshot(path) as snap:
+        assert snap.verify()
+        assert snap.stamp == stamp and snap.is_current(catalog)
+        rows = catalog.execute("SELECT id, product_name, brand, category FROM products ORDER BY id").fetchall()
+        assert len(snap) == len(rows)
+        for (product_id, name, brand, category), view in zip(rows, snap):
+            assert (view.id, view.product_name, view.brand, view.category) == (product_id, name, brand, category)
+            assert view.ingredients == ingredients.ingredients_of(catalog, product_id)
+            assert snap.get(product_id).product_name == name
+            assert snap.get_by_name(name).id == product_id
+        for ingredient_id, name in catalog.execute("SELECT id, name FROM ingredients"):
+            assert snap.ingredient_name(ingredient_id) == name
+            assert snap.products_containing(ingredient_id) == ingredients.products_containing(catalog, name)
+
+
+def test_misses_return_nothing(catalog, tmp_path):
+    fill(catalog)
+    path = str(tmp_path / "products.snapshot")
+    snapshot.compile_snapshot(catalog, path)
+    with snapshot.CatalogSnapshot(path) as snap:
+        assert snap.get(10**9) is None
+        assert snap.get_by_name("No Such Product") is None
+        assert snap.ingredient_name(10**9) is None
+        assert snap.products_containing(10**9) == []
+
+
+def test_an_empty_catalog_round_trips(catalog, tmp_path):
+    path = str(tmp_path / "products.snapshot")
+    snapshot.compile_snapshot(catalog, path)
+    with snapshot.CatalogSnapshot(path) as snap:
+        assert snap.verify()
+        assert len(snap) == 0 and list(snap) == []
+
+
+def test_open_snapshot_recompiles_after_catalog_edits(catalog, tmp_path):
+    fill(catalog)
+    path = str(tmp_path / "products.snapshot")
+    snapshot.compile_snapshot(catalog, path)
+    catalog.execute("UPDATE products SET ingredients_list = '[\"Water\", \"Retinol\"]' WHERE product_name = 'Unbranded Balm'")
+    catalog.commit()
+    with snapshot.CatalogSnapshot(path) as stale:
+        assert not stale.is_current(catalog)
+    with snapshot.open_snapshot(catalog, path) as snap:
+        assert snap.is_current(catalog)
+        assert snap.get_by_name("Unbranded Balm").ingredients == ["Water", "Retinol"]
+
+
+def test_corruption_is_detected(catalog, tmp_path):
+    fill(catalog)
+    path = tmp_path / "products.snapshot"
+    snapshot.compile_snapshot(catalog, str(path))
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with snapshot.CatalogSnapshot(str(path)) as snap:
+        assert not snap.verify()
+    path.write_bytes(b"not a snapshot")
+    with snapshot.open_snapshot(catalog, str(path)) as snap:
+        assert snap.verify() and len(snap) == len(PRODUCTS)